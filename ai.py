@@ -0,0 +1,266 @@
+"""
+テトリス AI - 配置探索とヒューリスティック評価による自動プレイヤー
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from game_logic import ROTATIONS, TetrisGame
+
+# ヒューリスティックの重み（高さ合計・穴・凸凹は減点、消去ラインは加点）
+DEFAULT_WEIGHTS = {
+    'height': -0.510066,
+    'lines': 0.760666,
+    'holes': -0.35663,
+    'bumpiness': -0.184483,
+}
+
+Rows = Tuple[int, ...]
+
+
+class Placement(NamedTuple):
+    """ピースの配置候補（回転、列、評価値）"""
+    rotation: int
+    x: int
+    score: float
+
+
+def board_masks(game: TetrisGame) -> Rows:
+    """盤面を行ごとの占有ビットマスク（ビット x = 列 x）に変換"""
+    masks = []
+    for row in game.board:
+        mask = getattr(row, 'mask', None)
+        if mask is None:
+            mask = 0
+            for x, cell in enumerate(row):
+                if cell != 0:
+                    mask |= 1 << x
+        masks.append(mask)
+    return tuple(masks)
+
+
+class LRUCache:
+    """上限付きの LRU キャッシュ"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data: 'OrderedDict[Hashable, object]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable):
+        """値を取得（なければ None）"""
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value) -> None:
+        """値を登録し、上限を超えたら最も古いものを捨てる"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+
+
+class AIPlayer:
+    """到達可能な全配置を列挙して盤面を評価する自動プレイヤー。
+
+    まず現在のピースの全配置を1手で評価し、残り時間がある限り
+    評価の高い順に次のピースまで先読みして評価を更新する（時間切れの候補は
+    1手の評価のまま）。盤面・ピースの組み合わせごとの結論は LRU キャッシュに残す。
+    """
+
+    def __init__(self, time_budget: float = 0.05, lookahead: bool = True,
+                 cache_size: int = 100000, weights: Optional[Dict[str, float]] = None):
+        """AI を初期化（time_budget はピース1つあたりの思考時間の上限、秒）"""
+        self.time_budget = time_budget
+        self.lookahead = lookahead
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.decisions = LRUCache(cache_size)
+        self.evaluations = LRUCache(cache_size)
+        self.evaluated = 0
+
+    # -- placement generation ------------------------------------------------
+
+    def placements(self, rows: Rows, width: int, piece_type: str, rotation: int = 0,
+                   x: int = None, y: int = 0) -> List[Tuple[int, int, int]]:
+        """(回転, 列) ごとに到達可能な配置を列挙し、(回転, 列, 着地行) を返す
+
+        現在位置で回転してから左右に移動し、まっすぐ落とす経路だけを考える。
+        """
+        states = ROTATIONS[piece_type]
+        if x is None:
+            x = width // 2 - 2
+        height = len(rows)
+        results = []
+        current = rotation
+        for _ in range(len(states)):
+            if not _fits(rows, width, states[current], x, y):
+                break  # this rotation (and every later one) is blocked
+            for direction in (-1, 1):
+                target = x if direction == -1 else x + 1
+                while _fits(rows, width, states[current], target, y):
+                    landing = _landing_row(rows, height, states[current], target, y)
+                    results.append((current, target, landing))
+                    target += direction
+            current = (current + 1) % len(states)
+        return results
+
+    # -- evaluation ------------------------------------------------------------
+
+    def evaluate(self, rows: Rows, width: int) -> float:
+        """盤面を評価（消去ラインは含まない）"""
+        cached = self.evaluations.get(rows)
+        if cached is not None:
+            return cached
+
+        self.evaluated += 1
+        height = len(rows)
+        column_heights = [0] * width
+        seen = 0
+        holes = 0
+        for y, mask in enumerate(rows):
+            holes += (seen & ~mask).bit_count()
+            new = mask & ~seen
+            while new:
+                bit = new & -new
+                column_heights[bit.bit_length() - 1] = height - y
+                new ^= bit
+            seen |= mask
+
+        bumpiness = 0
+        for c in range(width - 1):
+            bumpiness += abs(column_heights[c] - column_heights[c + 1])
+
+        weights = self.weights
+        score = (weights['height'] * sum(column_heights)
+                 + weights['holes'] * holes
+                 + weights['bumpiness'] * bumpiness)
+        self.evaluations.put(rows, score)
+        return score
+
+    def _best_single(self, rows: Rows, width: int, piece_type: str) -> float:
+        """ピースを1つ置いたあとの最良評価値"""
+        best = None
+        full = (1 << width) - 1
+        for rotation, x, landing in self.placements(rows, width, piece_type):
+            after, lines = _place(rows, full, ROTATIONS[piece_type][rotation], x, landing)
+            score = self.evaluate(after, width) + self.weights['lines'] * lines
+            if best is None or score > best:
+                best = score
+        return best if best is not None else float('-inf')
+
+    # -- decision -------------------------------------------------------------
+
+    def choose(self, game: TetrisGame) -> Optional[Placement]:
+        """現在のピースの最良の配置を選ぶ（置ける場所がなければ None）"""
+        rows = board_masks(game)
+        width = game.width
+        piece_type = game.current_piece_type
+        next_type = game.next_piece_type if self.lookahead else None
+        key = (rows, piece_type, game.current_rotation, game.current_piece_x,
+               game.current_piece_y, next_type)
+        cached = self.decisions.get(key)
+        if cached is not None:
+            return cached
+
+        deadline = time.perf_counter() + self.time_budget
+        full = (1 << width) - 1
+        candidates = []
+        for rotation, x, landing in self.placements(rows, width, piece_type, game.current_rotation,
+                                                    game.current_piece_x, game.current_piece_y):
+            after, lines = _place(rows, full, ROTATIONS[piece_type][rotation], x, landing)
+            score = self.evaluate(after, width) + self.weights['lines'] * lines
+            candidates.append((score, rotation, x, after, lines))
+        if not candidates:
+            return None
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        best = Placement(candidates[0][1], candidates[0][2], candidates[0][0])
+        complete = True
+        if next_type is not None:
+            best = None
+            for score, rotation, x, after, lines in candidates:
+                if time.perf_counter() > deadline:
+                    complete = False
+                    break
+                total = self.weights['lines'] * lines + self._best_single(after, width, next_type)
+                if best is None or total > best.score:
+                    best = Placement(rotation, x, total)
+            if best is None:
+                score, rotation, x, _, _ = candidates[0]
+                best = Placement(rotation, x, score)
+
+        if complete:
+            # Only cache decisions that searched every candidate
+            self.decisions.put(key, best)
+        return best
+
+    def actions(self, game: TetrisGame, placement: Placement) -> List[str]:
+        """配置に到達するための操作列（回転してから左右移動）を返す"""
+        turns = (placement.rotation - game.current_rotation) % len(ROTATIONS[game.current_piece_type])
+        shift = placement.x - game.current_piece_x
+        return ['rotate'] * turns + ['left' if shift < 0 else 'right'] * abs(shift)
+
+    def plan(self, game: TetrisGame) -> List[str]:
+        """現在のピースに対する操作列を返す（ハードドロップは含まない）"""
+        placement = self.choose(game)
+        if placement is None:
+            return []
+        return self.actions(game, placement)
+
+    def play_piece(self, game: TetrisGame) -> bool:
+        """現在のピースを最良の位置に置いて次のピースを出す（ゲームオーバーなら False）"""
+        for action in self.plan(game):
+            if action == 'rotate':
+                game.rotate_piece()
+            elif action == 'left':
+                game.move_piece_left()
+            else:
+                game.move_piece_right()
+        game.hard_drop()
+        return game.tick()
+
+
+def _fits(rows: Rows, width: int, state, x: int, y: int) -> bool:
+    """行マスク上でピースが置けるかチェック"""
+    if x < 0 or x + state.width > width or y + state.height > len(rows):
+        return False
+    for dy, row_mask in enumerate(state.row_masks):
+        if y + dy >= 0 and rows[y + dy] & (row_mask << x):
+            return False
+    return True
+
+
+def _landing_row(rows: Rows, height: int, state, x: int, y: int) -> int:
+    """まっすぐ落としたときの着地行を求める"""
+    masks = [row_mask << x for row_mask in state.row_masks]
+    limit = height - state.height
+    while y < limit:
+        below = y + 1
+        for dy, mask in enumerate(masks):
+            if rows[below + dy] & mask:
+                return y
+        y = below
+    return y
+
+
+def _place(rows: Rows, full: int, state, x: int, y: int) -> Tuple[Rows, int]:
+    """ピースを置いてライン消去した盤面と消えたライン数を返す"""
+    placed = list(rows)
+    for dy, row_mask in enumerate(state.row_masks):
+        if y + dy >= 0:
+            placed[y + dy] |= row_mask << x
+    kept = [mask for mask in placed if mask != full]
+    lines = len(placed) - len(kept)
+    if lines:
+        kept = [0] * lines + kept
+    return tuple(kept), lines
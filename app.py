@@ -2,37 +2,133 @@
 テトリスゲーム用 Flask Webサーバー
 """
 
-from flask import Flask, render_template, jsonify
-from game_logic import TetrisGame
+import atexit
+import hmac
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import List, Optional
+
+from flask import Flask, Response, abort, g, render_template, jsonify, make_response, request
+import metrics
+from ai import AIPlayer
+from assets import IMMUTABLE, Asset, AssetPipeline
+from broadcast import Broadcast, BroadcastHub, sse_event
+from game_logic import ACTIONS, TetrisGame, drop_interval
+from leaderboard import MAX_NAME_LENGTH, Leaderboard
+from replay import MAX_REPLAY_EVENTS, Replay, play_replay
+from rooms import MAX_ROOM_PLAYERS, RoomManager
+from scheduler import TickScheduler
+from sessions import MAX_BATCH_INPUTS, GameSession, Input, SessionManager
+from store import open_store
+from thumbnails import HAVE_PYGAME, ThumbnailService
+
+# Keep-alive interval for idle event streams (seconds)
+STREAM_KEEPALIVE = 15.0
+# Longest a request waits for a thumbnail render before answering 503 (seconds)
+THUMBNAIL_TIMEOUT = float(os.environ.get('TETRIS_THUMBNAIL_TIMEOUT', 2.0))
 
 app = Flask(__name__)
-game = None
+# Largest request body accepted (413 beyond); a replay at MAX_REPLAY_EVENTS fits well within it
+app.config['MAX_CONTENT_LENGTH'] = 1024 * 1024
+# Fingerprinted, precompressed static files; the index page is rendered once below
+assets = AssetPipeline()
+app.jinja_env.globals['asset_url'] = assets.url
+sessions = SessionManager(
+    lambda: TetrisGame(10, 20, randomizer=os.environ.get('TETRIS_RANDOMIZER', 'uniform')),
+    capacity=int(os.environ.get('TETRIS_MAX_SESSIONS', 1000)),
+    idle_timeout=float(os.environ.get('TETRIS_SESSION_TIMEOUT', 1800)),
+    # e.g. 'sqlite:/data/sessions.db'; unset keeps sessions in memory only
+    store=open_store(os.environ.get('TETRIS_SESSION_STORE')),
+)
+if sessions.store is not None:
+    # Changes are written back in batches, not on every move
+    sessions.start_writeback(float(os.environ.get('TETRIS_FLUSH_INTERVAL', 1.0)))
+    atexit.register(sessions.flush)
+gravity = TickScheduler()
+# Versus rooms tick every player on one timer per room, on the same scheduler
+rooms = RoomManager(sessions, gravity)
+# Spectator channels of single games, by watch id (never the player's session id)
+spectators = BroadcastHub()
+# Finished games; e.g. '/data/leaderboard.db' (the default keeps scores in memory only)
+leaderboard = Leaderboard(os.environ.get('TETRIS_LEADERBOARD', ':memory:'))
+leaderboard.start_writer(float(os.environ.get('TETRIS_LEADERBOARD_FLUSH_INTERVAL', 1.0)))
+atexit.register(leaderboard.flush)
+# Board thumbnails, rendered in worker processes and cached by content
+thumbnails = ThumbnailService(
+    workers=int(os.environ.get('TETRIS_THUMBNAIL_WORKERS', 2)),
+    cache_size=int(os.environ.get('TETRIS_THUMBNAIL_CACHE', 512)),
+)
+atexit.register(thumbnails.close)
+# The AI's caches are shared by all sessions, so decisions are serialized
+autoplayer = AIPlayer(time_budget=float(os.environ.get('TETRIS_AI_TIME_BUDGET', 0.02)))
+autoplayer_lock = threading.Lock()
 
-def init_game():
-    """新しいゲームを初期化"""
-    global game
-    game = TetrisGame(10, 20)
-    return game
+metrics.REGISTRY.gauge('tetris_active_sessions', 'Live game sessions', lambda: len(sessions))
+metrics.REGISTRY.gauge('tetris_gravity_timers', 'Sessions with server-side gravity running',
+                       lambda: len(gravity))
+metrics.REGISTRY.gauge('tetris_rooms', 'Versus rooms', lambda: len(rooms))
+metrics.REGISTRY.gauge('tetris_leaderboard_entries', 'Scores on the leaderboard',
+                       lambda: len(leaderboard))
+metrics.REGISTRY.gauge('tetris_leaderboard_pending', 'Scores waiting to be written',
+                       lambda: leaderboard.pending)
+metrics.REGISTRY.gauge('tetris_thumbnails_cached', 'Thumbnails in the cache',
+                       lambda: len(thumbnails))
+metrics.REGISTRY.gauge('tetris_spectators', 'Connected spectator streams',
+                       lambda: spectators.subscribers() + rooms.spectators())
+# Admin routes (profiler control) require this token in X-Admin-Token; they are off without it
+ADMIN_TOKEN = os.environ.get('TETRIS_ADMIN_TOKEN')
+if os.environ.get('TETRIS_PROFILE_RATE'):
+    metrics.profiler.configure(enabled=True, sample_rate=float(os.environ['TETRIS_PROFILE_RATE']))
 
-@app.route('/')
-def index():
-    """メインゲームページを提供"""
-    return render_template('index.html')
+@app.before_request
+def start_timer():
+    """ルートの処理時間の計測を開始（プロファイラーが有効ならサンプリング）"""
+    g.request_start = time.perf_counter()
+    g.profile = metrics.profiler.start()
 
-@app.route('/api/game/new', methods=['GET'])
-def new_game():
-    """新しいゲームを作成"""
-    init_game()
-    return get_game_state()
+@app.after_request
+def record_request(response):
+    """ルートごとのリクエスト数と処理時間を記録"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        duration = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.http_latency.observe(duration, route)
+        metrics.http_requests.inc(route, request.method, str(response.status_code))
+        profile = g.pop('profile', None)
+        if profile is not None:
+            metrics.profiler.finish(profile, duration, f'{request.method} {request.path}')
+    return response
 
-@app.route('/api/game/state', methods=['GET'])
-def get_game_state():
-    """現在のゲーム状態を取得"""
-    if game is None:
-        init_game()
-    
-    return jsonify({
-        'board': game.get_board(),
+def get_session() -> GameSession:
+    """リクエストのセッションIDに対応するセッションを取得（IDがないか不明なら 404 で中断）
+
+    セッションは /api/game/new でだけ作る。
+    """
+    session_id = request.args.get('session_id') or request.headers.get('X-Session-Id')
+    session = sessions.get(session_id) if session_id else None
+    if session is None:
+        abort(make_response(jsonify({'error': 'unknown session'}), 404))
+    return session
+
+def state_options():
+    """リクエストから差分プロトコルの指定（since, format）を取得"""
+    since = request.args.get('since', type=int)
+    packed = request.args.get('format') == 'packed'
+    return since, packed
+
+def game_state(session: GameSession, since: Optional[int] = None, packed: bool = False) -> dict:
+    """セッションのゲーム状態を取得（呼び出し側がロックを保持）
+
+    ``since`` を指定するとそのバージョン以降に変わった行とフィールドだけを返す。
+    """
+    game = session.game
+    tracker = session.tracker
+    tracker.sync(game.board_view(), {
         'piece': game.get_current_piece(),
         'piece_type': game.current_piece_type,
         'piece_x': game.current_piece_x,
@@ -41,52 +137,469 @@ def get_game_state():
         'score': game.score,
         'level': game.level,
         'lines': game.lines_cleared,
-        'game_over': False
-    })
+        'game_over': game.game_over,
+        'paused': session.paused,
+        'input_seq': session.input_seq
+    }, session.version)
+
+    state = tracker.snapshot(packed) if since is None else tracker.delta(since, packed)
+    state['session_id'] = session.session_id
+    return state
+
+def gravity_step(session: GameSession):
+    """サーバー側の自動落下を1回実行し、次の落下までの秒数を返す"""
+    with session.lock:
+        if session.closed or session.game.game_over:
+            return None
+        if not session.paused:
+            session.apply('tick')
+            session.mark_changed()
+        return drop_interval(session.game.level)
+
+def start_gravity(session: GameSession) -> None:
+    """セッションの自動落下を開始（ロック保持中に呼ぶ）"""
+    gravity.start()
+    gravity.schedule(session.session_id, drop_interval(session.game.level),
+                     lambda: gravity_step(session))
+
+def send_asset(asset: Asset, cache_control: str) -> Response:
+    """圧縮済みの本文をクライアントの Accept-Encoding に合わせて返す（ETag が一致すれば 304）"""
+    encoding = asset.select(request.headers.get('Accept-Encoding', ''))
+    etag = f'{asset.etag}-{encoding}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(asset.bodies[encoding], content_type=asset.content_type)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+@app.route('/')
+def index():
+    """メインゲームページを提供（起動時に描画・圧縮したもの）"""
+    return send_asset(index_page, 'no-cache')
+
+@app.route('/assets/<name>')
+def asset(name):
+    """フィンガープリント付きの静的ファイルを提供（内容が変われば URL も変わる）"""
+    found = assets.assets.get(name)
+    if found is None:
+        return jsonify({'error': 'unknown asset'}), 404
+    return send_asset(found, IMMUTABLE)
+
+with app.app_context():
+    index_page = assets.add_page('/', render_template('index.html'))
+
+@app.route('/api/game/new', methods=['GET'])
+def new_game():
+    """新しいゲームを作成"""
+    old_session_id = request.args.get('session_id') or request.headers.get('X-Session-Id')
+    if old_session_id:
+        sessions.remove(old_session_id)
+
+    session = sessions.create()
+    _, packed = state_options()
+    with session.lock:
+        return jsonify(game_state(session, packed=packed))
+
+@app.route('/api/game/state', methods=['GET'])
+def get_game_state():
+    """現在のゲーム状態を取得"""
+    session = get_session()
+    with session.lock:
+        return jsonify(game_state(session, *state_options()))
 
 @app.route('/api/game/move/<direction>', methods=['POST'])
 def move(direction):
     """指定された方向にピースを移動"""
-    if game is None:
-        init_game()
-    
-    if direction == 'left':
-        game.move_piece_left()
-    elif direction == 'right':
-        game.move_piece_right()
-    elif direction == 'down':
-        game.move_piece_down()
-    elif direction == 'rotate':
-        game.rotate_piece()
-    elif direction == 'drop':
-        game.hard_drop()
-    
-    return get_game_state()
+    session = get_session()
+    with session.lock:
+        game = session.game
+        if not game.game_over and not session.paused:
+            if direction in ACTIONS and direction != 'tick':
+                session.apply(direction)
+            session.mark_changed()
+
+        return jsonify(game_state(session, *state_options()))
+
+def parse_inputs(data) -> List[Input]:
+    """リクエストの inputs（[{"seq", "action", "t"}, ...]）を検証して Input のリストにする"""
+    entries = data['inputs']
+    if not isinstance(entries, list) or len(entries) > MAX_BATCH_INPUTS:
+        raise ValueError(f'inputs must be a list of at most {MAX_BATCH_INPUTS} entries')
+    inputs = []
+    for entry in entries:
+        seq, action, t = entry['seq'], entry['action'], entry.get('t')
+        if isinstance(seq, bool) or not isinstance(seq, int) or not 0 < seq < 2 ** 32:
+            raise ValueError('invalid seq')
+        if action not in ACTIONS or action == 'tick':
+            raise ValueError('invalid action')
+        if t is not None and (isinstance(t, bool) or not isinstance(t, (int, float))
+                              or not math.isfinite(t)):
+            raise ValueError('invalid t')
+        inputs.append(Input(seq, action, t))
+    return inputs
+
+@app.route('/api/game/input', methods=['POST'])
+def batch_input():
+    """連番付きの入力をまとめて適用し、結果の状態を1つ返す
+
+    本文は ``{"inputs": [{"seq": 1, "action": "left", "t": 1234.5}, ...]}``。
+    状態の ``input_seq`` が受け付け済みの最後の連番になる。
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        inputs = parse_inputs(data)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'invalid inputs'}), 400
+
+    session = get_session()
+    with session.lock:
+        input_seq = session.input_seq
+        if session.apply_inputs(inputs) or session.input_seq != input_seq:
+            session.mark_changed()
+        return jsonify(game_state(session, *state_options()))
 
 @app.route('/api/game/tick', methods=['POST'])
 def tick():
-    """ゲームを1ティック進める"""
-    if game is None:
-        init_game()
-    
-    game_over = False
-    if not game.move_piece_down():
-        if not game.spawn_next_piece():
-            game_over = True
-    
+    """ゲームを1ティック進める（イベントストリームを使わないクライアント向け）"""
+    session = get_session()
+    with session.lock:
+        if not session.game.game_over:
+            session.apply('tick')
+            session.mark_changed()
+
+        return jsonify(game_state(session, *state_options()))
+
+@app.route('/api/game/autoplay', methods=['POST'])
+def autoplay():
+    """AI が現在のピースを最良の位置に置き、次のピースを出す（対戦ルームでは使えない）"""
+    session = get_session()
+    if rooms.room_of(session.session_id) is not None:
+        return jsonify({'error': 'autoplay is not allowed in versus rooms'}), 409
+    with session.lock:
+        game = session.game
+        if not game.game_over and not session.paused:
+            with autoplayer_lock:
+                actions = autoplayer.plan(game)
+            session.autoplayed = True
+            # Apply the plan input by input so the replay can reproduce it
+            for action in actions + ['drop', 'tick']:
+                session.apply(action)
+            session.mark_changed()
+
+        return jsonify(game_state(session, *state_options()))
+
+@app.route('/api/game/pause', methods=['POST'])
+def pause():
+    """サーバー側の自動落下を一時停止"""
+    return set_paused(True)
+
+@app.route('/api/game/resume', methods=['POST'])
+def resume():
+    """サーバー側の自動落下を再開"""
+    return set_paused(False)
+
+def set_paused(paused: bool):
+    """一時停止状態を切り替えて現在の状態を返す（対戦ルームのゲームはルームが管理するので 409）"""
+    session = get_session()
+    if rooms.room_of(session.session_id) is not None:
+        return jsonify({'error': 'versus room games cannot be paused or resumed'}), 409
+    with session.lock:
+        if session.paused != paused:
+            session.paused = paused
+            session.mark_changed()
+        return jsonify(game_state(session, *state_options()))
+
+@app.route('/api/game/stream', methods=['GET'])
+def stream():
+    """ゲーム状態の変化を Server-Sent Events で配信（自動落下はサーバーが実行）"""
+    session = get_session()
+    since, packed = state_options()
+    # Players in a versus room fall on the room's timer instead
+    solo = rooms.room_of(session.session_id) is None
+    with session.lock:
+        session.listeners += 1
+        if session.listeners == 1 and solo:
+            start_gravity(session)
+
+    def events():
+        # The first event is a delta against the client's version (or a snapshot);
+        # later events only carry what changed since the previous one.
+        sent_version = since
+        try:
+            while True:
+                with session.lock:
+                    if session.version == sent_version:
+                        session.changed.wait(STREAM_KEEPALIVE)
+                    if session.closed:
+                        return
+                    if session.version == sent_version:
+                        payload = None
+                    else:
+                        state = game_state(session, sent_version, packed)
+                        sent_version = session.version
+                        payload = json.dumps(state, separators=(',', ':'))
+
+                if payload is None:
+                    # Keep the connection (and the session) alive while nothing changes
+                    if sessions.get(session.session_id) is None:
+                        return
+                    yield ': keepalive\n\n'
+                    continue
+
+                yield f'data: {payload}\n\n'
+                if session.game.game_over:
+                    return
+        finally:
+            with session.lock:
+                session.listeners -= 1
+                if session.listeners == 0:
+                    gravity.cancel(session.session_id)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def spectator_frame(session: GameSession) -> bytes:
+    """観戦者に配る全体スナップショット（packed 形式、セッションIDは含めない）"""
+    with session.lock:
+        state = game_state(session, packed=True)
+    del state['session_id']
+    return sse_event(state)
+
+def spectate(channel: Broadcast) -> Response:
+    """観戦チャンネルのフレームを Server-Sent Events で配信（全員に同じバイト列を送る）"""
+    def events():
+        for frame in channel.frames(STREAM_KEEPALIVE):
+            yield b': keepalive\n\n' if frame is None else frame.data
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/game/watch', methods=['POST'])
+def share_game():
+    """現在のゲームの観戦IDを発行（同じゲームには同じIDを返す）"""
+    session = get_session()
+    watch_id, channel, created = spectators.open(
+        session.session_id, lambda: spectator_frame(session), lambda: not session.closed)
+    if created:
+        with session.lock:
+            session.broadcasts.append(channel)
+    return jsonify({'session_id': session.session_id, 'watch_id': watch_id})
+
+@app.route('/api/watch/<watch_id>', methods=['GET'])
+def watch_game(watch_id):
+    """観戦IDのゲームを Server-Sent Events で観戦（読み取り専用）"""
+    channel = spectators.get(watch_id)
+    if channel is None:
+        return jsonify({'error': 'unknown watch id'}), 404
+    return spectate(channel)
+
+def send_thumbnail(session: GameSession) -> Response:
+    """ゲームのサムネイル PNG を返す（描画はワーカーで行い、ETag が一致すれば 304、失敗は 503）"""
+    if not HAVE_PYGAME:
+        return jsonify({'error': 'thumbnails are not available'}), 503
+    with session.lock:
+        key = thumbnails.key(session.game)
+        if key in request.if_none_match:
+            future = None
+        else:
+            # Only the snapshot is taken under the lock; the render runs elsewhere
+            key, future = thumbnails.request(session.game, key)
+    headers = {'ETag': f'"{key}"', 'Cache-Control': 'no-cache'}
+    if future is None:
+        return Response(status=304, headers=headers)
+    try:
+        png = future.result(THUMBNAIL_TIMEOUT)
+    except FutureTimeout:
+        return jsonify({'error': 'thumbnail is not ready'}), 503, {'Retry-After': '1'}
+    except Exception:
+        # The failed render is not cached or shared, so the retry renders again
+        return jsonify({'error': 'thumbnail rendering failed'}), 503, {'Retry-After': '1'}
+    return Response(png, content_type='image/png', headers=headers)
+
+@app.route('/api/watch/<watch_id>/thumbnail.png', methods=['GET'])
+def game_thumbnail(watch_id):
+    """観戦IDのゲームの盤面のサムネイル画像（PNG）"""
+    session_id = spectators.key_of(watch_id)
+    session = sessions.peek(session_id) if session_id is not None else None
+    if session is None or session.closed:
+        return jsonify({'error': 'unknown watch id'}), 404
+    return send_thumbnail(session)
+
+@app.route('/api/game/replay', methods=['GET'])
+def get_replay():
+    """現在のゲームのリプレイ（シードと入力列）を取得"""
+    session = get_session()
+    with session.lock:
+        replay = session.recorder.replay
+        return jsonify({
+            'session_id': session.session_id,
+            'replay': replay.to_string(),
+            'inputs': replay.count,
+            'complete': not session.recorder.full,
+            'score': session.game.score,
+            'lines': session.game.lines_cleared,
+        })
+
+@app.route('/api/replay/verify', methods=['POST'])
+def verify_replay():
+    """リプレイをサーバーで再シミュレーションし、申告されたスコアと照合"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict) or not isinstance(data.get('replay'), str):
+        return jsonify({'error': 'replay must be a string'}), 400
+    try:
+        game = play_replay(Replay.from_string(data['replay'], MAX_REPLAY_EVENTS))
+    except (ValueError, IndexError):
+        return jsonify({'error': 'invalid replay'}), 400
+
+    result = {'score': game.score, 'lines': game.lines_cleared, 'game_over': game.game_over}
+    if 'score' in data:
+        result['valid'] = data['score'] == game.score and data.get('lines', game.lines_cleared) == game.lines_cleared
+    return jsonify(result)
+
+@app.route('/api/room/new', methods=['POST'])
+def new_room():
+    """対戦ルームを作成して参加（players で人数を指定、既定 2）"""
+    size = request.args.get('players', 2, type=int)
+    if not 2 <= size <= MAX_ROOM_PLAYERS:
+        return jsonify({'error': f'players must be 2 to {MAX_ROOM_PLAYERS}'}), 400
+    room = rooms.create(size)
+    session = rooms.join(room)
+    return jsonify({'session_id': session.session_id, 'room': room.summary()})
+
+@app.route('/api/room/<room_id>/join', methods=['POST'])
+def join_room(room_id):
+    """対戦ルームに参加（満員になると対戦が始まる）"""
+    room = rooms.get(room_id)
+    if room is None:
+        return jsonify({'error': 'unknown room'}), 404
+    try:
+        session = rooms.join(room)
+    except ValueError:
+        return jsonify({'error': 'room is full'}), 409
+    return jsonify({'session_id': session.session_id, 'room': room.summary()})
+
+@app.route('/api/room/<room_id>/watch', methods=['GET'])
+def watch_room(room_id):
+    """対戦ルームを Server-Sent Events で観戦（各フレームはルームの状態）"""
+    room = rooms.get(room_id)
+    if room is None:
+        return jsonify({'error': 'unknown room'}), 404
+    return spectate(room.broadcast)
+
+@app.route('/api/room/<room_id>/thumbnail.png', methods=['GET'])
+def room_thumbnail(room_id):
+    """対戦ルームの player 番目（既定 0）のプレイヤーの盤面のサムネイル画像（PNG）"""
+    room = rooms.get(room_id)
+    if room is None:
+        return jsonify({'error': 'unknown room'}), 404
+    index = request.args.get('player', 0, type=int)
+    players = list(room.players)
+    if not 0 <= index < len(players):
+        return jsonify({'error': 'unknown player'}), 404
+    return send_thumbnail(players[index].session)
+
+@app.route('/api/room/<room_id>', methods=['GET'])
+def room_state(room_id):
+    """対戦ルームの状態（全員のスコアと盤面、勝者）"""
+    room = rooms.get(room_id)
+    if room is None:
+        return jsonify({'error': 'unknown room'}), 404
+    return jsonify(room.summary())
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """メトリクスを Prometheus のテキスト形式で出力"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/metrics/profile', methods=['GET', 'POST'])
+def profile_settings():
+    """サンプリングプロファイラーの切り替え（POST）と遅いリクエストの取得（GET）（管理トークンが必要）"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'not found'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(),
+                               ADMIN_TOKEN.encode()):
+        return jsonify({'error': 'forbidden'}), 403
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict) or not isinstance(data.get('enabled', False), bool):
+            return jsonify({'error': 'invalid profiler settings'}), 400
+        try:
+            metrics.profiler.configure(data.get('enabled'), data.get('sample_rate'), data.get('keep'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'invalid profiler settings'}), 400
+        if data.get('clear'):
+            metrics.profiler.clear()
+    profiler = metrics.profiler
     return jsonify({
-        'board': game.get_board(),
-        'piece': game.get_current_piece(),
-        'piece_type': game.current_piece_type,
-        'piece_x': game.current_piece_x,
-        'piece_y': game.current_piece_y,
-        'next_piece': game.get_next_piece(),
-        'score': game.score,
-        'level': game.level,
-        'lines': game.lines_cleared,
-        'game_over': game_over
+        'enabled': profiler.enabled,
+        'sample_rate': profiler.sample_rate,
+        'keep': profiler.keep,
+        'slowest': profiler.slowest() if request.method == 'GET' else [],
     })
 
+@app.route('/api/leaderboard/submit', methods=['POST'])
+def submit_score():
+    """終了したゲームのスコアをランキングに登録（スコアはサーバーのゲームの値を使い、AI が操作したゲームは 409）"""
+    data = request.get_json(silent=True) or {}
+    name = data.get('name', '')
+    if not isinstance(name, str) or not 0 < len(name.strip()) <= MAX_NAME_LENGTH:
+        return jsonify({'error': f'name must be 1 to {MAX_NAME_LENGTH} characters'}), 400
+    session = get_session()
+    with session.lock:
+        game = session.game
+        if not game.game_over:
+            return jsonify({'error': 'game is not over'}), 409
+        if session.autoplayed:
+            return jsonify({'error': 'games played by the AI cannot be submitted'}), 409
+        score, lines, level = game.score, game.lines_cleared, game.level
+    rank = leaderboard.submit(session.session_id, name.strip(), score, lines, level)
+    if rank is None:
+        return jsonify({'error': 'already submitted'}), 409
+    return jsonify({'rank': rank, 'score': score, 'top': leaderboard.top(10)})
+
+@app.route('/api/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """上位 limit 件（既定 10、最大 1000）を取得"""
+    limit = request.args.get('limit', 10, type=int)
+    if not 0 < limit <= 1000:
+        return jsonify({'error': 'limit must be 1 to 1000'}), 400
+    return jsonify({'entries': leaderboard.top(limit), 'total': len(leaderboard)})
+
+@app.route('/api/leaderboard/rank', methods=['GET'])
+def score_rank():
+    """スコアの順位と、その前後 around 件ずつ（既定 5、最大 50）を取得"""
+    score = request.args.get('score', type=int)
+    around = request.args.get('around', 5, type=int)
+    if score is None or not 0 <= around <= 50:
+        return jsonify({'error': 'score is required and around must be 0 to 50'}), 400
+    return jsonify({'score': score, 'rank': leaderboard.rank(score),
+                    'entries': leaderboard.around(score, around) if around else []})
+
+@app.route('/api/leaderboard/player/<name>', methods=['GET'])
+def player_rank(name):
+    """プレイヤーの最高記録とその順位を取得"""
+    best = leaderboard.player(name)
+    if best is None:
+        return jsonify({'error': 'no scores for this player'}), 404
+    return jsonify(best)
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """稼働中のセッション数とメモリ使用量を取得"""
+    stats = sessions.stats()
+    stats['gravity_timers'] = len(gravity)
+    stats['rooms'] = len(rooms)
+    stats['spectators'] = spectators.subscribers() + rooms.spectators()
+    stats['thumbnails'] = {'cached': len(thumbnails), 'hits': thumbnails.hits,
+                           'misses': thumbnails.misses}
+    stats['leaderboard'] = {'entries': len(leaderboard), 'pending': leaderboard.pending,
+                            'written': leaderboard.written}
+    return jsonify(stats)
+
 if __name__ == '__main__':
-    init_game()
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    app.run(host='0.0.0.0', port=int(os.environ.get('TETRIS_PORT', 5000)), debug=False, threaded=True)
@@ -0,0 +1,189 @@
+"""
+テトリス 静的アセット - 圧縮済み・フィンガープリント付きのアセットとページのキャッシュ
+
+起動時に ``static/`` のファイルの内容のハッシュをファイル名に入れ（``game.3f2a….js``）、
+gzip と brotli で圧縮した本文をメモリに持つ。内容が変わると URL も変わるので、
+ブラウザには1年間の immutable キャッシュを指示できる。圧縮はイメージのビルド時に
+``python assets.py`` で済ませておけば（``build/assets``）、起動時は読み込むだけになる。
+
+brotli がない環境では gzip だけを使う。
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional, Set
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+HAVE_BROTLI = brotli is not None
+
+ROOT = Path(__file__).parent
+STATIC_DIR = ROOT / 'static'
+BUILD_DIR = ROOT / 'build' / 'assets'
+MANIFEST = 'manifest.json'
+# URL prefix of fingerprinted assets
+ASSET_PREFIX = '/assets/'
+# Fingerprinted names never change content, so browsers may keep them for a year
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Preferred content encodings, best first, and their file suffixes
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class Asset(NamedTuple):
+    """圧縮済みの1ファイル（etag は内容のハッシュ、bodies は content-encoding -> 本文、'identity' は無圧縮）"""
+    name: str
+    content_type: str
+    etag: str
+    bodies: Dict[str, bytes]
+
+    def select(self, accept_encoding: str) -> str:
+        """Accept-Encoding ヘッダーから送る content-encoding を選ぶ"""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.bodies:
+                return encoding
+        return 'identity'
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Accept-Encoding ヘッダーのうち q=0 でない content-encoding の集合"""
+    accepted = set()
+    for part in header.split(','):
+        token, _, params = part.partition(';')
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if token.strip():
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+def fingerprint(data: bytes) -> str:
+    """内容のハッシュ（ファイル名と ETag に使う）"""
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    """``game.js`` -> ``game.<digest>.js``"""
+    stem, dot, suffix = name.rpartition('.')
+    return f'{stem}.{digest}.{suffix}' if dot else f'{name}.{digest}'
+
+
+def compress(data: bytes) -> Dict[str, bytes]:
+    """無圧縮・gzip・brotli の本文（小さくならない圧縮は含めない）"""
+    bodies = {'identity': data}
+    candidates = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        candidates['br'] = brotli.compress(data, quality=11)
+    for encoding, body in candidates.items():
+        if len(body) < len(data):
+            bodies[encoding] = body
+    return bodies
+
+
+def make_asset(name: str, data: bytes, content_type: Optional[str] = None,
+               bodies: Optional[Dict[str, bytes]] = None) -> Asset:
+    """本文から Asset を作る（bodies を渡せば圧縮し直さない）"""
+    if content_type is None:
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type.endswith('javascript'):
+            content_type += '; charset=utf-8'
+    return Asset(name, content_type, fingerprint(data), bodies or compress(data))
+
+
+class AssetPipeline:
+    """フィンガープリント付きのアセットと、一度だけ描画したページを保持"""
+
+    def __init__(self, static_dir: Path = STATIC_DIR, build_dir: Optional[Path] = BUILD_DIR):
+        """static_dir のファイルを読み込む（build_dir に同じ内容の圧縮済みファイルがあれば使う）"""
+        self.urls: Dict[str, str] = {}
+        self.assets: Dict[str, Asset] = {}
+        self.pages: Dict[str, Asset] = {}
+        self.prebuilt = 0
+        manifest = load_manifest(build_dir) if build_dir is not None else {}
+        for path in sorted(static_dir.iterdir()):
+            if not path.is_file():
+                continue
+            data = path.read_bytes()
+            name = fingerprinted_name(path.name, fingerprint(data))
+            bodies = None
+            if manifest.get(path.name) == name:
+                bodies = read_prebuilt(build_dir, name, data)
+                self.prebuilt += bodies is not None
+            self.urls[path.name] = ASSET_PREFIX + name
+            self.assets[name] = make_asset(name, data, bodies=bodies)
+
+    def url(self, name: str) -> str:
+        """元のファイル名からフィンガープリント付きの URL を得る"""
+        return self.urls[name]
+
+    def add_page(self, path: str, html: str) -> Asset:
+        """描画済みのページを圧縮して登録"""
+        page = make_asset(path, html.encode(), 'text/html; charset=utf-8')
+        self.pages[path] = page
+        return page
+
+
+def load_manifest(build_dir: Path) -> Dict[str, str]:
+    """ビルド済みの対応表（元のファイル名 -> フィンガープリント付きの名前）を読む"""
+    try:
+        return json.loads((build_dir / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def read_prebuilt(build_dir: Path, name: str, data: bytes) -> Optional[Dict[str, bytes]]:
+    """ビルド時に圧縮した本文を読む（brotli を使える環境でビルドされていなければ None）"""
+    bodies = {'identity': data}
+    for encoding, suffix in ENCODINGS:
+        path = build_dir / (name + suffix)
+        if path.exists():
+            bodies[encoding] = path.read_bytes()
+    if HAVE_BROTLI and 'br' not in bodies and 'gzip' in bodies:
+        return None  # built without brotli; compress again here
+    return bodies
+
+
+def build(static_dir: Path = STATIC_DIR, build_dir: Path = BUILD_DIR) -> Dict[str, str]:
+    """アセットを圧縮して build_dir に書き出し、対応表を返す"""
+    build_dir.mkdir(parents=True, exist_ok=True)
+    pipeline = AssetPipeline(static_dir, None)
+    manifest = {original: url[len(ASSET_PREFIX):] for original, url in pipeline.urls.items()}
+    for name, asset in pipeline.assets.items():
+        for encoding, suffix in ENCODINGS:
+            if encoding in asset.bodies:
+                (build_dir / (name + suffix)).write_bytes(asset.bodies[encoding])
+    (build_dir / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+def sizes(assets: Iterable[Asset]) -> Dict[str, Dict[str, int]]:
+    """アセットごとの content-encoding 別のバイト数"""
+    return {asset.name: {encoding: len(body) for encoding, body in asset.bodies.items()}
+            for asset in assets}
+
+
+def main():
+    """static/ のアセットを圧縮して書き出す（Docker イメージのビルド時に実行）"""
+    parser = argparse.ArgumentParser(description="Precompress and fingerprint static assets")
+    parser.add_argument('--out', type=Path, default=BUILD_DIR)
+    args = parser.parse_args()
+    manifest = build(STATIC_DIR, args.out)
+    pipeline = AssetPipeline(STATIC_DIR, args.out)
+    print(json.dumps({'manifest': manifest, 'sizes': sizes(pipeline.assets.values()),
+                      'brotli': HAVE_BROTLI}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
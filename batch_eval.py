@@ -0,0 +1,145 @@
+"""
+テトリス 一括盤面評価 - 多数の盤面の特徴量を NumPy でまとめて計算
+
+NumPy がない環境では同じ関数が純粋な Python 実装で動く。盤面の束は
+``stack_boards`` で作る（NumPy があれば形状 (N, 高さ, 幅) の配列、
+なければ盤面のリスト）。各関数は配列を渡せばベクトル化された結果を、
+リストを渡せば Python の list を返す。
+"""
+
+from typing import Dict, Iterable, List, Sequence, Union
+
+from game_logic import ROTATIONS, TetrisGame
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+HAVE_NUMPY = np is not None
+
+Board = Sequence[Sequence[int]]
+
+
+def _is_array(boards) -> bool:
+    return np is not None and isinstance(boards, np.ndarray)
+
+
+def stack_boards(boards: Iterable[Union[TetrisGame, Board]]):
+    """盤面（または TetrisGame）の並びを一括評価用の束にまとめる"""
+    rows = [item.board if isinstance(item, TetrisGame) else item for item in boards]
+    if np is None:
+        return [[list(row) for row in board] for board in rows]
+    return np.array([[list(row) for row in board] for board in rows], dtype=np.uint8)
+
+
+def column_heights(boards):
+    """各盤面の列の高さ（形状 (N, 幅)）"""
+    if _is_array(boards):
+        filled = boards != 0
+        height = boards.shape[1]
+        top = filled.argmax(axis=1)
+        return np.where(filled.any(axis=1), height - top, 0)
+
+    result = []
+    for board in boards:
+        height = len(board)
+        heights = [0] * len(board[0])
+        for x in range(len(heights)):
+            for y in range(height):
+                if board[y][x] != 0:
+                    heights[x] = height - y
+                    break
+        result.append(heights)
+    return result
+
+
+def holes(boards):
+    """各盤面の穴（上に埋まったセルがある空きセル）の数（形状 (N,)）"""
+    if _is_array(boards):
+        filled = boards != 0
+        covered = np.logical_or.accumulate(filled, axis=1)
+        return (covered & ~filled).sum(axis=(1, 2))
+
+    result = []
+    for board in boards:
+        count = 0
+        for x in range(len(board[0])):
+            covered = False
+            for row in board:
+                if row[x] != 0:
+                    covered = True
+                elif covered:
+                    count += 1
+        result.append(count)
+    return result
+
+
+def bumpiness(boards, heights=None):
+    """各盤面の隣り合う列の高さの差の合計（形状 (N,)）"""
+    if heights is None:
+        heights = column_heights(boards)
+    if _is_array(heights):
+        return np.abs(np.diff(heights, axis=1)).sum(axis=1)
+    return [sum(abs(a - b) for a, b in zip(row, row[1:])) for row in heights]
+
+
+def completed_rows(boards):
+    """各盤面の埋まっている行の数（形状 (N,)）"""
+    if _is_array(boards):
+        return (boards != 0).all(axis=2).sum(axis=1)
+    return [sum(1 for row in board if all(cell != 0 for cell in row)) for board in boards]
+
+
+def landing_rows(boards, piece_type: str, rotation: int = 0, heights=None):
+    """各盤面・各列にピースを上から落としたときの着地行（形状 (N, 幅 - ピース幅 + 1)）
+
+    上から真っすぐ落とすので、各列の最上段の埋まったセルで止まる。
+    置けない（盤面の上にはみ出す）列は -1。
+    """
+    state = ROTATIONS[piece_type][rotation]
+    # Lowest piece cell in each piece column
+    bottoms = [max(y for x, y in state.cells if x == dx) for dx in range(state.width)]
+    if heights is None:
+        heights = column_heights(boards)
+
+    if _is_array(heights):
+        board_height = boards.shape[1] if _is_array(boards) else len(boards[0])
+        top = board_height - heights  # first filled row per column (board_height if empty)
+        positions = heights.shape[1] - state.width + 1
+        # window[n, x, dx] = top[n, x + dx] - bottoms[dx] - 1
+        columns = np.arange(positions)[:, None] + np.arange(state.width)[None, :]
+        landing = (top[:, columns] - np.array(bottoms)[None, None, :] - 1).min(axis=2)
+        return np.where(landing >= 0, landing, -1)
+
+    result = []
+    for board, column_height in zip(boards, heights):
+        board_height = len(board)
+        row = []
+        for x in range(len(column_height) - state.width + 1):
+            landing = min(board_height - column_height[x + dx] - bottoms[dx] - 1
+                          for dx in range(state.width))
+            row.append(landing if landing >= 0 else -1)
+        result.append(row)
+    return result
+
+
+def evaluate(boards) -> Dict[str, object]:
+    """列の高さ・穴・凸凹・埋まった行をまとめて計算"""
+    heights = column_heights(boards)
+    if _is_array(heights):
+        aggregate = heights.sum(axis=1)
+    else:
+        aggregate = [sum(row) for row in heights]
+    return {
+        'heights': heights,
+        'aggregate_height': aggregate,
+        'holes': holes(boards),
+        'bumpiness': bumpiness(boards, heights),
+        'completed_rows': completed_rows(boards),
+    }
+
+
+def to_list(values) -> List:
+    """評価結果を Python の list に変換（NumPy 配列でもリストでも可）"""
+    return values.tolist() if _is_array(values) else list(values)
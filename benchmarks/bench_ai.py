@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+AI benchmark - placements evaluated per second and decision time per piece
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai import AIPlayer
+from game_logic import TetrisGame
+
+
+def run(lookahead, pieces, seed=0):
+    """Play one AI game and return (pieces, boards scored, seconds, lines, cache)."""
+    game = TetrisGame(10, 20, seed=seed)
+    player = AIPlayer(time_budget=1.0, lookahead=lookahead)
+    placed = 0
+    start = time.perf_counter()
+    while placed < pieces and player.play_piece(game):
+        placed += 1
+    elapsed = time.perf_counter() - start
+    return placed, player.evaluated, elapsed, game.lines_cleared, player.evaluations
+
+
+def main():
+    """Print placement evaluation throughput with and without lookahead."""
+    print(f"{'mode':<12}{'pieces':>8}{'placements/s':>14}{'ms/piece':>10}{'lines':>8}{'cache hit':>11}")
+    for name, lookahead, pieces in (('single', False, 500), ('lookahead', True, 200)):
+        placed, _, elapsed, lines, cache = run(lookahead, pieces)
+        placements = cache.hits + cache.misses
+        hit_rate = cache.hits / max(placements, 1)
+        print(f"{name:<12}{placed:>8}{placements / elapsed:>14,.0f}"
+              f"{elapsed / placed * 1000:>10.2f}{lines:>8}{hit_rate:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Batch evaluation benchmark - boards per second for the NumPy and pure-Python paths
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import batch_eval
+
+
+def random_boards(count, width=10, height=20, seed=0):
+    """Build ragged random boards."""
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = [[0] * width for _ in range(height)]
+        for x in range(width):
+            for y in range(height - rng.randrange(height // 2), height):
+                if rng.random() < 0.8:
+                    board[y][x] = 1
+        boards.append(board)
+    return boards
+
+
+def timed(function, boards):
+    """Return boards per second for one pass of ``function``."""
+    start = time.perf_counter()
+    function(boards)
+    return len(boards) / (time.perf_counter() - start)
+
+
+def evaluate_all(boards):
+    """Compute every feature, including landing rows for a T piece."""
+    batch_eval.evaluate(boards)
+    batch_eval.landing_rows(boards, 'T', 0)
+
+
+def main():
+    """Compare both paths on the same boards."""
+    boards = random_boards(20000)
+    print(f"python: {timed(evaluate_all, boards):>12,.0f} boards/s")
+    if batch_eval.HAVE_NUMPY:
+        stacked = batch_eval.stack_boards(boards)
+        print(f"numpy:  {timed(evaluate_all, stacked):>12,.0f} boards/s")
+    else:
+        print("numpy:  not installed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Board engine benchmark - compares TetrisGame and BitboardTetrisGame per-move cost
+
+The bitboard engine wins on moves and line scans. Writing cells directly
+(``clear``) goes through BoardRow.__setitem__ in Python and stays slower than
+the list engine's bytearray rows.
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bitboard import BitboardTetrisGame
+from game_logic import TetrisGame
+
+
+def make_game(engine):
+    """Create a game with a half-filled, ragged board."""
+    game = engine(10, 20)
+    for y in range(10, 20):
+        for x in range(10):
+            if (x + y) % 4:
+                game.board[y][x] = 1
+    game.current_piece_type = 'T'
+    game.current_piece = [(1, 0), (0, 1), (1, 1), (2, 1)]
+    game.current_piece_x = 3
+    game.current_piece_y = 5
+    return game
+
+
+def bench_moves(engine, number):
+    """Time a left/right move cycle, returning microseconds per move."""
+    game = make_game(engine)
+
+    def cycle():
+        game.move_piece_left()
+        game.move_piece_right()
+        game.move_piece_right()
+        game.move_piece_left()
+
+    seconds = min(timeit.repeat(cycle, number=number, repeat=5))
+    return seconds / (number * 4) * 1e6
+
+
+def bench_scan(engine, number):
+    """Time line detection after a lock that completes no rows."""
+    game = make_game(engine)
+    seconds = min(timeit.repeat(game._clear_lines, number=number, repeat=5))
+    return seconds / number * 1e6
+
+
+def bench_clear(engine, number):
+    """Time refilling four rows cell by cell, then clearing them."""
+    game = make_game(engine)
+
+    def clear():
+        for y in range(16, 20):
+            for x in range(10):
+                game.board[y][x] = 1
+        game._clear_lines()
+
+    seconds = min(timeit.repeat(clear, number=number, repeat=5))
+    return seconds / number * 1e6
+
+
+def bench_branch(engine, number):
+    """Time one snapshot/move/restore branch of a search."""
+    game = make_game(engine)
+    saved = game.snapshot()
+
+    def branch():
+        game.move_piece_left()
+        game.hard_drop()
+        game.snapshot()
+        game.restore(saved)
+
+    seconds = min(timeit.repeat(branch, number=number, repeat=5))
+    return seconds / number * 1e6
+
+
+def main():
+    """Run the benchmarks and print a comparison table."""
+    number = 20000
+    print(f"{'operation':<12}{'list (us)':>12}{'bitboard (us)':>16}{'speedup':>10}")
+    for name, bench in (('move', bench_moves), ('scan', bench_scan), ('clear', bench_clear),
+                        ('branch', bench_branch)):
+        base = bench(TetrisGame, number)
+        fast = bench(BitboardTetrisGame, number)
+        print(f"{name:<12}{base:>12.3f}{fast:>16.3f}{base / fast:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
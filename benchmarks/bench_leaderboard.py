@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Leaderboard benchmark - rank and top-N queries, batched versus per-score writes
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from leaderboard import Leaderboard  # noqa: E402
+
+
+def per_second(function, count):
+    """Return calls per second of ``function(i)`` for i in range(count)."""
+    start = time.perf_counter()
+    for index in range(count):
+        function(index)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    """Fill a leaderboard file and time its queries and writes."""
+    rng = random.Random(0)
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'leaderboard.db')
+        board = Leaderboard(path, batch_size=10 ** 9)
+        for index in range(entries):
+            board.submit(f'fill-{index}', f'p{index % 5000}', rng.randrange(1000000), 0, 1)
+        board.flush()
+        board.close()
+
+        start = time.perf_counter()
+        board = Leaderboard(path)
+        print(f"open ({entries:,} scores): {(time.perf_counter() - start) * 1e3:>10,.1f} ms")
+        scores = [rng.randrange(1000000) for _ in range(1000)]
+        db = sqlite3.connect(path)
+
+        print(f"rank (bisect):      {per_second(lambda i: board.rank(scores[i]), 1000):>12,.0f} /s")
+        print(f"rank (SQL COUNT):   {per_second(lambda i: db.execute('SELECT COUNT(*) FROM scores WHERE score > ?', (scores[i],)).fetchone(), 100):>12,.0f} /s")  # noqa: E501
+        print(f"top 10 (cache):     {per_second(lambda i: board.top(10), 1000):>12,.0f} /s")
+        print(f"top 10 (SQL):       {per_second(lambda i: db.execute('SELECT name, score FROM scores ORDER BY score DESC, id LIMIT 10').fetchall(), 1000):>12,.0f} /s")  # noqa: E501
+        print(f"around 5:           {per_second(lambda i: board.around(scores[i], 5), 1000):>12,.0f} /s")
+        print(f"player best:        {per_second(lambda i: board.player(f'p{i}'), 1000):>12,.0f} /s")
+
+        def submit_flushed(index):
+            board.submit(f'single-{index}', 'p', scores[index], 0, 1)
+            board.flush()
+
+        def submit_batched(index):
+            board.submit(f'batch-{index}', 'p', scores[index], 0, 1)
+            if index % 256 == 255:
+                board.flush()
+
+        print(f"submit (1 per tx):  {per_second(submit_flushed, 1000):>12,.0f} /s")
+        print(f"submit (batched):   {per_second(submit_batched, 1000):>12,.0f} /s")
+        db.close()
+        board.close()
+
+
+if __name__ == "__main__":
+    main()
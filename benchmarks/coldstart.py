@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Cold start - time from launching the server to the first byte of the page
+
+Starts the server (or any command, such as ``docker run``) several times and
+measures how long it takes until it answers ``GET /`` and then
+``GET /api/game/new``, plus the transferred size of the page and its assets.
+
+    python benchmarks/coldstart.py --spawn gunicorn --runs 5
+    python benchmarks/coldstart.py --command "docker run --rm -p 5000:5000 tetris" --runs 3
+"""
+
+import argparse
+import http.client
+import json
+import os
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+SERVERS = {
+    'dev': [sys.executable, 'app.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+}
+
+
+def get(port, path, headers=None):
+    """Return (status, headers, body) of one GET, or None if nothing is listening yet."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    try:
+        connection.request('GET', path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    except OSError:
+        return None
+    finally:
+        connection.close()
+
+
+def first_byte(port, deadline):
+    """Poll ``GET /`` until the server answers."""
+    while time.perf_counter() < deadline:
+        if get(port, '/') is not None:
+            return
+        time.sleep(0.005)
+    raise RuntimeError("server did not answer in time")
+
+
+def page_weight(port):
+    """Bytes sent for the page and its assets with and without compression."""
+    sizes = {}
+    for encoding in ('identity', 'gzip, br'):
+        total = len(get(port, '/', {'Accept-Encoding': encoding})[2])
+        html = get(port, '/')[2].decode()
+        for url in re.findall(r'(?:src|href)="(/[^"]+)"', html):
+            total += len(get(port, url, {'Accept-Encoding': encoding})[2])
+        sizes[encoding] = total
+    return sizes
+
+
+def run_once(command, port, timeout):
+    """Start the server once and return the time to first byte of / and of a new game."""
+    env = dict(os.environ, TETRIS_BIND=f'127.0.0.1:{port}', TETRIS_PORT=str(port))
+    start = time.perf_counter()
+    server = subprocess.Popen(command, cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        first_byte(port, start + timeout)
+        page = time.perf_counter() - start
+        get(port, '/api/game/new')
+        game = time.perf_counter() - start
+        return page, game
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def main():
+    """Measure the cold start several times and print the summary as JSON."""
+    parser = argparse.ArgumentParser(description="Measure server cold start and first byte")
+    parser.add_argument('--spawn', choices=sorted(SERVERS), default='gunicorn')
+    parser.add_argument('--command', help="start this command instead (e.g. docker run ...)")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    command = shlex.split(args.command) if args.command else SERVERS[args.spawn]
+    pages, games = [], []
+    for _ in range(args.runs):
+        page, game = run_once(command, args.port, args.timeout)
+        pages.append(page)
+        games.append(game)
+
+    env = dict(os.environ, TETRIS_BIND=f'127.0.0.1:{args.port}', TETRIS_PORT=str(args.port))
+    server = subprocess.Popen(command, cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        first_byte(args.port, time.perf_counter() + args.timeout)
+        weight = page_weight(args.port)
+    finally:
+        server.terminate()
+        server.wait(10)
+
+    print(json.dumps({
+        'server': args.command or args.spawn,
+        'runs': args.runs,
+        'first_byte_ms': round(statistics.median(pages) * 1e3, 1),
+        'first_byte_min_ms': round(min(pages) * 1e3, 1),
+        'first_game_ms': round(statistics.median(games) * 1e3, 1),
+        'page_bytes': weight['identity'],
+        'page_bytes_compressed': weight['gzip, br'],
+    }))
+
+
+if __name__ == "__main__":
+    main()
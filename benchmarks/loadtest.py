@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Load test - concurrent players against a running server (or one started here)
+
+Each simulated player starts a game and then sends moves and ticks as fast as
+the server answers. Uses only the standard library.
+
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --players 200
+    python benchmarks/loadtest.py --spawn dev        # start the Werkzeug dev server
+    python benchmarks/loadtest.py --spawn gunicorn   # start gunicorn -c gunicorn.conf.py
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from stats import percentile
+
+ROOT = Path(__file__).parent.parent
+ACTIONS = ('left', 'right', 'rotate', 'down')
+
+SERVERS = {
+    'dev': [sys.executable, 'app.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+}
+
+
+def player(host, port, deadline, latencies, errors, lock):
+    """Play one game until the deadline, recording each request's latency."""
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    local = []
+    failed = 0
+    try:
+        connection.request('GET', '/api/game/new?format=packed')
+        session_id = json.loads(connection.getresponse().read())['session_id']
+        step = 0
+        while time.monotonic() < deadline:
+            action = ACTIONS[step % len(ACTIONS)]
+            path = ('/api/game/tick' if step % 5 == 4 else f'/api/game/move/{action}')
+            sent = time.perf_counter()
+            connection.request('POST', f'{path}?session_id={session_id}&format=packed',
+                               headers={'Content-Length': '0'})
+            response = connection.getresponse()
+            body = response.read()
+            local.append(time.perf_counter() - sent)
+            if response.status != 200:
+                failed += 1
+            elif step % 50 == 49 and json.loads(body).get('game_over'):
+                connection.request('GET', '/api/game/new?format=packed')
+                session_id = json.loads(connection.getresponse().read())['session_id']
+            step += 1
+    except (OSError, http.client.HTTPException, ValueError):
+        failed += 1
+    finally:
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+
+def run(url, players, duration):
+    """Run the load and return a summary dict."""
+    parts = urlsplit(url)
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=player, args=(parts.hostname, parts.port or 80, deadline,
+                                              latencies, errors, lock), daemon=True)
+        for _ in range(players)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(duration + 60)
+    elapsed = time.perf_counter() - start
+    return {
+        'players': players,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'throughput': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1e3, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1e3, 2),
+    }
+
+
+def wait_for(url, timeout=15.0):
+    """Wait until the server answers /api/stats."""
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=1)
+            connection.request('GET', '/api/stats')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def main():
+    """Run the load test and print the summary as JSON."""
+    parser = argparse.ArgumentParser(description="Load-test the Tetris server")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--players', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--spawn', choices=sorted(SERVERS),
+                        help="start this server on the --url port for the test")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        port = urlsplit(args.url).port or 5000
+        env = dict(os.environ, TETRIS_BIND=f'127.0.0.1:{port}', TETRIS_PORT=str(port))
+        server = subprocess.Popen(SERVERS[args.spawn], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(args.url)
+        summary = run(args.url, args.players, args.duration)
+        summary['server'] = args.spawn or args.url
+        print(json.dumps(summary))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+
+
+if __name__ == "__main__":
+    main()
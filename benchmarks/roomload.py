@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Room load test - many versus rooms ticking on one in-process TickScheduler
+
+Creates the rooms, starts them all, and lets one scheduler thread drive every
+room timer while a second thread plays moves and hard drops for all players
+(so garbage is sent and applied). Reports how late the room ticks ran.
+
+    python benchmarks/roomload.py --rooms 300 --players 2 --level 10 --duration 10
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bitboard import BitboardTetrisGame  # noqa: E402
+from game_logic import TetrisGame  # noqa: E402
+from rooms import RoomManager  # noqa: E402
+from scheduler import TickScheduler  # noqa: E402
+from sessions import SessionManager  # noqa: E402
+from stats import percentile  # noqa: E402
+
+ENGINES = {'list': TetrisGame, 'bitboard': BitboardTetrisGame}
+ACTIONS = ('left', 'right', 'rotate', 'down', 'left', 'right', 'drop')
+
+
+def timed(room, lags):
+    """Wrap the room tick to record how late it ran."""
+    def tick():
+        due = room._due
+        if due is not None:
+            lags.append(max(0.0, time.monotonic() - due))
+        return room.tick()
+    return tick
+
+
+def play(players, deadline, rate, counter):
+    """Send random inputs to every player at ``rate`` inputs per player per second."""
+    rng = random.Random(0)
+    interval = 1.0 / (rate * len(players))
+    next_input = time.monotonic()
+    while time.monotonic() < deadline:
+        session = rng.choice(players)
+        with session.lock:
+            if not session.paused and not session.game.game_over:
+                session.apply(rng.choice(ACTIONS))
+                session.mark_changed()
+                counter[0] += 1
+        next_input += interval
+        delay = next_input - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run(rooms, size, level, duration, rate, engine):
+    """Run the rooms for ``duration`` seconds and return a summary dict."""
+    scheduler = TickScheduler()
+    sessions = SessionManager(lambda: engine(10, 20), capacity=rooms * size + 1,
+                              engine=engine)
+    manager = RoomManager(sessions, scheduler, engine=engine)
+    lags = []
+    players = []
+    created = []
+    for _ in range(rooms):
+        room = manager.create(size)
+        for _ in range(size):
+            session = manager.join(room)
+            session.game.level = level
+            players.append(session)
+        # Replace the room timer with one that records its lag
+        scheduler.schedule(('room', room.room_id), room._due - time.monotonic(),
+                           timed(room, lags))
+        created.append(room)
+    # Joining started the scheduler thread; restart it for the measured run
+    scheduler.stop()
+
+    counter = [0]
+    deadline = time.monotonic() + duration
+    scheduler.start()
+    try:
+        play(players, deadline, rate, counter)
+    finally:
+        scheduler.stop()
+
+    return {
+        'rooms': rooms,
+        'players': len(players),
+        'level': level,
+        'engine': engine.__name__,
+        'room_ticks': len(lags),
+        'inputs': counter[0],
+        'finished': sum(room.finished for room in created),
+        'lag_p50_ms': round(percentile(lags, 0.5) * 1e3, 2),
+        'lag_p99_ms': round(percentile(lags, 0.99) * 1e3, 2),
+        'lag_max_ms': round(max(lags, default=0.0) * 1e3, 2),
+    }
+
+
+def main():
+    """Run the room load test and print the summary as JSON."""
+    parser = argparse.ArgumentParser(description="Load-test versus rooms on one scheduler")
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--players', type=int, default=2, help="players per room")
+    parser.add_argument('--level', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--rate', type=float, default=5.0,
+                        help="inputs per player per second")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='list')
+    args = parser.parse_args()
+    print(json.dumps(run(args.rooms, args.players, args.level, args.duration,
+                         args.rate, ENGINES[args.engine])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Spectator fan-out - one game streamed to many local subscriber threads
+
+A player thread changes the game at a fixed rate while the subscribers read the
+shared frames of its spectator channel. Some subscribers can be made slow
+(they sleep after each frame) to show them skipping to the latest frame.
+Reports how many frames were encoded versus delivered and the delay from a
+change to its delivery.
+
+    python benchmarks/spectators.py --subscribers 2000 --rate 60 --duration 5
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import metrics  # noqa: E402
+from broadcast import Broadcast, sse_event  # noqa: E402
+from game_logic import TetrisGame  # noqa: E402
+from protocol import pack_cells  # noqa: E402
+from sessions import GameSession  # noqa: E402
+from stats import percentile  # noqa: E402
+
+ACTIONS = ('left', 'right', 'rotate', 'down', 'tick')
+
+
+def frame(session):
+    """Encode a full packed snapshot of the game, as the server does for spectators."""
+    with session.lock:
+        game = session.game
+        return sse_event({
+            'version': session.version,
+            'board': pack_cells(b''.join(game.board_view())),
+            'piece': game.get_current_piece(),
+            'piece_x': game.current_piece_x,
+            'piece_y': game.current_piece_y,
+            'score': game.score,
+        })
+
+
+def run(subscribers, rate, duration, slow, slow_delay):
+    """Stream one game to the subscribers and return a summary dict."""
+    session = GameSession('bench', TetrisGame(10, 20, seed=1), time.monotonic())
+    channel = Broadcast(lambda: frame(session))
+    session.broadcasts.append(channel)
+    changed_at = {}
+    delays = []
+    received = [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def subscriber(delay):
+        local = []
+        count = 0
+        for current in channel.frames(keepalive=0.5):
+            if stop.is_set():
+                break
+            if current is None:
+                continue
+            at = changed_at.get(current.version)
+            if at is not None:
+                local.append(time.perf_counter() - at)
+            count += 1
+            if delay:
+                time.sleep(delay)
+        with lock:
+            delays.extend(local)
+            received[0] += count
+
+    threads = [threading.Thread(target=subscriber, daemon=True,
+                                args=(slow_delay if index < slow else 0.0,))
+               for index in range(subscribers)]
+    for thread in threads:
+        thread.start()
+    while channel.subscribers < subscribers:
+        time.sleep(0.01)
+
+    start = session.game.snapshot()
+    rng = random.Random(0)
+    changes = 0
+    interval = 1.0 / rate
+    deadline = time.monotonic() + duration
+    next_change = time.monotonic()
+    while time.monotonic() < deadline:
+        with session.lock:
+            if session.game.game_over:
+                session.game.restore(start)
+            session.apply(rng.choice(ACTIONS))
+            session.mark_changed()
+            changed_at[channel.version] = time.perf_counter()
+        changes += 1
+        next_change += interval
+        pause = next_change - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+    stop.set()
+    channel.close()
+    for thread in threads:
+        thread.join(5.0)
+
+    return {
+        'subscribers': subscribers,
+        'slow_subscribers': slow,
+        'changes': changes,
+        'frames_encoded': int(metrics.broadcast_frames.value()),
+        'frames_delivered': received[0],
+        'frames_skipped': int(metrics.broadcast_skipped.value()),
+        'delivery_p50_ms': round(percentile(delays, 0.5) * 1e3, 2),
+        'delivery_p99_ms': round(percentile(delays, 0.99) * 1e3, 2),
+    }
+
+
+def main():
+    """Run the fan-out benchmark and print the summary as JSON."""
+    parser = argparse.ArgumentParser(description="Benchmark spectator fan-out")
+    parser.add_argument('--subscribers', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=30.0, help="game changes per second")
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--slow', type=int, default=0, help="subscribers that read slowly")
+    parser.add_argument('--slow-delay', type=float, default=0.2,
+                        help="seconds a slow subscriber spends on each frame")
+    args = parser.parse_args()
+    print(json.dumps(run(args.subscribers, args.rate, args.duration, args.slow,
+                         args.slow_delay)))
+
+
+if __name__ == "__main__":
+    main()
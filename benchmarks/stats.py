@@ -0,0 +1,11 @@
+"""
+Shared statistics for the benchmark scripts
+"""
+
+from typing import Iterable
+
+
+def percentile(samples: Iterable[float], fraction: float) -> float:
+    """Nearest-rank percentile of the samples (0.0 when there are none)."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite - game logic, server and renderer hot paths with baseline comparison
+
+Each benchmark reports named metrics. Results are written as JSON and can be
+compared against a stored baseline; any metric that is worse than the
+baseline by more than the tolerance is reported as a regression and the
+process exits with status 1.
+
+    python benchmarks/suite.py                          # run and compare with baseline.json
+    python benchmarks/suite.py --output results.json    # also write the results
+    python benchmarks/suite.py --runs 3 --save-baseline # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from stats import percentile  # noqa: E402
+
+BASELINE = Path(__file__).parent / 'baseline.json'
+
+Metrics = Dict[str, Dict[str, object]]
+
+
+def metric(value: float, unit: str, better: str, gate: bool = True) -> Dict[str, object]:
+    """Build one metric entry (better is 'higher' or 'lower').
+
+    Metrics with ``gate`` False are reported but never count as regressions
+    (tail latencies of a few samples are too noisy to compare).
+    """
+    entry = {'value': round(value, 3), 'unit': unit, 'better': better}
+    if not gate:
+        entry['gate'] = False
+    return entry
+
+
+def ops_per_second(operation: Callable[[], object], setup: Callable[[], object],
+                   number: int, repeat: int = 5) -> float:
+    """Best-of-repeat rate of operation(); setup() runs before each timed batch."""
+    best = float('inf')
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        best = min(best, time.perf_counter() - start)
+    return number / best
+
+
+# -- game logic ----------------------------------------------------------------
+
+def dense_game(engine, seed=0):
+    """A game whose lower half is filled except for one hole per row."""
+    game = engine(10, 20, seed=seed)
+    for y in range(10, 20):
+        for x in range(10):
+            if x != y % 10:
+                game.board[y][x] = 1
+    return game
+
+
+def bench_game(quick: bool) -> Metrics:
+    """TetrisGame operations per second for both board engines."""
+    from bitboard import BitboardTetrisGame
+    from game_logic import TetrisGame
+
+    number = 2000 if quick else 20000
+    results: Metrics = {}
+    for name, engine in (('list', TetrisGame), ('bitboard', BitboardTetrisGame)):
+        game = dense_game(engine)
+        saved = game.snapshot()
+
+        def restore():
+            game.restore(saved)
+
+        def shift():
+            game.move_piece_left()
+            game.move_piece_right()
+
+        def drop_and_restore():
+            game.hard_drop()
+            game.restore(saved)
+
+        def refill_and_clear():
+            row = game.board[19]
+            for x in range(10):
+                row[x] = 1
+            game._clear_lines()
+
+        rates = {
+            'move': ops_per_second(shift, restore, number) * 2,
+            'rotate': ops_per_second(game.rotate_piece, restore, number),
+            'hard_drop+restore': ops_per_second(drop_and_restore, restore, number // 4),
+            'clear_lines_scan': ops_per_second(game._clear_lines, restore, number),
+            'clear_lines_one': ops_per_second(refill_and_clear, restore, number // 4),
+            'spawn': ops_per_second(game.spawn_next_piece, restore, number),
+        }
+        for operation, rate in rates.items():
+            results[f'game.{name}.{operation}'] = metric(rate, 'ops/s', 'higher')
+    return results
+
+
+# -- server --------------------------------------------------------------------
+
+def bench_server(quick: bool) -> Metrics:
+    """Flask test-client throughput and latency for the tick and move routes."""
+    from app import app
+
+    app.config['TESTING'] = True
+    requests = 200 if quick else 2000
+    results: Metrics = {}
+    with app.test_client() as client:
+        for name, route in (('tick', '/api/game/tick'), ('move', '/api/game/move/left')):
+            latencies = []
+            elapsed = 0.0
+            for i in range(requests):
+                if i % 50 == 0:
+                    # Start a fresh game regularly so ticks never reach game over
+                    session_id = client.get('/api/game/new').get_json()['session_id']
+                    url = f'{route}?session_id={session_id}&format=packed'
+                sent = time.perf_counter()
+                client.post(url)
+                latency = time.perf_counter() - sent
+                latencies.append(latency)
+                elapsed += latency
+
+            results[f'server.{name}.throughput'] = metric(requests / elapsed, 'req/s', 'higher')
+            results[f'server.{name}.p50'] = metric(percentile(latencies, 0.5) * 1e3, 'ms', 'lower')
+            results[f'server.{name}.p99'] = metric(percentile(latencies, 0.99) * 1e3, 'ms', 'lower',
+                                                   gate=False)
+    return results
+
+
+# -- renderer ------------------------------------------------------------------
+
+def bench_renderer(quick: bool) -> Metrics:
+    """GameRenderer.draw frame time under the dummy SDL video driver."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from game_logic import TetrisGame
+    from renderer import GameRenderer
+
+    pygame.init()
+    renderer = GameRenderer(10, 20, 30, surface=pygame.Surface((500, 640)))
+    game = dense_game(TetrisGame)
+    frames = 500 if quick else 5000
+    results: Metrics = {}
+
+    scenarios = {
+        'idle': lambda i: None,
+        'move': lambda i: game.move_piece_left() if i % 2 else game.move_piece_right(),
+        'full': lambda i: renderer.invalidate(),
+    }
+    for name, step in scenarios.items():
+        renderer.invalidate()
+        renderer.draw(game)
+        samples = []
+        for i in range(frames):
+            step(i)
+            start = time.perf_counter()
+            renderer.draw(game)
+            samples.append(time.perf_counter() - start)
+        # Frames take microseconds, so the median is compared rather than the noisy mean
+        results[f'renderer.{name}.p50'] = metric(percentile(samples, 0.5) * 1e6, 'us', 'lower')
+        results[f'renderer.{name}.p99'] = metric(percentile(samples, 0.99) * 1e6, 'us', 'lower',
+                                                 gate=False)
+    pygame.quit()
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[bool], Metrics]] = {
+    'game': bench_game,
+    'server': bench_server,
+    'renderer': bench_renderer,
+}
+
+
+def calibrate(repeat: int = 5) -> float:
+    """Speed of this machine right now: best-of-repeat rate of a fixed pure-Python loop."""
+    def workload():
+        total = 0
+        for i in range(20000):
+            total += i * i % 7
+        return total
+
+    return ops_per_second(workload, lambda: None, 20, repeat)
+
+
+def compare(results: Metrics, baseline: Metrics, tolerance: float,
+            speed: float = 1.0) -> List[str]:
+    """List the metrics that are worse than the baseline by more than tolerance.
+
+    ``speed`` is this run's calibration rate divided by the baseline's, so a
+    uniformly slower (or busier) machine does not count as a regression.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None or not base['value'] or not current.get('gate', True):
+            continue
+        if current['better'] == 'lower':
+            change = base['value'] / (current['value'] * speed) - 1
+        else:
+            change = current['value'] / (base['value'] * speed) - 1
+        if change < -tolerance:
+            regressions.append(f"{name}: {current['value']} {current['unit']} "
+                               f"(baseline {base['value']}, {change:+.0%})")
+    return regressions
+
+
+def main():
+    """Run the suite, print the results and compare them with the baseline."""
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument('benchmarks', nargs='*',
+                        help=f"any of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--quick', action='store_true', help="fewer iterations (smoke test)")
+    parser.add_argument('--runs', type=int, default=1,
+                        help="run the suite this many times and keep each metric's median")
+    parser.add_argument('--output', type=Path, help="write the results as JSON")
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="write the results to the baseline file instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=0.4,
+                        help="allowed slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(sorted(unknown))}")
+
+    runs: List[Metrics] = []
+    calibrations = []
+    for _ in range(args.runs):
+        run: Metrics = {}
+        for name in args.benchmarks or BENCHMARKS:
+            run.update(BENCHMARKS[name](args.quick))
+        runs.append(run)
+        calibrations.append(calibrate())
+    # Median of the runs for every metric, which damps noise from busy machines
+    results = {
+        name: dict(entry, value=statistics.median(run[name]['value'] for run in runs))
+        for name, entry in runs[0].items()
+    }
+    calibration = statistics.median(calibrations)
+
+    for name, entry in results.items():
+        print(f"{name:<36}{entry['value']:>14,.3f} {entry['unit']}")
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'quick': args.quick,
+            'runs': args.runs,
+            'calibration': round(calibration, 3),
+        },
+        'metrics': results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n')
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + '\n')
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+        return
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; run with --save-baseline", file=sys.stderr)
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    speed = calibration / baseline['meta'].get('calibration', calibration)
+    print(f"machine speed vs baseline: {speed:.2f}x", file=sys.stderr)
+    regressions = compare(results, baseline['metrics'], args.tolerance, speed)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nno regressions beyond {args.tolerance:.0%} against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
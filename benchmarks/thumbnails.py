@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Thumbnail rendering - request threads asking for board thumbnails of many games
+
+A few games change at a fixed rate while request threads ask for the thumbnail
+of a random game, as a lobby or spectator list would. Reports the cache hit
+rate, the request latency and how long a render blocks its request thread
+(only the key and the snapshot when rendering in worker processes).
+
+    python benchmarks/thumbnails.py --games 50 --threads 16 --duration 5
+    python benchmarks/thumbnails.py --inline     # render on the request threads instead
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from game_logic import TetrisGame  # noqa: E402
+from stats import percentile  # noqa: E402
+from thumbnails import ThumbnailService  # noqa: E402
+
+
+class InlineExecutor:
+    """Runs renders on the calling thread, for comparison."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def run(games, threads, rate, duration, workers, inline):
+    """Change games and request thumbnails for ``duration`` seconds."""
+    service = ThumbnailService(workers=workers, executor=InlineExecutor() if inline else None)
+    boards = [(TetrisGame(seed=seed), threading.Lock()) for seed in range(games)]
+    # Start the worker processes before timing
+    service.request(TetrisGame(seed=games))[1].result()
+    stop = threading.Event()
+    latencies, held = [], []
+
+    def player():
+        rng = random.Random(0)
+        while not stop.is_set():
+            game, lock = rng.choice(boards)
+            with lock:
+                if game.game_over:
+                    game.restore(TetrisGame(seed=rng.randrange(1 << 30)).snapshot())
+                rng.choice((game.move_piece_left, game.move_piece_right, game.tick))()
+            time.sleep(1 / rate)
+
+    def requester(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            game, lock = rng.choice(boards)
+            start = time.perf_counter()
+            with lock:
+                _, future = service.request(game)
+            held.append(time.perf_counter() - start)
+            future.result()
+            latencies.append(time.perf_counter() - start)
+
+    pool = [threading.Thread(target=player)] + [
+        threading.Thread(target=requester, args=(seed,)) for seed in range(threads)]
+    for thread in pool:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in pool:
+        thread.join()
+    service.close()
+    return {
+        'mode': 'inline' if inline else f'{workers} worker processes',
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / duration),
+        'hit_rate': round(service.hits / max(1, service.hits + service.misses), 3),
+        'renders': service.misses,
+        'latency_ms': {'p50': round(percentile(latencies, 0.5) * 1000, 2),
+                       'p99': round(percentile(latencies, 0.99) * 1000, 2)},
+        'lock_held_ms': {'p50': round(percentile(held, 0.5) * 1000, 3),
+                         'p99': round(percentile(held, 0.99) * 1000, 3)},
+    }
+
+
+def main():
+    """Run the thumbnail benchmark and print the summary as JSON."""
+    parser = argparse.ArgumentParser(description="Benchmark board thumbnails")
+    parser.add_argument('--games', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=16, help="request threads")
+    parser.add_argument('--rate', type=float, default=60.0, help="game changes per second")
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--workers', type=int, default=2, help="render processes")
+    parser.add_argument('--inline', action='store_true', help="render on the request threads")
+    args = parser.parse_args()
+    print(json.dumps(run(args.games, args.threads, args.rate, args.duration, args.workers,
+                         args.inline), indent=2))
+
+
+if __name__ == "__main__":
+    main()
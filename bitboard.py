@@ -0,0 +1,182 @@
+"""
+テトリス ビットボードエンジン - 行ごとの整数ビットマスクで盤面を保持
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from game_logic import PIECE_IDS, ROTATIONS, TetrisGame
+
+# Row masks remembered per game for restores (search trees revisit the same rows)
+ROW_MASK_CACHE = 4096
+# Maps every non-empty cell value to '1' and empty to '0', for row masks in C
+_MASK_DIGITS = bytes.maketrans(bytes(range(256)), b'0' + b'1' * 255)
+
+
+def row_mask(cells) -> int:
+    """行の占有ビットマスク（列 x が埋まっていればビット x が 1）"""
+    return int(cells.translate(_MASK_DIGITS)[::-1], 2) if cells else 0
+
+
+class BoardRow(bytearray):
+    """占有ビットマスクを併せ持つボード行。
+
+    セルの値（ピースID）は通常の bytearray として保持し、書き込みのたびに
+    ``mask`` のビット x（列 x が埋まっていれば 1）を更新する。
+    ``owner`` が設定されていれば、そのゲームの盤面マスクと列の高さを無効化する。
+    セルへの直接の書き込みは Python で処理するため bytearray より遅い（エンジン内の
+    ピースの固定とライン消去はこのメソッドを通らない）。
+    """
+
+    __slots__ = ('mask', 'owner')
+
+    def __init__(self, cells=(), owner: Optional['BitboardTetrisGame'] = None,
+                 mask: Optional[int] = None):
+        """行を生成（mask を渡せば計算し直さない）"""
+        bytearray.__init__(self, cells)
+        self.owner = owner
+        self.mask = row_mask(self) if mask is None else mask
+
+    def __setitem__(self, index, value):
+        bytearray.__setitem__(self, index, value)
+        if index.__class__ is int:
+            if index < 0:
+                index += len(self)
+            if value:
+                self.mask |= 1 << index
+            else:
+                self.mask &= ~(1 << index)
+        else:
+            self.mask = row_mask(self)
+        owner = self.owner
+        if owner is not None:
+            owner._occupancy = None
+            owner._heights = None
+
+
+class BitboardTetrisGame(TetrisGame):
+    """行ビットマスクで衝突判定とライン消去を行う TetrisGame。
+
+    ``board`` は従来どおり ``board[y][x]`` でピースIDを読み書きできる
+    （各行は :class:`BoardRow`）。盤面全体の占有状態は
+    ビット ``y * width + x`` を持つ1つの整数にまとめ、衝突判定は
+    ピースマスクとの AND 1回、ライン判定と行の詰め直しは行マスクの比較で行う。
+    """
+
+    def __init__(self, width: int = 10, height: int = 20,
+                 seed: Optional[int] = None, randomizer: str = 'uniform'):
+        """ゲームボードと状態を初期化"""
+        self.full_mask = (1 << width) - 1
+        self._occupancy: Optional[int] = 0
+        # Row content -> occupancy mask, so restores do not recompute masks of seen rows
+        self._row_masks: Dict[bytes, int] = {}
+        # Board-coordinate piece masks per rotation, derived from the shared rotation table
+        self._piece_masks: Dict[str, Tuple[int, ...]] = {
+            piece_type: tuple(
+                sum(row_mask << (dy * width) for dy, row_mask in enumerate(state.row_masks))
+                for state in states
+            )
+            for piece_type, states in ROTATIONS.items()
+        }
+        super().__init__(width, height, seed, randomizer)
+
+    def _empty_row(self) -> BoardRow:
+        """空のボード行を生成"""
+        return BoardRow(bytes(self.width), self, 0)
+
+    def _restore_row(self, row: bytes) -> BoardRow:
+        """スナップショットの行から書き換え可能なボード行を生成（行マスクは内容ごとに覚えておく）"""
+        masks = self._row_masks
+        mask = masks.get(row)
+        if mask is None:
+            if len(masks) >= ROW_MASK_CACHE:
+                masks.clear()
+            mask = masks[row] = row_mask(row)
+        return BoardRow(row, self, mask)
+
+    def restore(self, snapshot) -> None:
+        """スナップショットの状態に戻す"""
+        super().restore(snapshot)
+        self._occupancy = None
+
+    def _get_occupancy(self) -> int:
+        """盤面全体の占有マスクを取得（行への直接書き込み後は再計算）"""
+        occupancy = self._occupancy
+        if occupancy is None:
+            occupancy = 0
+            for y, row in enumerate(self.board):
+                occupancy |= row.mask << (y * self.width)
+            self._occupancy = occupancy
+        return occupancy
+
+    def _fits(self, piece_type: str, rotation: int, x: int, y: int) -> bool:
+        """回転テーブルを使ってピースの位置が有効かチェック"""
+        state = ROTATIONS[piece_type][rotation]
+        if x < 0 or x + state.width > self.width or y + state.height > self.height:
+            return False
+
+        if y < 0:
+            # Cells above the board never collide; check the visible rows one by one
+            board = self.board
+            for dy, piece_row in enumerate(state.row_masks):
+                if y + dy >= 0 and board[y + dy].mask & (piece_row << x):
+                    return False
+            return True
+
+        occupancy = self._occupancy
+        if occupancy is None:
+            occupancy = self._get_occupancy()
+        return not occupancy & (self._piece_masks[piece_type][rotation] << (y * self.width + x))
+
+    def drop_distance(self) -> int:
+        """落下中のピースをそのまま落とせる行数（1行ずつずらしたピースマスクとの AND で求める）"""
+        if self.current_piece_type is None or self.piece_locked or self.current_piece_y < 0:
+            return super().drop_distance()
+        state = ROTATIONS[self.current_piece_type][self.current_rotation]
+        occupancy = self._occupancy
+        if occupancy is None:
+            occupancy = self._get_occupancy()
+        width = self.width
+        mask = self._piece_masks[self.current_piece_type][self.current_rotation] << (
+            self.current_piece_y * width + self.current_piece_x)
+        limit = self.height - state.height - self.current_piece_y
+        distance = 0
+        while distance < limit:
+            mask <<= width
+            if occupancy & mask:
+                break
+            distance += 1
+        return distance
+
+    def _lock_piece(self) -> None:
+        """Lock the current piece in place on the board."""
+        piece_id = PIECE_IDS[self.current_piece_type]
+        set_cell = bytearray.__setitem__
+        occupancy = self._get_occupancy()
+        heights = self._heights
+
+        for block_x, block_y in self.current_piece:
+            board_x = self.current_piece_x + block_x
+            board_y = self.current_piece_y + block_y
+
+            if 0 <= board_y < self.height and 0 <= board_x < self.width:
+                row = self.board[board_y]
+                set_cell(row, board_x, piece_id)
+                row.mask |= 1 << board_x
+                occupancy |= 1 << (board_y * self.width + board_x)
+                if heights is not None and self.height - board_y > heights[board_x]:
+                    heights[board_x] = self.height - board_y
+
+        self._occupancy = occupancy
+        self._clear_lines()
+
+    def _clear_lines(self, rows: Optional[List[int]] = None) -> None:
+        """完了したラインをチェックしてクリア（行マスクの比較だけなので常に全行を調べる）"""
+        full_mask = self.full_mask
+        kept = [row for row in self.board if row.mask != full_mask]
+        num_lines = self.height - len(kept)
+
+        if num_lines:
+            self.board[:] = [self._empty_row() for _ in range(num_lines)] + kept
+            self._occupancy = None
+            self._heights = None
+            self._award_lines(num_lines)
@@ -0,0 +1,174 @@
+"""
+テトリス 観戦配信 - 状態の変化ごとに1回だけエンコードしたフレームを全観戦者に配る
+"""
+
+import json
+import secrets
+import threading
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+import metrics
+
+
+def sse_event(payload: object) -> bytes:
+    """JSON にできる値を Server-Sent Events の1イベント分のバイト列にする"""
+    return b'data: ' + json.dumps(payload, separators=(',', ':')).encode() + b'\n\n'
+
+
+class Frame(NamedTuple):
+    """エンコード済みの1フレーム（version はチャンネル内の通し番号）"""
+    version: int
+    data: bytes
+
+
+class Broadcast:
+    """1つのゲーム（またはルーム）の観戦チャンネル。
+
+    配信元は状態が変わるたびに :meth:`notify` でバージョンを進めるだけで、
+    エンコードはしない。観戦者が新しいバージョンを取りに来たときに最初の1人だけが
+    ``render`` でフレームを作り、同じバイト列を全員で共有する。観戦者ごとの
+    キューは持たず、遅い観戦者は次に取りに来たときに最新のフレームまで飛ばす。
+
+    ロックの順序は「エンコード用ロック -> 配信元のロック（render 内） -> ``_cond``」。
+    :meth:`notify` は配信元のロック保持中に呼んでよい。
+    """
+
+    def __init__(self, render: Callable[[], bytes], alive: Callable[[], bool] = lambda: True):
+        """チャンネルを初期化（render はフレームのバイト列を返す、alive が False になると終了）"""
+        self.render = render
+        self.alive = alive
+        self.version = 1
+        self.closed = False
+        self.subscribers = 0
+        self._frame: Optional[Frame] = None
+        self._cond = threading.Condition()
+        self._encode_lock = threading.Lock()
+
+    def notify(self) -> None:
+        """状態が変わったことを観戦者に知らせる"""
+        with self._cond:
+            self.version += 1
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """チャンネルを閉じて観戦者のストリームを終わらせる"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def latest(self) -> Frame:
+        """最新バージョンのフレームを取得（まだなければここで1回だけエンコード）"""
+        with self._cond:
+            frame = self._frame
+            if frame is not None and frame.version == self.version:
+                return frame
+        with self._encode_lock:
+            with self._cond:
+                version = self.version
+                frame = self._frame
+            if frame is not None and frame.version == version:
+                return frame  # encoded by the subscriber we waited for
+            frame = Frame(version, self.render())
+            metrics.broadcast_frames.inc()
+            with self._cond:
+                if self._frame is None or self._frame.version < version:
+                    self._frame = frame
+        return frame
+
+    def wait(self, after: int, timeout: Optional[float] = None) -> Optional[Frame]:
+        """バージョン ``after`` より新しいフレームを待って返す（タイムアウトか終了で None）"""
+        with self._cond:
+            if self.version == after and not self.closed:
+                self._cond.wait(timeout)
+            if self.closed or self.version == after:
+                return None
+        return self.latest()
+
+    def frames(self, keepalive: Optional[float] = None) -> Iterator[Optional[Frame]]:
+        """最新のフレームを順に返す観戦者用のイテレーター
+
+        最初に現在のフレームを返し、以降は変化のたびに最新のフレームを返す
+        （途中のバージョンは飛ばす）。``keepalive`` 秒変化がなければ None を返す。
+        チャンネルが閉じるか ``alive()`` が False になると終わる。
+        """
+        with self._cond:
+            self.subscribers += 1
+        try:
+            frame = self.latest()
+            while True:
+                yield frame
+                sent = frame.version
+                while True:
+                    frame = self.wait(sent, keepalive)
+                    if self.closed or not self.alive():
+                        return
+                    if frame is not None:
+                        break
+                    yield None
+                if frame.version > sent + 1:
+                    metrics.broadcast_skipped.inc(amount=frame.version - sent - 1)
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+
+class BroadcastHub:
+    """観戦IDから観戦チャンネルを引く表。
+
+    観戦IDはセッションIDとは別に発行する（セッションIDを知るとゲームを操作できるため）。
+    """
+
+    def __init__(self):
+        """表を初期化"""
+        self._channels: Dict[str, Broadcast] = {}
+        self._ids: Dict[str, str] = {}
+        self._keys: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def open(self, key: str, render: Callable[[], bytes],
+             alive: Callable[[], bool] = lambda: True) -> Tuple[str, Broadcast, bool]:
+        """キー（セッションIDなど）の観戦チャンネルを取得または作成
+
+        (観戦ID, チャンネル, 新しく作ったか) を返す。
+        """
+        self.prune()
+        with self._lock:
+            watch_id = self._ids.get(key)
+            if watch_id is not None:
+                return watch_id, self._channels[watch_id], False
+            watch_id = secrets.token_urlsafe(8)
+            while watch_id in self._channels:
+                watch_id = secrets.token_urlsafe(8)
+            channel = Broadcast(render, alive)
+            self._ids[key] = watch_id
+            self._keys[watch_id] = key
+            self._channels[watch_id] = channel
+        return watch_id, channel, True
+
+    def key_of(self, watch_id: str) -> Optional[str]:
+        """観戦IDのキー（セッションIDなど）を取得"""
+        return self._keys.get(watch_id)
+
+    def get(self, watch_id: str) -> Optional[Broadcast]:
+        """観戦IDのチャンネルを取得"""
+        channel = self._channels.get(watch_id)
+        return None if channel is None or channel.closed else channel
+
+    def subscribers(self) -> int:
+        """全チャンネルの観戦者数"""
+        with self._lock:
+            return sum(channel.subscribers for channel in self._channels.values())
+
+    def prune(self) -> int:
+        """閉じたか配信元がなくなったチャンネルを破棄し、破棄した数を返す"""
+        with self._lock:
+            done = [(key, watch_id) for key, watch_id in self._ids.items()
+                    if self._channels[watch_id].closed or not self._channels[watch_id].alive()]
+            for key, watch_id in done:
+                del self._ids[key]
+                del self._keys[watch_id]
+                self._channels.pop(watch_id).close()
+        return len(done)
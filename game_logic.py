@@ -2,9 +2,11 @@
 テトリスゲームロジック - コアゲーム機構
 """
 
+import operator
 import random
+import secrets
 from collections import deque
-from typing import List, Tuple, Optional
+from typing import Dict, List, NamedTuple, Tuple, Optional
 
 # テトリスピース (Tetrominoes)
 PIECES = {
@@ -17,29 +19,167 @@ PIECES = {
     'L': {'shape': [(2, 0), (0, 1), (1, 1), (2, 1)], 'color': (255, 165, 0)},
 }
 
+
+PIECE_TYPES = tuple(PIECES)
+
+# 盤面のセル値: 0 は空、1〜7 はピースの種類（PIECE_TYPES の順）、8 は対戦のおじゃま行
+EMPTY = 0
+PIECE_IDS: Dict[str, int] = {piece_type: i for i, piece_type in enumerate(PIECE_TYPES, 1)}
+GARBAGE = len(PIECE_TYPES) + 1
+# セル値 -> 色
+PALETTE: Tuple[Tuple[int, int, int], ...] = ((0, 0, 0),) + tuple(
+    PIECES[piece_type]['color'] for piece_type in PIECE_TYPES
+) + ((128, 128, 128),)
+
+# ピースの出し方: 'uniform' は毎回7種から等確率、'bag' は7種を1巡ずつシャッフルして出す
+RANDOMIZERS = ('uniform', 'bag')
+
+# 操作名 -> TetrisGame のメソッド名（シミュレーション・リプレイ・サーバーで共通）
+ACTIONS: Dict[str, str] = {
+    'left': 'move_piece_left',
+    'right': 'move_piece_right',
+    'down': 'move_piece_down',
+    'rotate': 'rotate_piece',
+    'drop': 'hard_drop',
+    'tick': 'tick',
+}
+
+# 重力: レベル1で0.5秒/行、レベルごとに15%ずつ速くなる（下限0.05秒）
+BASE_DROP_INTERVAL = 0.5
+MIN_DROP_INTERVAL = 0.05
+
+
+def drop_interval(level: int) -> float:
+    """レベルに応じた自動落下の間隔（秒）を取得"""
+    return max(MIN_DROP_INTERVAL, BASE_DROP_INTERVAL * 0.85 ** (level - 1))
+
+
+class Rotation(NamedTuple):
+    """ピースの回転状態（インポート時に一度だけ計算）"""
+    cells: Tuple[Tuple[int, int], ...]
+    width: int
+    height: int
+    row_masks: Tuple[int, ...]  # row_masks[dy] has bit x set for each cell (x, dy)
+    bottoms: Tuple[int, ...]  # bottoms[dx] is the lowest dy of the cells in column dx
+
+
+def _rotate_cells(piece: Tuple[Tuple[int, int], ...]) -> Tuple[Tuple[int, int], ...]:
+    """ピースを90度時計回りに回転"""
+    rotated = [(-y, x) for x, y in piece]
+    # Normalize to positive coordinates
+    min_x = min(x for x, y in rotated)
+    min_y = min(y for x, y in rotated)
+    # Sort to maintain consistent ordering
+    return tuple(sorted((x - min_x, y - min_y) for x, y in rotated))
+
+
+def _make_rotation(cells: Tuple[Tuple[int, int], ...]) -> Rotation:
+    """セル座標から回転状態を構築"""
+    width = max(x for x, y in cells) + 1
+    height = max(y for x, y in cells) + 1
+    row_masks = [0] * height
+    bottoms = [0] * width
+    for x, y in cells:
+        row_masks[y] |= 1 << x
+        bottoms[x] = max(bottoms[x], y)
+    return Rotation(cells, width, height, tuple(row_masks), tuple(bottoms))
+
+
+def _build_rotations(shape: List[Tuple[int, int]]) -> Tuple[Rotation, ...]:
+    """スポーン形状から重複のない全回転状態を列挙"""
+    states = [tuple(shape)]
+    seen = {frozenset(shape)}
+    cells = states[0]
+    for _ in range(3):
+        cells = _rotate_cells(cells)
+        if frozenset(cells) in seen:
+            break
+        seen.add(frozenset(cells))
+        states.append(cells)
+    return tuple(_make_rotation(cells) for cells in states)
+
+
+# 全ピースの回転テーブル: ROTATIONS[piece_type][rotation]
+ROTATIONS: Dict[str, Tuple[Rotation, ...]] = {
+    piece_type: _build_rotations(piece_data['shape'])
+    for piece_type, piece_data in PIECES.items()
+}
+
+
+class GameSnapshot(NamedTuple):
+    """ゲーム状態の不変スナップショット（:meth:`TetrisGame.snapshot` / :meth:`TetrisGame.restore`）
+
+    盤面の各行は bytes で、変わっていない行と乱数の状態は前回のスナップショットと共有する。
+    """
+    rows: Tuple[bytes, ...]
+    piece_type: Optional[str]
+    rotation: int
+    x: int
+    y: int
+    piece_locked: bool
+    next_piece_type: Optional[str]
+    score: int
+    level: int
+    lines_cleared: int
+    game_over: bool
+    rng_state: tuple
+    bag: Tuple[str, ...]
+
+
 class TetrisGame:
     """メインのテトリスゲームクラス"""
     
-    def __init__(self, width: int = 10, height: int = 20):
-        """ゲームボードと状態を初期化"""
+    def __init__(self, width: int = 10, height: int = 20,
+                 seed: Optional[int] = None, randomizer: str = 'uniform'):
+        """ゲームボードと状態を初期化
+
+        ``seed`` が同じなら同じ順番でピースが出る（省略時はランダムなシードを使う）。
+        """
+        if randomizer not in RANDOMIZERS:
+            raise ValueError(f"unknown randomizer: {randomizer!r}")
+        self.seed = secrets.randbits(63) if seed is None else seed
+        self.randomizer = randomizer
+        self.rng = random.Random(self.seed)
+        self._bag: List[str] = []
+        # Pieces drawn so far; the cached RNG state is reused until the next draw
+        self._draws = 0
+        self._rng_cache: Optional[Tuple[int, tuple]] = None
+        # Immutable copies of the rows last handed out by board_view()
+        self._row_cache: Tuple[bytes, ...] = ()
         self.width = width
         self.height = height
-        self.board = [[0 for _ in range(width)] for _ in range(height)]
+        self.board = [self._empty_row() for _ in range(height)]
+        # Column heights (rows from the top filled cell to the floor), kept up to date as
+        # pieces lock; None until recomputed from the board (after restore or line clears).
+        # Direct board[y][x] writes are not seen, so drop_distance() checks its result.
+        self._heights: Optional[List[int]] = [0] * width
         self.current_piece = None
         self.current_piece_type = None
+        self.current_rotation = 0
         self.current_piece_x = 0
         self.current_piece_y = 0
+        self.piece_locked = False
+        self.game_over = False
         self.next_piece_type = None
         self.score = 0
         self.level = 1
         self.lines_cleared = 0
-        self.piece_colors = {}
         
         self.spawn_next_piece()
     
+    def _empty_row(self) -> bytearray:
+        """空のボード行を生成（セル値は1バイト）"""
+        return bytearray(self.width)
+    
     def get_random_piece(self) -> str:
         """ランダムなピースタイプを取得"""
-        return random.choice(list(PIECES.keys()))
+        self._draws += 1
+        if self.randomizer == 'bag':
+            if not self._bag:
+                self._bag = list(PIECE_TYPES)
+                self.rng.shuffle(self._bag)
+            return self._bag.pop()
+        return self.rng.choice(PIECE_TYPES)
     
     def spawn_next_piece(self) -> bool:
         """ボード上部に次のピースをスポーン"""
@@ -49,129 +189,334 @@ class TetrisGame:
         self.current_piece_type = self.next_piece_type
         self.next_piece_type = self.get_random_piece()
         
-        piece_data = PIECES[self.current_piece_type]
-        self.current_piece = piece_data['shape'][:]
+        self.current_rotation = 0
+        self.current_piece = ROTATIONS[self.current_piece_type][0].cells
         self.current_piece_x = self.width // 2 - 2
         self.current_piece_y = 0
-        self.piece_colors[id(self.current_piece)] = piece_data['color']
+        self.piece_locked = False
         
         # Check if spawn position is valid
-        if not self._is_valid_position(self.current_piece, self.current_piece_x, self.current_piece_y):
+        if not self._fits(self.current_piece_type, 0, self.current_piece_x, self.current_piece_y):
+            self.game_over = True
             return False
         
         return True
     
-    def _is_valid_position(self, piece: List[Tuple[int, int]], x: int, y: int) -> bool:
-        """ピースの位置が有効かチェック"""
-        for block_x, block_y in piece:
-            new_x = x + block_x
-            new_y = y + block_y
-            
-            if new_x < 0 or new_x >= self.width or new_y >= self.height:
-                return False
-            
-            if new_y >= 0 and self.board[new_y][new_x] != 0:
+    def _fits(self, piece_type: str, rotation: int, x: int, y: int) -> bool:
+        """回転テーブルを使ってピースの位置が有効かチェック"""
+        state = ROTATIONS[piece_type][rotation]
+        # Bounding box check rejects wall and floor collisions without touching cells
+        if x < 0 or x + state.width > self.width or y + state.height > self.height:
+            return False
+        
+        board = self.board
+        for block_x, block_y in state.cells:
+            board_y = y + block_y
+            if board_y >= 0 and board[board_y][x + block_x] != 0:
                 return False
         
         return True
     
-    def _rotate_piece(self, piece: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
-        """ピースを90度時計回りに回転"""
-        # For O piece (square), rotation does nothing
-        if len(piece) == 4:
-            coords = set(piece)
-            if coords == {(0, 0), (1, 0), (0, 1), (1, 1)}:
-                return piece  # O piece doesn't rotate
-        
-        rotated = [(-y, x) for x, y in piece]
-        # Normalize to positive coordinates
-        min_x = min(x for x, y in rotated)
-        min_y = min(y for x, y in rotated)
-        # Sort to maintain consistent ordering
-        normalized = sorted([(x - min_x, y - min_y) for x, y in rotated])
-        return normalized
-    
     def rotate_piece(self) -> bool:
         """Rotate the current piece."""
-        rotated = self._rotate_piece(self.current_piece)
+        if self.piece_locked:
+            return False
+        states = ROTATIONS[self.current_piece_type]
+        rotation = (self.current_rotation + 1) % len(states)
         
-        if self._is_valid_position(rotated, self.current_piece_x, self.current_piece_y):
-            self.current_piece = rotated
+        if self._fits(self.current_piece_type, rotation, self.current_piece_x, self.current_piece_y):
+            self.current_rotation = rotation
+            self.current_piece = states[rotation].cells
             return True
         
         return False
     
     def move_piece_left(self) -> bool:
         """Move the current piece left."""
-        if self._is_valid_position(self.current_piece, self.current_piece_x - 1, self.current_piece_y):
+        if self.piece_locked:
+            return False
+        if self._fits(self.current_piece_type, self.current_rotation, self.current_piece_x - 1, self.current_piece_y):
             self.current_piece_x -= 1
             return True
         return False
     
     def move_piece_right(self) -> bool:
         """Move the current piece right."""
-        if self._is_valid_position(self.current_piece, self.current_piece_x + 1, self.current_piece_y):
+        if self.piece_locked:
+            return False
+        if self._fits(self.current_piece_type, self.current_rotation, self.current_piece_x + 1, self.current_piece_y):
             self.current_piece_x += 1
             return True
         return False
     
     def move_piece_down(self) -> bool:
         """Move the current piece down."""
-        if self._is_valid_position(self.current_piece, self.current_piece_x, self.current_piece_y + 1):
+        if self.piece_locked:
+            # Already locked (e.g. after a hard drop); wait for the next spawn
+            return False
+        if self._fits(self.current_piece_type, self.current_rotation, self.current_piece_x, self.current_piece_y + 1):
             self.current_piece_y += 1
             return True
         else:
             # Piece can't move down, lock it in place
             self._lock_piece()
+            self.piece_locked = True
             return False
     
     def hard_drop(self) -> bool:
         """Drop the piece all the way down."""
-        while self.move_piece_down():
-            self.score += 1
+        if self.piece_locked:
+            return True
+        distance = self.drop_distance()
+        self.current_piece_y += distance
+        self.score += distance
+        self._lock_piece()
+        self.piece_locked = True
+        return True
+    
+    def column_heights(self) -> Tuple[int, ...]:
+        """各列の高さ（一番上の埋まったセルから床までの行数、空の列は 0）を取得"""
+        return tuple(self._column_heights())
+    
+    def _column_heights(self) -> List[int]:
+        """列の高さのリストを取得（なければ盤面から求め直す）"""
+        heights = self._heights
+        if heights is None:
+            width = self.width
+            height = self.height
+            heights = [0] * width
+            remaining = width
+            for y, row in enumerate(self.board):
+                if not any(row):
+                    continue
+                for x in range(width):
+                    if heights[x] == 0 and row[x] != 0:
+                        heights[x] = height - y
+                        remaining -= 1
+                if remaining == 0:
+                    break
+            self._heights = heights
+        return heights
+    
+    def drop_distance(self) -> int:
+        """落下中のピースをそのまま落とせる行数（ゴーストピースは current_piece_y + この値の位置）"""
+        if self.current_piece_type is None or self.piece_locked:
+            return 0
+        state = ROTATIONS[self.current_piece_type][self.current_rotation]
+        x = self.current_piece_x
+        y = self.current_piece_y
+        # The piece lands where its lowest cell in some column meets that column's top
+        heights = self._column_heights()
+        floor = self.height - 1 - y
+        distance = floor
+        for dx, bottom in enumerate(state.bottoms):
+            gap = floor - heights[x + dx] - bottom
+            if gap < distance:
+                distance = gap
+        if (distance < 0 or not self._path_is_clear(state, distance)
+                or self._fits(self.current_piece_type, self.current_rotation, x, y + distance + 1)):
+            # Tucked under an overhang, or the heights missed cells written directly into
+            # board (blocking the way or cleared below): step down from the current row
+            distance = 0
+            while self._fits(self.current_piece_type, self.current_rotation, x, y + distance + 1):
+                distance += 1
+        return distance
+    
+    def _path_is_clear(self, state: Rotation, distance: int) -> bool:
+        """Check the cells the piece's lowest cell in each column passes when falling ``distance`` rows.
+
+        Tetromino columns are contiguous, so the cells above the lowest one only move
+        into cells already checked or held by the piece itself.
+        """
+        board = self.board
+        x = self.current_piece_x
+        y = self.current_piece_y
+        for dx, bottom in enumerate(state.bottoms):
+            column = x + dx
+            for row in board[max(0, y + bottom + 1):y + bottom + distance + 1]:
+                if row[column]:
+                    return False
         return True
     
+    def apply_action(self, action: str) -> bool:
+        """操作名（ACTIONS のキー）で指定した操作を実行"""
+        return getattr(self, ACTIONS[action])()
+    
+    def tick(self) -> bool:
+        """ゲームを1ティック進める（落下、固定、次ピースの出現）
+
+        ゲームオーバーになった場合は False を返す。
+        """
+        if self.game_over:
+            return False
+        if not self.move_piece_down():
+            self.spawn_next_piece()
+        return not self.game_over
+    
     def _lock_piece(self) -> None:
         """Lock the current piece in place on the board."""
-        piece_color = self.piece_colors.get(id(self.current_piece), (255, 255, 255))
-        color_id = self._get_color_id(piece_color)
+        piece_id = PIECE_IDS[self.current_piece_type]
+        heights = self._heights
+        rows = []
         
         for block_x, block_y in self.current_piece:
             board_x = self.current_piece_x + block_x
             board_y = self.current_piece_y + block_y
             
             if 0 <= board_y < self.height and 0 <= board_x < self.width:
-                self.board[board_y][board_x] = color_id
+                self.board[board_y][board_x] = piece_id
+                if board_y not in rows:
+                    rows.append(board_y)
+                if heights is not None and self.height - board_y > heights[board_x]:
+                    heights[board_x] = self.height - board_y
         
-        self._clear_lines()
-    
-    def _get_color_id(self, color: Tuple[int, int, int]) -> int:
-        """Get a unique ID for a color."""
-        return hash(color) % 1000 + 1
+        self._clear_lines(rows)
     
-    def _clear_lines(self) -> None:
-        """完了したラインをチェックしてクリア"""
-        lines_to_clear = []
+    def _clear_lines(self, rows: Optional[List[int]] = None) -> None:
+        """完了したラインをチェックしてクリア
+
+        ``rows`` を渡すとその行だけを調べる（ピースを固定したとき）。省略すると全行を調べ、
+        列の高さも盤面から求め直す（盤面を直接書き換えた後に呼ぶ）。
+        """
+        board = self.board
+        if rows is None:
+            full = [y for y, row in enumerate(board) if EMPTY not in row]
+            self._heights = None
+        else:
+            full = [y for y in rows if EMPTY not in board[y]]
         
-        for y in range(self.height):
-            if all(self.board[y][x] != 0 for x in range(self.width)):
-                lines_to_clear.append(y)
+        if full:
+            # Compact every remaining row in one pass instead of one delete/insert per line
+            board[:] = [self._empty_row() for _ in full] + [
+                row for y, row in enumerate(board) if y not in full
+            ]
+            self._heights = None
+            self._award_lines(len(full))
+    
+    def _award_lines(self, num_lines: int) -> None:
+        """クリアしたライン数に応じてスコアとレベルを更新"""
+        self.lines_cleared += num_lines
+        # Score calculation
+        score_table = {1: 100, 2: 300, 3: 500, 4: 800}
+        self.score += score_table.get(num_lines, 0) * self.level
+        self.level = 1 + self.lines_cleared // 10
+    
+    def add_garbage(self, count: int, hole: int) -> bool:
+        """列 hole だけが空いたおじゃま行を盤面の下から count 行せり上げる
+
+        既存の行オブジェクトはそのまま上にずらし、新しい行だけを作る。落下中のピースは
+        重ならない位置まで押し上げる。上端からはみ出したらゲームオーバーで False を返す。
+        """
+        if self.game_over:
+            return False
+        count = min(count, self.height)
+        if count <= 0:
+            return True
+        pattern = bytearray([GARBAGE]) * self.width
+        pattern[hole] = EMPTY
+        rows = []
+        for _ in range(count):
+            row = self._empty_row()
+            row[:] = pattern
+            rows.append(row)
         
-        for y in sorted(lines_to_clear, reverse=True):
-            del self.board[y]
-            self.board.insert(0, [0 for _ in range(self.width)])
+        board = self.board
+        topped_out = any(any(row) for row in board[:count])
+        del board[:count]
+        board.extend(rows)
+        heights = self._heights
+        if heights is not None:
+            for x, column_height in enumerate(heights):
+                if column_height or x != hole:
+                    heights[x] = column_height + count
         
-        if lines_to_clear:
-            num_lines = len(lines_to_clear)
-            self.lines_cleared += num_lines
-            # Score calculation
-            score_table = {1: 100, 2: 300, 3: 500, 4: 800}
-            self.score += score_table.get(num_lines, 0) * self.level
-            self.level = 1 + self.lines_cleared // 10
+        if not self.piece_locked and self.current_piece_type is not None:
+            for _ in range(count):
+                if self._fits(self.current_piece_type, self.current_rotation,
+                              self.current_piece_x, self.current_piece_y):
+                    break
+                self.current_piece_y -= 1
+            else:
+                topped_out = topped_out or not self._fits(
+                    self.current_piece_type, self.current_rotation,
+                    self.current_piece_x, self.current_piece_y)
+        if topped_out:
+            self.game_over = True
+        return not self.game_over
     
     def get_board(self) -> List[List[int]]:
-        """現在のボード状態を取得"""
-        return [row[:] for row in self.board]
+        """現在のボード状態を取得（書き換え可能なコピー）"""
+        return [list(row) for row in self.board]
+    
+    def board_view(self) -> Tuple[bytes, ...]:
+        """読み取り専用の盤面を取得
+
+        行は bytes で、前回の呼び出しから変わっていない行は同じオブジェクトを返す
+        （盤面が変わっていなければタプルごと同じ）。
+        """
+        cache = self._row_cache
+        if len(cache) != len(self.board):
+            self._row_cache = tuple(bytes(row) for row in self.board)
+            return self._row_cache
+        if all(map(operator.eq, self.board, cache)):
+            return cache
+        
+        rows = None
+        for y, row in enumerate(self.board):
+            if row != cache[y]:
+                if rows is None:
+                    rows = list(cache)
+                rows[y] = bytes(row)
+        if rows is None:
+            return cache
+        self._row_cache = tuple(rows)
+        return self._row_cache
+    
+    def snapshot(self) -> GameSnapshot:
+        """現在の状態の不変スナップショットを取得（先読み探索やアンドゥ用）"""
+        rng_cache = self._rng_cache
+        if rng_cache is None or rng_cache[0] != self._draws:
+            rng_cache = self._rng_cache = (self._draws, self.rng.getstate())
+        return GameSnapshot(
+            self.board_view(), self.current_piece_type, self.current_rotation,
+            self.current_piece_x, self.current_piece_y, self.piece_locked,
+            self.next_piece_type, self.score, self.level, self.lines_cleared,
+            self.game_over, rng_cache[1], tuple(self._bag),
+        )
+    
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """スナップショットの状態に戻す"""
+        if len(snapshot.rows) != self.height or set(map(len, snapshot.rows)) != {self.width}:
+            raise ValueError("snapshot does not match the board size")
+        # Rows whose content is unchanged are kept; only the others are rebuilt
+        board = self.board
+        if len(board) != self.height:
+            board = [None] * self.height
+        self.board = [current if current == row else self._restore_row(row)
+                      for current, row in zip(board, snapshot.rows)]
+        self._row_cache = snapshot.rows
+        self._heights = None
+        self.current_piece_type = snapshot.piece_type
+        self.current_rotation = snapshot.rotation
+        self.current_piece = (ROTATIONS[snapshot.piece_type][snapshot.rotation].cells
+                              if snapshot.piece_type is not None else None)
+        self.current_piece_x = snapshot.x
+        self.current_piece_y = snapshot.y
+        self.piece_locked = snapshot.piece_locked
+        self.next_piece_type = snapshot.next_piece_type
+        self.score = snapshot.score
+        self.level = snapshot.level
+        self.lines_cleared = snapshot.lines_cleared
+        self.game_over = snapshot.game_over
+        self.rng.setstate(snapshot.rng_state)
+        self._bag = list(snapshot.bag)
+        # Share the restored RNG state with snapshots taken before the next draw
+        self._draws += 1
+        self._rng_cache = (self._draws, snapshot.rng_state)
+    
+    def _restore_row(self, row: bytes) -> bytearray:
+        """スナップショットの行から書き換え可能なボード行を生成"""
+        return bytearray(row)
     
     def get_current_piece(self) -> Optional[List[Tuple[int, int]]]:
         """現在の落下中のピースを取得"""
@@ -0,0 +1,117 @@
+"""
+テトリス ゲームループ - 固定タイムステップのシミュレーションとキーリピート（DAS/ARR）
+
+描画のフレームレートとは独立に、単調増加する時計で経過時間を測り、
+決まった刻み（SIM_STEP）でゲームを進める。
+"""
+
+import time
+from typing import Callable, List, Optional
+
+from game_logic import TetrisGame, drop_interval
+
+# Simulation step (seconds); all gravity and key-repeat timing advances in these steps
+SIM_STEP = 1 / 120
+# A frame longer than this (e.g. a stall or the window being dragged) is not caught up
+MAX_FRAME_TIME = 0.25
+# Delayed auto shift: how long left/right must be held before repeating (seconds)
+DAS = 0.167
+# Auto repeat rate: interval between repeated shifts once DAS has elapsed (seconds)
+ARR = 0.033
+# Soft drop repeat interval while down is held (seconds)
+SOFT_DROP_RATE = 0.033
+
+
+class FixedTimestep:
+    """経過時間を固定の刻みに切り分けるアキュムレーター。
+
+    :meth:`advance` をフレームごとに呼ぶと、前回からの経過時間を足し込み、
+    今回実行すべきシミュレーションのステップ数を返す。描画が遅れても
+    ステップ数が増えるだけなので、ゲームの速さは変わらない。
+    """
+
+    def __init__(self, step: float = SIM_STEP, max_frame_time: float = MAX_FRAME_TIME,
+                 clock: Callable[[], float] = time.monotonic):
+        """タイムステップを初期化"""
+        self.step = step
+        self.max_frame_time = max_frame_time
+        self.clock = clock
+        self.accumulator = 0.0
+        self._last: Optional[float] = None
+
+    def advance(self) -> int:
+        """前回からの経過時間を足し込み、実行すべきステップ数を返す"""
+        now = self.clock()
+        if self._last is not None:
+            # Clamp long stalls so the simulation does not spiral trying to catch up
+            self.accumulator += min(now - self._last, self.max_frame_time)
+        self._last = now
+        steps = int(self.accumulator / self.step)
+        self.accumulator -= steps * self.step
+        return steps
+
+    @property
+    def alpha(self) -> float:
+        """次のステップまでの進み具合（0〜1、補間描画用）"""
+        return self.accumulator / self.step
+
+
+class KeyRepeat:
+    """押しっぱなしのキーのリピート（DAS/ARR）。
+
+    :meth:`press` した操作はすぐに1回実行し、``delay`` 秒押し続けると
+    以後 ``rate`` 秒ごとに繰り返す。同時に押せるのは1つで、後から押した
+    操作が優先される（左右を両方押したときは後の方向に動く）。
+    """
+
+    def __init__(self, delay: float = DAS, rate: float = ARR):
+        """キーリピートを初期化"""
+        if rate <= 0:
+            raise ValueError("repeat rate must be positive")
+        self.delay = delay
+        self.rate = rate
+        self.action: Optional[str] = None
+        self._held = 0.0
+        self._next = 0.0
+
+    def press(self, action: str) -> str:
+        """キーが押された（すぐに実行する操作を返す）"""
+        self.action = action
+        self._held = 0.0
+        # Without a delay, the first repeat is one interval after the press
+        self._next = self.delay if self.delay > 0 else self.rate
+        return action
+
+    def release(self, action: str) -> None:
+        """キーが離された（後から押された別の操作はそのまま）"""
+        if self.action == action:
+            self.action = None
+
+    def advance(self, dt: float) -> List[str]:
+        """時間を dt 秒進め、その間にリピートする操作を返す"""
+        if self.action is None:
+            return []
+        self._held += dt
+        repeats = []
+        while self._held >= self._next:
+            repeats.append(self.action)
+            self._next += self.rate
+        return repeats
+
+
+class Gravity:
+    """レベルに応じた自動落下のタイマー（game_logic.drop_interval を使う）"""
+
+    def __init__(self):
+        """タイマーを初期化"""
+        self.elapsed = 0.0
+
+    def advance(self, game: TetrisGame, dt: float) -> int:
+        """時間を dt 秒進め、その間に落下すべき回数を返す"""
+        self.elapsed += dt
+        interval = drop_interval(game.level)
+        drops = 0
+        while self.elapsed >= interval:
+            self.elapsed -= interval
+            drops += 1
+        return drops
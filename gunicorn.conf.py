@@ -0,0 +1,26 @@
+"""
+Gunicorn settings for production serving: gunicorn -c gunicorn.conf.py app:app
+
+Sessions, the gravity scheduler and the AI caches live in the server process,
+so there is one worker process with many threads (the gthread worker). Every
+request for a session reaches the same in-process store without any sticky
+routing. To use more cores, run more containers behind a load balancer that
+routes by the session id (the ``session_id`` query parameter or the
+``X-Session-Id`` header).
+"""
+
+import os
+
+bind = os.environ.get('TETRIS_BIND', '0.0.0.0:5000')
+worker_class = 'gthread'
+# Game state is per process; more than one worker would split the sessions
+workers = 1
+# Each open event stream holds a thread, so size this for concurrent players
+threads = int(os.environ.get('TETRIS_THREADS', 512))
+worker_connections = int(os.environ.get('TETRIS_MAX_CONNECTIONS', 4096))
+backlog = 2048
+keepalive = 5
+# Event streams send a keep-alive comment every 15s; the worker heartbeat is separate
+timeout = 30
+graceful_timeout = 10
+accesslog = os.environ.get('TETRIS_ACCESS_LOG')  # e.g. '-' for stdout; off by default
@@ -0,0 +1,210 @@
+"""
+テトリス ハイスコア - SQLite のランキングと、上位のキャッシュ・順位の計算・まとめ書き
+"""
+
+import bisect
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Longest player name accepted
+MAX_NAME_LENGTH = 16
+
+
+class Entry(NamedTuple):
+    """ランキングの1件"""
+    name: str
+    score: int
+    lines: int
+    level: int
+    created: float
+
+
+class Leaderboard:
+    """終了したゲームのスコアのランキング。
+
+    記録は SQLite の ``scores`` テーブル（スコア順と名前ごとのインデックス付き）に
+    保存する。メモリには全スコアの昇順の配列（1件 8 バイト）と上位 ``top_k`` 件を持ち、
+    登録のたびにその場で更新するので、上位 N 件（N <= top_k）と順位は DB を読まずに
+    答えられる。順位は「自分より高いスコアの数 + 1」（同点は同順位）で、二分探索で求める。
+    配列への挿入は後ろの要素をずらすので件数に比例する（memmove で 10 万件なら約 20 µs、
+    100 万件で約 0.4 ms）。登録は多くても毎秒数百件なので、この規模までは配列のままにしている。
+
+    :meth:`submit` はメモリを更新して書き込み待ちに積むだけで、DB には
+    :meth:`flush`（または :meth:`start_writer` のスレッド）が1トランザクションにまとめて書く。
+    書き込み待ちの記録も検索結果に含める。
+    """
+
+    def __init__(self, path: str = ':memory:', top_k: int = 100, batch_size: int = 256,
+                 clock=time.time):
+        """ランキングを開き、スコアの配列と上位のキャッシュを読み込む"""
+        self.path = path
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.clock = clock
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS scores (id INTEGER PRIMARY KEY, '
+                         'session_id TEXT NOT NULL UNIQUE, name TEXT NOT NULL, '
+                         'score INTEGER NOT NULL, lines INTEGER NOT NULL, '
+                         'level INTEGER NOT NULL, created REAL NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS scores_by_name ON scores (name, score DESC)')
+        self._db_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self.written = 0
+
+        # Every score in ascending order, for ranks
+        self._scores = array('q', (row[0] for row in self._db.execute(
+            'SELECT score FROM scores ORDER BY score')))
+        # Top entries as ((-score, order), entry); order follows insertion like the row id
+        self._top: List[Tuple[Tuple[int, int], Entry]] = [
+            ((-row[2], row[0]), Entry(*row[1:]))
+            for row in self._db.execute(
+                'SELECT id, name, score, lines, level, created FROM scores '
+                'ORDER BY score DESC, id LIMIT ?', (top_k,))
+        ]
+        last_id = self._db.execute('SELECT MAX(id) FROM scores').fetchone()[0] or 0
+        self._order = itertools.count(last_id + 1)
+        # Submitted but not yet written: session id -> entry
+        self._pending: Dict[str, Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    @property
+    def pending(self) -> int:
+        """書き込み待ちの件数"""
+        return len(self._pending)
+
+    def submit(self, session_id: str, name: str, score: int, lines: int,
+               level: int) -> Optional[int]:
+        """ゲームの結果を登録して順位を返す（同じセッションが登録済みなら None）"""
+        entry = Entry(name, score, lines, level, self.clock())
+        with self._db_lock, self._lock:
+            if session_id in self._pending or self._db.execute(
+                    'SELECT 1 FROM scores WHERE session_id = ?', (session_id,)).fetchone():
+                return None
+            self._pending[session_id] = entry
+            bisect.insort(self._scores, score)
+            if len(self._top) < self.top_k or -score < self._top[-1][0][0]:
+                bisect.insort(self._top, ((-score, next(self._order)), entry))
+                del self._top[self.top_k:]
+            else:
+                next(self._order)
+            rank = self._rank_locked(score)
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+        return rank
+
+    def rank(self, score: int) -> int:
+        """スコアの順位（そのスコアより高いスコアの数 + 1）"""
+        with self._lock:
+            return self._rank_locked(score)
+
+    def _rank_locked(self, score: int) -> int:
+        return len(self._scores) - bisect.bisect_right(self._scores, score) + 1
+
+    def top(self, limit: int = 10) -> List[Dict[str, object]]:
+        """上位 limit 件（top_k 件まではキャッシュから）"""
+        with self._lock:
+            if limit <= self.top_k or len(self._top) == len(self._scores):
+                entries = [entry for _, entry in self._top[:limit]]
+                return self._ranked_locked(entries)
+        return self._ranked(self._select('ORDER BY score DESC, id LIMIT ?', (limit,),
+                                         lambda entry: True, limit))
+
+    def around(self, score: int, count: int = 5) -> List[Dict[str, object]]:
+        """スコアの前後 count 件ずつ（高い順）"""
+        above = self._select('WHERE score > ? ORDER BY score ASC, id DESC LIMIT ?', (score, count),
+                             lambda entry: entry.score > score, count, reverse=False)
+        below = self._select('WHERE score <= ? ORDER BY score DESC, id LIMIT ?', (score, count),
+                             lambda entry: entry.score <= score, count)
+        return self._ranked(above[::-1] + below)
+
+    def player(self, name: str) -> Optional[Dict[str, object]]:
+        """プレイヤーの最高記録とその順位（記録がなければ None）"""
+        best = self._select('WHERE name = ? ORDER BY score DESC LIMIT 1', (name,),
+                            lambda entry: entry.name == name, 1)
+        return self._ranked(best)[0] if best else None
+
+    def _select(self, where: str, params: tuple, match: Callable[[Entry], bool], limit: int,
+                reverse: bool = True) -> List[Entry]:
+        """Query entries and add the matching unwritten ones, keeping the best ``limit``.
+
+        The pending entries are read under the database lock, so an entry being
+        written is seen either in the table or as pending, never both.
+        """
+        with self._db_lock:
+            entries = [Entry(*row) for row in self._db.execute(
+                'SELECT name, score, lines, level, created FROM scores ' + where, params)]
+            with self._lock:
+                pending = [entry for entry in self._pending.values() if match(entry)]
+        if not pending:
+            return entries
+        merged = sorted(entries + pending, key=lambda entry: entry.score, reverse=reverse)
+        return merged[:limit]
+
+    def _ranked(self, entries: List[Entry]) -> List[Dict[str, object]]:
+        with self._lock:
+            return self._ranked_locked(entries)
+
+    def _ranked_locked(self, entries: List[Entry]) -> List[Dict[str, object]]:
+        return [{'rank': self._rank_locked(entry.score), 'name': entry.name,
+                 'score': entry.score, 'lines': entry.lines, 'level': entry.level}
+                for entry in entries]
+
+    def flush(self) -> int:
+        """書き込み待ちの記録を1トランザクションで書き込み、書き込んだ数を返す"""
+        with self._lock:
+            items = list(self._pending.items())
+        if not items:
+            return 0
+        rows = [(session_id, *entry) for session_id, entry in items]
+        with self._db_lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO scores (session_id, name, score, lines, level, created) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+            with self._lock:
+                for session_id, _ in items:
+                    self._pending.pop(session_id, None)
+        self.written += len(items)
+        return len(items)
+
+    def start_writer(self, interval: float) -> None:
+        """interval 秒ごと（または batch_size 件たまるたび）に :meth:`flush` するスレッドを開始"""
+        if self._writer is not None:
+            return
+
+        def run():
+            while True:
+                self._wake.wait(interval)
+                self._wake.clear()
+                try:
+                    self.flush()
+                except Exception:
+                    # The entries stay pending and are written on the next attempt
+                    logging.getLogger(__name__).exception("leaderboard write failed")
+
+        self._writer = threading.Thread(target=run, name='leaderboard-writer', daemon=True)
+        self._writer.start()
+
+    def close(self) -> None:
+        """書き込み待ちを書き込んでからデータベースを閉じる"""
+        self.flush()
+        with self._db_lock:
+            self._db.close()
@@ -3,61 +3,99 @@
 Tetris Game - Main Entry Point
 """
 
+import time
+
 import pygame
+from ai import AIPlayer
+from game_loop import ARR, DAS, SOFT_DROP_RATE, FixedTimestep, Gravity, KeyRepeat
 from game_logic import TetrisGame
 from renderer import GameRenderer
 import sys
 
+# Frames are capped at this rate; the simulation speed does not depend on it
+MAX_FPS = 60
+# Skip drawing a frame when the simulation alone used more than this (seconds)
+FRAME_BUDGET = 1 / MAX_FPS
+
+SHIFT_KEYS = {pygame.K_LEFT: 'left', pygame.K_RIGHT: 'right'}
+
 def main():
     """Initialize and run the Tetris game."""
     pygame.init()
-    
+
     # Game configuration
     game_width = 10
     game_height = 20
     block_size = 30
-    
+
     # Create game and renderer
     game = TetrisGame(game_width, game_height)
     renderer = GameRenderer(game_width, game_height, block_size)
-    
+
+    # --autoplay: let the AI place every piece
+    autoplayer = AIPlayer(time_budget=0.01) if '--autoplay' in sys.argv[1:] else None
+    needs_plan = autoplayer is not None
+
     clock = pygame.time.Clock()
+    timestep = FixedTimestep()
+    gravity = Gravity()
+    shift = KeyRepeat(DAS, ARR)
+    soft_drop = KeyRepeat(0.0, SOFT_DROP_RATE)
     running = True
-    drop_time = 0
-    drop_interval = 30  # frames
-    
+
     while running:
+        frame_start = time.monotonic()
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT:
-                    game.move_piece_left()
-                elif event.key == pygame.K_RIGHT:
-                    game.move_piece_right()
+                if event.key == pygame.K_q:
+                    running = False
+                elif autoplayer is not None:
+                    continue
+                elif event.key in SHIFT_KEYS:
+                    game.apply_action(shift.press(SHIFT_KEYS[event.key]))
                 elif event.key == pygame.K_DOWN:
-                    game.move_piece_down()
+                    game.apply_action(soft_drop.press('down'))
                 elif event.key == pygame.K_UP:
                     game.rotate_piece()
                 elif event.key == pygame.K_SPACE:
                     game.hard_drop()
-                elif event.key == pygame.K_q:
-                    running = False
-        
-        # Auto drop piece
-        drop_time += 1
-        if drop_time >= drop_interval:
-            if not game.move_piece_down():
-                if not game.spawn_next_piece():
+            elif event.type == pygame.KEYUP:
+                if event.key in SHIFT_KEYS:
+                    shift.release(SHIFT_KEYS[event.key])
+                elif event.key == pygame.K_DOWN:
+                    soft_drop.release('down')
+
+        # Run every simulation step that is due, however long the last frame took
+        for _ in range(timestep.advance()):
+            # AI moves the new piece into place; gravity drops it
+            if needs_plan:
+                for action in autoplayer.plan(game):
+                    game.apply_action(action)
+                needs_plan = False
+
+            for action in shift.advance(timestep.step) + soft_drop.advance(timestep.step):
+                game.apply_action(action)
+
+            for _ in range(gravity.advance(game, timestep.step)):
+                piece_y = game.current_piece_y
+                if not game.tick():
                     print(f"Game Over! Score: {game.score}")
                     running = False
-            drop_time = 0
-        
-        # Render game
-        renderer.draw(game)
-        pygame.display.flip()
-        clock.tick(60)
-    
+                    break
+                if game.current_piece_y <= piece_y:
+                    # The piece locked and a new one spawned
+                    needs_plan = autoplayer is not None
+            if not running:
+                break
+
+        # Render game; under load, drop the frame rather than slowing the game
+        if time.monotonic() - frame_start <= FRAME_BUDGET:
+            pygame.display.update(renderer.draw(game))
+        clock.tick(MAX_FPS)
+
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,282 @@
+"""
+テトリス メトリクス - 低オーバーヘッドのカウンター・ヒストグラムと Prometheus 形式の出力
+"""
+
+import bisect
+import cProfile
+import heapq
+import io
+import itertools
+import pstats
+import random
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds (upper bounds); +Inf is implicit
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """ラベル値を Prometheus のテキスト形式用にエスケープ"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    """{name="value",...} を組み立てる（ラベルがなければ空文字列）"""
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    """数値をテキスト形式に変換（整数はそのまま）"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """メトリクスの基底クラス（ラベルの組み合わせごとに値を持つ）"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        """テキスト形式の行を返す"""
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """単調増加するカウンター"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """カウンターを増やす（ラベル値は labelnames の順）"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        """現在の値を取得"""
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+                for labels, value in items]
+
+
+class Gauge(Metric):
+    """出力時にコールバックで値を求めるゲージ（ラベルなし）"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, callback: Callable[[], float]):
+        super().__init__(name, help)
+        self.callback = callback
+
+    def _samples(self) -> List[str]:
+        return [f'{self.name} {_format_value(self.callback())}']
+
+
+class Histogram(Metric):
+    """固定バケットのヒストグラム（レイテンシ用）"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """値を1つ記録"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *labels: str) -> int:
+        """記録した値の数を取得"""
+        entry = self._values.get(labels)
+        return entry[2] if entry is not None else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(entry[0]), entry[1], entry[2]))
+                           for labels, entry in self._values.items())
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} '
+                             f'{cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+class Registry:
+    """メトリクスの登録先。:meth:`render` で Prometheus のテキスト形式を出力する"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """メトリクスを登録（同じ名前は置き換える）"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        """カウンターを作成して登録"""
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, callback: Callable[[], float]) -> Gauge:
+        """ゲージを作成して登録"""
+        return self.register(Gauge(name, help, callback))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """ヒストグラムを作成して登録"""
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """全メトリクスを Prometheus のテキスト形式で出力"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REGISTRY = Registry()
+
+http_requests = REGISTRY.counter(
+    'tetris_http_requests_total', 'HTTP requests handled', ('route', 'method', 'status'))
+http_latency = REGISTRY.histogram(
+    'tetris_http_request_duration_seconds', 'Time spent in route handlers', ('route',))
+game_actions = REGISTRY.counter(
+    'tetris_game_actions_total', 'Game actions applied (gravity ticks are action="tick")',
+    ('action',))
+game_action_latency = REGISTRY.histogram(
+    'tetris_game_action_duration_seconds', 'Time spent applying one game action', ('action',))
+lines_cleared = REGISTRY.counter(
+    'tetris_lines_cleared_total', 'Lines cleared, by lines cleared at once', ('lines',))
+games_over = REGISTRY.counter('tetris_games_over_total', 'Games that ended')
+room_tick_lag = REGISTRY.histogram(
+    'tetris_room_tick_lag_seconds', 'How late versus room ticks ran after their due time')
+garbage_lines = REGISTRY.counter('tetris_garbage_lines_total', 'Garbage rows sent in versus rooms')
+broadcast_frames = REGISTRY.counter(
+    'tetris_broadcast_frames_total', 'Spectator frames encoded (each shared by every spectator)')
+broadcast_skipped = REGISTRY.counter(
+    'tetris_broadcast_frames_skipped_total', 'Frames slow spectators skipped to catch up')
+thumbnails = REGISTRY.counter(
+    'tetris_thumbnails_total', 'Thumbnail requests, by cache result (hit, miss, shared, failed)',
+    ('result',))
+thumbnail_latency = REGISTRY.histogram(
+    'tetris_thumbnail_render_seconds', 'Time from queueing a thumbnail render to its PNG')
+
+
+class SlowRequestProfiler:
+    """実行時に切り替えられるサンプリングプロファイラー。
+
+    有効にすると ``sample_rate`` の割合のリクエストを cProfile で計測し、
+    所要時間の長いものから ``keep`` 件のプロファイル（累積時間順の上位関数）を残す。
+    無効なときのコストは属性の参照1回だけ。
+    """
+
+    def __init__(self, sample_rate: float = 0.01, keep: int = 10, top: int = 25):
+        self.enabled = False
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.top = top
+        self._slowest: List[Tuple[float, int, Dict[str, object]]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None,
+                  keep: Optional[int] = None) -> None:
+        """有効・無効やサンプリング率を切り替える"""
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+            if keep is not None:
+                self.keep = max(int(keep), 1)
+                while len(self._slowest) > self.keep:
+                    heapq.heappop(self._slowest)
+            if enabled is not None:
+                self.enabled = bool(enabled)
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """このリクエストを計測するならプロファイラーを開始して返す"""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is active in this thread
+            return None
+        return profile
+
+    def finish(self, profile: cProfile.Profile, duration: float, route: str) -> None:
+        """プロファイラーを止め、遅いリクエストなら結果を残す"""
+        profile.disable()
+        with self._lock:
+            if len(self._slowest) >= self.keep and duration <= self._slowest[0][0]:
+                return
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(self.top)
+        entry = {'route': route, 'duration': duration, 'profile': out.getvalue()}
+        with self._lock:
+            heapq.heappush(self._slowest, (duration, next(self._order), entry))
+            while len(self._slowest) > self.keep:
+                heapq.heappop(self._slowest)
+
+    def slowest(self) -> List[Dict[str, object]]:
+        """記録した遅いリクエストを遅い順に取得"""
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+
+    def clear(self) -> None:
+        """記録を消す"""
+        with self._lock:
+            self._slowest.clear()
+
+
+profiler = SlowRequestProfiler()
@@ -0,0 +1,106 @@
+"""
+テトリス 状態プロトコル - バージョン付き差分エンコード
+"""
+
+import base64
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Cell encoding used by the packed format: base64 of one byte per cell (cell values 0-8)
+PACKED_ENCODING = 'b64u8'
+
+
+def pack_cells(cells: Iterable[int]) -> str:
+    """セル値の並びを base64 文字列にパック"""
+    return base64.b64encode(bytes(cells)).decode('ascii')
+
+
+def unpack_cells(packed: str, encoding: str = PACKED_ENCODING) -> List[int]:
+    """pack_cells でパックした文字列をセル値のリストに戻す"""
+    if encoding != PACKED_ENCODING:
+        raise ValueError(f"unknown cell encoding: {encoding!r}")
+    return list(base64.b64decode(packed))
+
+
+class StateTracker:
+    """ゲーム状態の変更履歴を行・フィールド単位のバージョンで保持。
+
+    :meth:`sync` のたびに盤面の各行と各フィールドを前回と比較し、
+    変わったものに現在のバージョンを記録する。クライアントが持っている
+    バージョン ``since`` を渡すと、それ以降に変わった行とフィールドだけを
+    返す。履歴の範囲外のバージョンには全体スナップショットを返す。
+    """
+
+    def __init__(self):
+        """トラッカーを初期化"""
+        self.version: Optional[int] = None
+        self.base_version: Optional[int] = None
+        self.rows: List[bytes] = []
+        self.row_versions: List[int] = []
+        self.fields: Dict[str, object] = {}
+        self.field_versions: Dict[str, int] = {}
+
+    def sync(self, board: Sequence[Sequence[int]], fields: Dict[str, object], version: int) -> None:
+        """現在の盤面とフィールドを記録（同じバージョンなら何もしない）"""
+        if version == self.version:
+            return
+
+        if self.version is None:
+            self.base_version = version
+            self.rows = [bytes(row) for row in board]
+            self.row_versions = [version] * len(self.rows)
+            self.fields = dict(fields)
+            self.field_versions = {name: version for name in fields}
+        else:
+            rows = self.rows
+            row_versions = self.row_versions
+            for y, row in enumerate(board):
+                if row is rows[y]:
+                    continue  # shared, unchanged row from TetrisGame.board_view()
+                row = bytes(row)
+                if row != rows[y]:
+                    rows[y] = row
+                    row_versions[y] = version
+            for name, value in fields.items():
+                if self.fields.get(name) != value:
+                    self.fields[name] = value
+                    self.field_versions[name] = version
+        self.version = version
+
+    def snapshot(self, packed: bool = False) -> Dict[str, object]:
+        """全体スナップショットを取得"""
+        state: Dict[str, object] = dict(self.fields)
+        state['full'] = True
+        state['version'] = self.version
+        state['width'] = len(self.rows[0]) if self.rows else 0
+        state['height'] = len(self.rows)
+        if packed:
+            state['encoding'] = PACKED_ENCODING
+            state['board'] = pack_cells(b''.join(self.rows))
+        else:
+            state['board'] = [tuple(row) for row in self.rows]
+        return state
+
+    def delta(self, since: int, packed: bool = False) -> Dict[str, object]:
+        """``since`` 以降の差分を取得（範囲外なら全体スナップショット）"""
+        if self.version is None or not self.base_version <= since <= self.version:
+            return self.snapshot(packed)
+
+        state: Dict[str, object] = {
+            name: value for name, value in self.fields.items()
+            if self.field_versions[name] > since
+        }
+        state['full'] = False
+        state['version'] = self.version
+        state['since'] = since
+        if packed:
+            state['encoding'] = PACKED_ENCODING
+            state['rows'] = [
+                [y, pack_cells(row)]
+                for y, row in enumerate(self.rows) if self.row_versions[y] > since
+            ]
+        else:
+            state['rows'] = [
+                [y, tuple(row)]
+                for y, row in enumerate(self.rows) if self.row_versions[y] > since
+            ]
+        return state
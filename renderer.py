@@ -3,143 +3,203 @@
 """
 
 import pygame
-from typing import List, Tuple, Optional
-from game_logic import PIECES
+from typing import Dict, List, Tuple, Optional
+from game_logic import PALETTE, PIECE_IDS, PIECES
 
 class GameRenderer:
-    """テトリスゲームの描画を処理。"""
-    
-    def __init__(self, width: int, height: int, block_size: int = 30):
-        """レンダラーを初期化。"""
+    """テトリスゲームの描画を処理。
+
+    背景・グリッド・見出しは起動時に1枚のサーフェスへ描いておき、ブロックは
+    色ごとのサーフェスを貼るだけにする。前のフレームとセル単位・文字列単位で
+    比較して変わった部分だけを描き直し、その矩形を :meth:`draw` が返すので、
+    ``pygame.display.update(rects)`` に渡せばよい（何も変わらなければ空リスト）。
+    """
+
+    # Next-piece preview block size (pixels)
+    PREVIEW_BLOCK = 20
+
+    def __init__(self, width: int, height: int, block_size: int = 30,
+                 surface: Optional[pygame.Surface] = None):
+        """レンダラーを初期化。
+
+        ``surface`` を渡すとウィンドウを開かずにそのサーフェスへ描画する。
+        """
         self.width = width
         self.height = height
         self.block_size = block_size
-        
+
         # Colors
         self.COLOR_BG = (20, 20, 40)
         self.COLOR_GRID = (50, 50, 70)
         self.COLOR_PIECE = (200, 200, 200)
         self.COLOR_TEXT = (255, 255, 255)
-        
+
         # Screen dimensions
         self.screen_width = width * block_size + 200
         self.screen_height = height * block_size + 40
-        
-        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
-        pygame.display.set_caption("Tetris")
-        
+
+        if surface is None:
+            surface = pygame.display.set_mode((self.screen_width, self.screen_height))
+            pygame.display.set_caption("Tetris")
+        self.screen = surface
+
         self.font = pygame.font.Font(None, 24)
         self.title_font = pygame.font.Font(None, 32)
-    
-    def draw(self, game) -> None:
-        """ゲーム状態を描画。"""
-        self.screen.fill(self.COLOR_BG)
-        
-        # Draw game board
-        self._draw_board(game)
-        
-        # Draw current piece
-        self._draw_current_piece(game)
-        
-        # Draw UI
-        self._draw_ui(game)
-    
-    def _draw_board(self, game) -> None:
-        """ゲームボードを描画。"""
-        board = game.get_board()
-        
-        # Draw grid and filled blocks
-        for y in range(game.height):
-            for x in range(game.width):
-                rect = pygame.Rect(
-                    x * self.block_size + 10,
-                    y * self.block_size + 10,
-                    self.block_size,
-                    self.block_size
-                )
-                
-                # Draw grid
-                pygame.draw.rect(self.screen, self.COLOR_GRID, rect, 1)
-                
-                # Draw filled blocks
-                if board[y][x] != 0:
-                    color = self._get_color_from_id(board[y][x])
-                    pygame.draw.rect(self.screen, color, rect)
-                    pygame.draw.rect(self.screen, self.COLOR_GRID, rect, 1)
-    
-    def _draw_current_piece(self, game) -> None:
-        """現在落下中のピースを描画。"""
+
+        self.ui_x = width * block_size + 30
+        self.preview_rect = pygame.Rect(self.ui_x + 10, 180,
+                                        4 * self.PREVIEW_BLOCK, 2 * self.PREVIEW_BLOCK)
+
+        # Pre-rendered layers
+        self.background = self._build_background()
+        self.blocks = [self._build_block(color, block_size) for color in PALETTE]
+        self.preview_blocks = [self._build_block(color, self.PREVIEW_BLOCK) for color in PALETTE]
+        self.cell_rects = [
+            pygame.Rect(x * block_size + 10, y * block_size + 10, block_size, block_size)
+            for y in range(height) for x in range(width)
+        ]
+
+        # Text surfaces keyed by the value they show, and where each one is on screen
+        self._text_cache: Dict[str, Tuple[object, pygame.Surface]] = {}
+        self._text_rects: Dict[str, pygame.Rect] = {}
+        self.invalidate()
+
+    def _build_background(self) -> pygame.Surface:
+        """背景・グリッド・固定の見出しを描いたサーフェスを作成。"""
+        background = pygame.Surface((self.screen_width, self.screen_height))
+        background.fill(self.COLOR_BG)
+        for y in range(self.height):
+            for x in range(self.width):
+                rect = pygame.Rect(x * self.block_size + 10, y * self.block_size + 10,
+                                   self.block_size, self.block_size)
+                pygame.draw.rect(background, self.COLOR_GRID, rect, 1)
+
+        title = self.title_font.render("TETRIS", True, self.COLOR_TEXT)
+        background.blit(title, (self.ui_x, 10))
+        next_label = self.font.render("Next:", True, self.COLOR_TEXT)
+        background.blit(next_label, (self.ui_x, 150))
+        return background
+
+    def _build_block(self, color: Tuple[int, int, int], size: int) -> pygame.Surface:
+        """枠線付きの1色のブロックサーフェスを作成。"""
+        block = pygame.Surface((size, size))
+        block.fill(color)
+        pygame.draw.rect(block, self.COLOR_GRID, block.get_rect(), 1)
+        return block
+
+    def invalidate(self) -> None:
+        """次の draw で画面全体を描き直す。"""
+        self._frame: Optional[List[int]] = None
+        self._frame_key = None
+        self._next_piece = None
+        self._text_rects.clear()
+
+    def draw(self, game) -> List[pygame.Rect]:
+        """ゲーム状態を描画し、描き直した矩形のリストを返す。"""
+        if self._frame is None:
+            self.screen.blit(self.background, (0, 0))
+            self._frame = [0] * (self.width * self.height)
+            self._draw_board(game)
+            self._draw_ui(game)
+            return [self.screen.get_rect()]
+
+        dirty = self._draw_board(game)
+        dirty.extend(self._draw_ui(game))
+        return dirty
+
+    def _draw_board(self, game) -> List[pygame.Rect]:
+        """ゲームボードと落下中のピースを前のフレームとの差分だけ描画。"""
+        board = game.board_view()
+        key = (board, game.current_piece_type, game.current_rotation,
+               game.current_piece_x, game.current_piece_y)
+        if key == self._frame_key:
+            return []
+        self._frame_key = key
+
+        frame = [cell for row in board for cell in row]
+        self._overlay_current_piece(game, frame)
+
+        screen = self.screen
+        background = self.background
+        blocks = self.blocks
+        previous = self._frame
+        dirty = []
+        for i, cell in enumerate(frame):
+            if cell != previous[i]:
+                rect = self.cell_rects[i]
+                if cell:
+                    screen.blit(blocks[cell], rect)
+                else:
+                    screen.blit(background, rect, rect)
+                dirty.append(rect)
+        self._frame = frame
+
+        if len(dirty) > 32:
+            # Many scattered cells (e.g. a line clear): one bounding rect is cheaper
+            dirty = [dirty[0].unionall(dirty[1:])]
+        return dirty
+
+    def _overlay_current_piece(self, game, frame: List[int]) -> None:
+        """現在落下中のピースをフレームのセル値に重ねる。"""
         piece = game.get_current_piece()
         if piece is None:
             return
-        
+
         piece_x, piece_y = game.get_piece_position()
-        piece_type = game.current_piece_type
-        color = PIECES[piece_type]['color']
-        
+        piece_id = PIECE_IDS[game.current_piece_type]
+
         for block_x, block_y in piece:
             board_x = piece_x + block_x
             board_y = piece_y + block_y
-            
-            if 0 <= board_y < game.height:
-                rect = pygame.Rect(
-                    board_x * self.block_size + 10,
-                    board_y * self.block_size + 10,
-                    self.block_size,
-                    self.block_size
-                )
-                pygame.draw.rect(self.screen, color, rect)
-                pygame.draw.rect(self.screen, self.COLOR_GRID, rect, 1)
-    
-    def _draw_ui(self, game) -> None:
-        """ユーザーインターフェース要素(スコア、レベル、次ピース)を描画。"""
-        ui_x = game.width * self.block_size + 30
-        
-        # Title
-        title = self.title_font.render("TETRIS", True, self.COLOR_TEXT)
-        self.screen.blit(title, (ui_x, 10))
-        
-        # Score
-        score_text = self.font.render(f"Score: {game.score}", True, self.COLOR_TEXT)
-        self.screen.blit(score_text, (ui_x, 50))
-        
-        # Level
-        level_text = self.font.render(f"Level: {game.level}", True, self.COLOR_TEXT)
-        self.screen.blit(level_text, (ui_x, 80))
-        
-        # Lines
-        lines_text = self.font.render(f"Lines: {game.lines_cleared}", True, self.COLOR_TEXT)
-        self.screen.blit(lines_text, (ui_x, 110))
-        
-        # Next piece
-        next_label = self.font.render("Next:", True, self.COLOR_TEXT)
-        self.screen.blit(next_label, (ui_x, 150))
-        
+
+            if 0 <= board_y < self.height and 0 <= board_x < self.width:
+                frame[board_y * self.width + board_x] = piece_id
+
+    def _draw_ui(self, game) -> List[pygame.Rect]:
+        """ユーザーインターフェース要素(スコア、レベル、次ピース)のうち変わったものを描画。"""
+        dirty = []
+        for name, label, value, y in (('score', "Score", game.score, 50),
+                                       ('level', "Level", game.level, 80),
+                                       ('lines', "Lines", game.lines_cleared, 110)):
+            rect = self._draw_text(name, f"{label}: {value}", value, (self.ui_x, y))
+            if rect is not None:
+                dirty.append(rect)
+
         # Draw next piece preview
         next_piece_type = game.get_next_piece()
-        if next_piece_type:
-            next_piece = PIECES[next_piece_type]['shape']
-            next_color = PIECES[next_piece_type]['color']
-            
-            for block_x, block_y in next_piece:
-                rect = pygame.Rect(
-                    ui_x + block_x * 20 + 10,
-                    180 + block_y * 20,
-                    20,
-                    20
-                )
-                pygame.draw.rect(self.screen, next_color, rect)
-                pygame.draw.rect(self.screen, self.COLOR_GRID, rect, 1)
-    
+        if next_piece_type != self._next_piece:
+            self._next_piece = next_piece_type
+            area = self.preview_rect
+            self.screen.blit(self.background, area, area)
+            if next_piece_type:
+                block = self.preview_blocks[PIECE_IDS[next_piece_type]]
+                for block_x, block_y in PIECES[next_piece_type]['shape']:
+                    self.screen.blit(block, (area.x + block_x * self.PREVIEW_BLOCK,
+                                             area.y + block_y * self.PREVIEW_BLOCK))
+            dirty.append(area)
+        return dirty
+
+    def _draw_text(self, name: str, text: str, value,
+                   position: Tuple[int, int]) -> Optional[pygame.Rect]:
+        """値が変わったときだけテキストを描き直し、描き直した矩形を返す。"""
+        cached = self._text_cache.get(name)
+        old = self._text_rects.get(name)
+        if cached is not None and cached[0] == value and old is not None:
+            return None
+        if cached is None or cached[0] != value:
+            cached = (value, self.font.render(text, True, self.COLOR_TEXT))
+            self._text_cache[name] = cached
+
+        surface = cached[1]
+        rect = surface.get_rect(topleft=position)
+        self._text_rects[name] = rect
+        if old is not None:
+            # Erase the previous text, which may be wider than the new one
+            self.screen.blit(self.background, old, old)
+            rect = rect.union(old)
+        self.screen.blit(surface, position)
+        return rect
+
     def _get_color_from_id(self, color_id: int) -> Tuple[int, int, int]:
-        """色IDから色を取得。"""
-        colors = [
-            (0, 255, 255),      # I - Cyan
-            (255, 255, 0),      # O - Yellow
-            (128, 0, 128),      # T - Purple
-            (0, 255, 0),        # S - Green
-            (255, 0, 0),        # Z - Red
-            (0, 0, 255),        # J - Blue
-            (255, 165, 0),      # L - Orange
-        ]
-        return colors[color_id % len(colors)]
+        """セル値（ピースID）から色を取得。"""
+        return PALETTE[color_id]
@@ -0,0 +1,193 @@
+"""
+テトリス リプレイ - シードと入力列の記録・コンパクトなバイナリ形式・再シミュレーション
+"""
+
+import base64
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, NamedTuple, Optional, Tuple, Type, Union
+
+from game_logic import ACTIONS, RANDOMIZERS, TetrisGame
+
+# 操作コード（3ビット）
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+CODE_ACTIONS = {code: action for action, code in ACTION_CODES.items()}
+# Garbage rows pushed in by a versus room; followed by a varint of count << 8 | hole
+GARBAGE_CODE = len(ACTIONS)
+
+# magic, format version, randomizer, width, height, seed, event count
+_HEADER = struct.Struct('<2sBBBBQI')
+_MAGIC = b'TR'
+_FORMAT_VERSION = 1
+# Most inputs an uploaded replay may hold (bounds the work of re-simulating it), and
+# where the server stops recording a session's replay
+MAX_REPLAY_EVENTS = 100_000
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """符号なし整数を可変長（7ビットずつ）で書き込む"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """可変長整数を読み出し、(値, 次の位置) を返す"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Garbage(NamedTuple):
+    """リプレイ中のおじゃま行（対戦ルームで盤面の下から入った行数と穴の列）"""
+    count: int
+    hole: int
+
+
+# A replay event: an action name, or garbage rows from a versus room
+Event = Union[str, Garbage]
+
+
+@dataclass
+class Replay:
+    """1ゲーム分のリプレイ（シードと、経過ミリ秒付きの入力列）
+
+    ``events`` は「前のイベントからの経過ミリ秒 << 3 | 操作コード」の可変長整数列。
+    おじゃま行（:data:`GARBAGE_CODE`）の後には「行数 << 8 | 穴の列」が続く。
+    ``count`` はおじゃま行も含めたイベント数。
+    """
+    seed: int
+    randomizer: str = 'uniform'
+    width: int = 10
+    height: int = 20
+    events: bytearray = field(default_factory=bytearray)
+    count: int = 0
+
+    def append(self, delta_ms: int, action: str) -> None:
+        """入力を1つ追加"""
+        _write_varint(self.events, (max(delta_ms, 0) << 3) | ACTION_CODES[action])
+        self.count += 1
+
+    def append_garbage(self, delta_ms: int, count: int, hole: int) -> None:
+        """おじゃま行を1つ追加"""
+        _write_varint(self.events, (max(delta_ms, 0) << 3) | GARBAGE_CODE)
+        _write_varint(self.events, count << 8 | hole)
+        self.count += 1
+
+    def __iter__(self) -> Iterator[Tuple[int, Event]]:
+        """(ゲーム開始からの経過ミリ秒, 操作名または :class:`Garbage`) を順に返す"""
+        pos = 0
+        elapsed = 0
+        events = self.events
+        for _ in range(self.count):
+            value, pos = _read_varint(events, pos)
+            elapsed += value >> 3
+            code = value & 0x7
+            if code == GARBAGE_CODE:
+                value, pos = _read_varint(events, pos)
+                yield elapsed, Garbage(value >> 8, value & 0xFF)
+            elif code in CODE_ACTIONS:
+                yield elapsed, CODE_ACTIONS[code]
+            else:
+                raise ValueError(f"unknown event code in replay: {code}")
+
+    def to_bytes(self) -> bytes:
+        """バイナリ形式に変換"""
+        header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, RANDOMIZERS.index(self.randomizer),
+                              self.width, self.height, self.seed, self.count)
+        return header + bytes(self.events)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, max_events: Optional[int] = None) -> 'Replay':
+        """バイナリ形式から復元（max_events を指定するとそれより多い入力は ValueError）"""
+        if len(data) < _HEADER.size:
+            raise ValueError("replay data is truncated")
+        magic, version, randomizer, width, height, seed, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError("not a replay or unsupported replay version")
+        if randomizer >= len(RANDOMIZERS):
+            raise ValueError("unknown randomizer in replay")
+        if max_events is not None and count > max_events:
+            raise ValueError(f"replay has more than {max_events} inputs")
+        if count > len(data) - _HEADER.size:
+            raise ValueError("replay data is truncated")  # every input takes at least one byte
+        return cls(seed, RANDOMIZERS[randomizer], width, height,
+                   bytearray(data[_HEADER.size:]), count)
+
+    def to_string(self) -> str:
+        """URL セーフな base64 文字列に変換（JSON での受け渡し用）"""
+        return base64.urlsafe_b64encode(self.to_bytes()).decode('ascii')
+
+    @classmethod
+    def from_string(cls, text: str, max_events: Optional[int] = None) -> 'Replay':
+        """to_string の文字列から復元"""
+        return cls.from_bytes(base64.urlsafe_b64decode(text.encode('ascii')), max_events)
+
+
+class ReplayRecorder:
+    """ゲームに適用した操作を時刻付きで記録する（``max_events`` 個で記録をやめる）"""
+
+    def __init__(self, game: TetrisGame, clock: Callable[[], float] = time.monotonic,
+                 replay: Optional[Replay] = None, max_events: int = MAX_REPLAY_EVENTS):
+        """ゲーム開始時点のシードと盤面サイズで記録を始める（replay を渡すとその続きから記録）"""
+        if replay is None:
+            replay = Replay(game.seed, game.randomizer, game.width, game.height)
+        self.replay = replay
+        self.clock = clock
+        self.max_events = max_events
+        self._last = clock()
+
+    @property
+    def full(self) -> bool:
+        """記録が上限に達したか（以降の操作はリプレイに残らない）"""
+        return self.replay.count >= self.max_events
+
+    def record(self, action: str, at: Optional[float] = None) -> None:
+        """操作を1つ記録（at は操作の時刻、省略時は現在時刻）"""
+        if not self.full:
+            self.replay.append(self._delta_ms(at), action)
+
+    def record_garbage(self, count: int, hole: int, at: Optional[float] = None) -> None:
+        """盤面に入ったおじゃま行を記録"""
+        if not self.full:
+            self.replay.append_garbage(self._delta_ms(at), count, hole)
+
+    def _delta_ms(self, at: Optional[float]) -> int:
+        """Milliseconds since the previous event."""
+        now = self.clock() if at is None else at
+        # Inputs reported out of order with the previous one are kept at the same time
+        delta_ms = max(0, int((now - self._last) * 1000))
+        # Carry the sub-millisecond remainder so timestamps do not drift
+        self._last += delta_ms / 1000
+        return delta_ms
+
+
+def play_replay(replay: Replay, engine: Type[TetrisGame] = TetrisGame,
+                until_ms: Optional[int] = None) -> TetrisGame:
+    """リプレイをヘッドレスで再シミュレーションし、最終状態のゲームを返す
+
+    ``until_ms`` を指定すると、その時刻までの入力だけを適用する。
+    """
+    game = engine(replay.width, replay.height, seed=replay.seed, randomizer=replay.randomizer)
+    for elapsed, event in replay:
+        if until_ms is not None and elapsed > until_ms:
+            break
+        if isinstance(event, Garbage):
+            game.add_garbage(event.count, event.hole)
+        else:
+            game.apply_action(event)
+    return game
+
+
+def verify_score(replay: Replay, score: int, lines: Optional[int] = None) -> bool:
+    """申告されたスコア（とライン数）がリプレイの再シミュレーション結果と一致するか"""
+    game = play_replay(replay)
+    return game.score == score and (lines is None or game.lines_cleared == lines)
@@ -0,0 +1,318 @@
+"""
+テトリス 対戦ルーム - 2〜N 人の対戦とおじゃま行、ルーム単位の自動落下
+"""
+
+import random
+import secrets
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from broadcast import Broadcast, sse_event
+from game_logic import TetrisGame, drop_interval
+from protocol import pack_cells
+from scheduler import TickScheduler
+from sessions import GameSession, SessionManager
+
+# Garbage rows sent for 1, 2, 3 and 4 lines cleared at once
+GARBAGE_TABLE = {1: 0, 2: 1, 3: 2, 4: 4}
+MAX_ROOM_PLAYERS = 8
+# Seconds a finished room stays readable (results, last spectator frame) before it is discarded
+FINISHED_ROOM_TTL = 60.0
+
+
+class Player:
+    """ルーム内の1人（セッションと、受け取ったまま盤面に入れていないおじゃま行）"""
+
+    __slots__ = ('index', 'session', 'pending_garbage', 'next_drop', 'target')
+
+    def __init__(self, index: int, session: GameSession):
+        self.index = index
+        self.session = session
+        self.pending_garbage = 0
+        self.next_drop = 0.0
+        # Offset of the next opponent to attack (round robin over the others)
+        self.target = 1
+
+    @property
+    def out(self) -> bool:
+        """ゲームオーバーか退出済みか"""
+        return self.session.closed or self.session.game.game_over
+
+
+class Room:
+    """1つの対戦ルーム。
+
+    全員が同じシードの 7-bag でピースを受け取り、ルームのタイマー1本で全員の
+    自動落下を進める。2 ライン以上消すと相手（生き残っている相手に順番に）に
+    おじゃま行を送り、自分に届いているおじゃま行があれば先に相殺する。
+    届いたおじゃま行は次のルームのティックで盤面に入る。
+
+    ロックの順序は「プレイヤーのセッション -> ルーム」。``lock`` を持ったまま
+    セッションのロックは取らない。
+    """
+
+    def __init__(self, room_id: str, size: int, engine=TetrisGame,
+                 clock: Callable[[], float] = time.monotonic,
+                 seed: Optional[int] = None):
+        """ルームを初期化"""
+        if not 2 <= size <= MAX_ROOM_PLAYERS:
+            raise ValueError(f"room size must be 2 to {MAX_ROOM_PLAYERS}")
+        self.room_id = room_id
+        self.size = size
+        self.engine = engine
+        self.clock = clock
+        self.seed = secrets.randbits(63) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.players: List[Player] = []
+        self.lock = threading.Lock()
+        self.started = False
+        self.finished = False
+        self.finished_at: Optional[float] = None
+        self.winner: Optional[int] = None
+        self._due: Optional[float] = None
+        # Spectators of the whole room; every player's changes notify it
+        self.broadcast = Broadcast(lambda: sse_event(self.summary()),
+                                   lambda: not self.abandoned)
+
+    @property
+    def full(self) -> bool:
+        return len(self.players) >= self.size
+
+    @property
+    def abandoned(self) -> bool:
+        """プレイヤーが全員退出済みか"""
+        return bool(self.players) and all(player.session.closed for player in self.players)
+
+    def new_game(self) -> TetrisGame:
+        """このルームのプレイヤー用のゲームを作成（全員同じピース順）"""
+        return self.engine(10, 20, seed=self.seed, randomizer='bag')
+
+    def add_player(self, session: GameSession) -> bool:
+        """プレイヤーを追加（開始まではゲームを一時停止しておく）
+
+        このプレイヤーで満員になったら True を返す。満員なら ValueError。
+        """
+        with session.lock:
+            with self.lock:
+                if self.full or self.started:
+                    raise ValueError("room is full")
+                self.players.append(Player(len(self.players), session))
+                filled = self.full
+            session.paused = True
+            session.on_lines = self._on_lines
+            session.broadcasts.append(self.broadcast)
+            self.broadcast.notify()
+        return filled
+
+    def start(self) -> float:
+        """対戦を開始し、最初のティックまでの秒数を返す"""
+        now = self.clock()
+        for player in self.players:
+            session = player.session
+            with session.lock:
+                session.paused = False
+                player.next_drop = now + drop_interval(session.game.level)
+                session.mark_changed()
+        with self.lock:
+            self.started = True
+        self.broadcast.notify()
+        return self._schedule(min(player.next_drop for player in self.players) - now)
+
+    def _on_lines(self, session: GameSession, lines: int) -> None:
+        """ラインを消したプレイヤーから相手におじゃま行を送る（送り主のロック保持中）"""
+        attack = GARBAGE_TABLE.get(lines, lines)
+        if attack <= 0:
+            return
+        with self.lock:
+            sender = next((p for p in self.players if p.session is session), None)
+            if sender is None or not self.started or self.finished:
+                return
+            # Incoming garbage is cancelled first
+            cancelled = min(attack, sender.pending_garbage)
+            sender.pending_garbage -= cancelled
+            attack -= cancelled
+            opponents = len(self.players) - 1
+            if attack <= 0 or opponents == 0:
+                return
+            for _ in range(opponents):
+                target = self.players[(sender.index + sender.target) % len(self.players)]
+                sender.target = sender.target % opponents + 1
+                if not target.out:
+                    height = target.session.game.height
+                    target.pending_garbage = min(target.pending_garbage + attack, height)
+                    metrics.garbage_lines.inc(amount=attack)
+                    return
+
+    def tick(self) -> Optional[float]:
+        """ルームのティック: 届いたおじゃま行を入れ、落下時刻の来たプレイヤーを1段落とす
+
+        次のティックまでの秒数を返す（決着したら None）。
+        """
+        now = self.clock()
+        if self._due is not None:
+            metrics.room_tick_lag.observe(max(0.0, now - self._due))
+        alive = []
+        for player in self.players:
+            session = player.session
+            with session.lock:
+                if player.out:
+                    continue
+                with self.lock:
+                    garbage = player.pending_garbage
+                    player.pending_garbage = 0
+                changed = False
+                game = session.game
+                if garbage:
+                    session.add_garbage(garbage, self.rng.randrange(game.width))
+                    changed = True
+                if player.next_drop <= now:
+                    if not session.paused and not game.game_over:
+                        session.apply('tick')
+                        changed = True
+                    player.next_drop = max(player.next_drop + drop_interval(game.level), now)
+                if changed:
+                    session.mark_changed()
+                if not game.game_over:
+                    alive.append(player)
+
+        with self.lock:
+            finished = len(alive) <= 1
+            if finished:
+                self.finished = True
+                self.finished_at = now
+                self.winner = alive[0].index if alive else None
+        if finished:
+            self.broadcast.notify()
+            return None
+        return self._schedule(min(player.next_drop for player in alive) - self.clock())
+
+    def _schedule(self, delay: float) -> float:
+        """次のティックの予定時刻を覚えて遅延を返す"""
+        delay = max(0.0, delay)
+        self._due = self.clock() + delay
+        return delay
+
+    def summary(self) -> Dict[str, object]:
+        """ルームの状態（プレイヤーはセッションIDではなく番号で示し、盤面は pack_cells 形式）"""
+        players = []
+        for player in list(self.players):
+            with player.session.lock:
+                game = player.session.game
+                players.append({
+                    'player': player.index,
+                    'score': game.score,
+                    'lines': game.lines_cleared,
+                    'level': game.level,
+                    'game_over': player.out,
+                    'pending_garbage': player.pending_garbage,
+                    'board': pack_cells(b''.join(game.board_view())),
+                })
+        return {
+            'room_id': self.room_id,
+            'size': self.size,
+            'started': self.started,
+            'finished': self.finished,
+            'winner': self.winner,
+            'players': players,
+        }
+
+
+class RoomManager:
+    """対戦ルームの作成・参加と、共有スケジューラーでのルームのティック。
+
+    ルームごとにタイマーは1本（キーは ``('room', room_id)``）で、プレイヤーごとの
+    自動落下タイマーは使わない。決着したルームは ``finished_ttl`` 秒後に同じタイマーで破棄する。
+    """
+
+    def __init__(self, sessions: SessionManager, scheduler: TickScheduler,
+                 engine=TetrisGame, clock: Callable[[], float] = time.monotonic,
+                 finished_ttl: float = FINISHED_ROOM_TTL):
+        """ルームマネージャーを初期化"""
+        self.sessions = sessions
+        self.scheduler = scheduler
+        self.engine = engine
+        self.clock = clock
+        self.finished_ttl = finished_ttl
+        self._rooms: Dict[str, Room] = {}
+        self._players: Dict[str, Room] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def create(self, size: int) -> Room:
+        """新しいルームを作成"""
+        self.prune()
+        with self._lock:
+            room_id = secrets.token_urlsafe(8)
+            while room_id in self._rooms:
+                room_id = secrets.token_urlsafe(8)
+            room = Room(room_id, size, self.engine, self.clock)
+            self._rooms[room_id] = room
+        return room
+
+    def get(self, room_id: str) -> Optional[Room]:
+        """ルームを取得"""
+        return self._rooms.get(room_id)
+
+    def room_of(self, session_id: str) -> Optional[Room]:
+        """セッションが参加しているルームを取得"""
+        return self._players.get(session_id)
+
+    def spectators(self) -> int:
+        """全ルームの観戦者数"""
+        with self._lock:
+            return sum(room.broadcast.subscribers for room in self._rooms.values())
+
+    def join(self, room: Room) -> GameSession:
+        """ルームに新しいプレイヤーとして参加し、そのセッションを返す（満員なら ValueError）"""
+        if room.full or room.started:
+            raise ValueError("room is full")
+        session = self.sessions.create(room.new_game())
+        try:
+            filled = room.add_player(session)
+        except ValueError:
+            self.sessions.remove(session.session_id)
+            raise
+        with self._lock:
+            self._players[session.session_id] = room
+        if filled:
+            self.start(room)
+        return session
+
+    def start(self, room: Room) -> None:
+        """対戦を開始し、ルームのタイマーを登録"""
+        delay = room.start()
+        self.scheduler.start()
+        self.scheduler.schedule(('room', room.room_id), delay, lambda: self._tick(room))
+
+    def _tick(self, room: Room) -> Optional[float]:
+        """Room timer: tick until the match is decided, then discard the room after the TTL."""
+        if room.finished:
+            self._discard([room])
+            return None
+        delay = room.tick()
+        return self.finished_ttl if delay is None else delay
+
+    def prune(self) -> int:
+        """決着して finished_ttl 秒たったか、全員いなくなったルームを破棄し、破棄した数を返す"""
+        now = self.clock()
+        with self._lock:
+            done = [room for room in self._rooms.values()
+                    if room.abandoned or (room.finished and now - room.finished_at >= self.finished_ttl)]
+        return self._discard(done)
+
+    def _discard(self, done: List[Room]) -> int:
+        """Unregister rooms, cancel their timers and end their spectator streams."""
+        with self._lock:
+            done = [room for room in done if self._rooms.get(room.room_id) is room]
+            for room in done:
+                del self._rooms[room.room_id]
+                for player in room.players:
+                    self._players.pop(player.session.session_id, None)
+        for room in done:
+            self.scheduler.cancel(('room', room.room_id))
+            room.broadcast.close()
+        return len(done)
@@ -0,0 +1,127 @@
+"""
+テトリス ティックスケジューラー - 1本のスレッドで多数のゲームの重力を駆動
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+# A timer callback returns the delay (seconds) until its next run, or None to stop.
+TimerCallback = Callable[[], Optional[float]]
+
+
+class TickScheduler:
+    """キー付きタイマーをヒープで管理し、期限の来たものから実行する。
+
+    ゲームごとにスレッドやタイマーを作らず、全セッションの自動落下を
+    このスケジューラーの1スレッドでまとめて処理する。同じキーで
+    ``schedule`` し直すと以前のタイマーは無効になる。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """スケジューラーを初期化"""
+        self.clock = clock
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._timers: Dict[Hashable, Tuple[int, TimerCallback]] = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def schedule(self, key: Hashable, delay: float, callback: TimerCallback) -> None:
+        """``delay`` 秒後に ``callback`` を実行するタイマーを登録"""
+        with self._cond:
+            seq = next(self._counter)
+            self._timers[key] = (seq, callback)
+            heapq.heappush(self._heap, (self.clock() + delay, seq, key))
+            self._cond.notify()
+
+    def cancel(self, key: Hashable) -> bool:
+        """タイマーを取り消す（ヒープ上のエントリは実行時に読み捨てる）"""
+        with self._cond:
+            return self._timers.pop(key, None) is not None
+
+    def run_pending(self) -> int:
+        """期限の来たタイマーをすべて実行し、実行した数を返す
+
+        例外を出したコールバックはログに記録してそのタイマーを止める（他のタイマーは続く）。
+        """
+        ran = 0
+        while True:
+            with self._cond:
+                entry = self._pop_due(self.clock())
+                if entry is None:
+                    return ran
+                key, seq, callback = entry
+
+            try:
+                delay = callback()
+            except Exception:
+                logging.getLogger(__name__).exception("timer %r failed; dropping it", key)
+                delay = None
+            ran += 1
+
+            with self._cond:
+                current = self._timers.get(key)
+                if current is None or current[0] != seq:
+                    continue  # cancelled or rescheduled while running
+                if delay is None:
+                    del self._timers[key]
+                else:
+                    heapq.heappush(self._heap, (self.clock() + delay, seq, key))
+
+    def _pop_due(self, now: float) -> Optional[Tuple[Hashable, int, TimerCallback]]:
+        """Pop the next live, due timer; caller holds ``_cond``."""
+        heap = self._heap
+        while heap:
+            due, seq, key = heap[0]
+            current = self._timers.get(key)
+            if current is None or current[0] != seq:
+                heapq.heappop(heap)  # stale entry
+                continue
+            if due > now:
+                return None
+            heapq.heappop(heap)
+            return key, seq, current[1]
+        return None
+
+    def _next_due(self) -> Optional[float]:
+        """Return the due time of the earliest timer; caller holds ``_cond``."""
+        return self._heap[0][0] if self._heap else None
+
+    def start(self) -> None:
+        """バックグラウンドスレッドでスケジューラーを開始"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='tick-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """スケジューラーを停止"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """Scheduler thread main loop."""
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                due = self._next_due()
+                timeout = None if due is None else due - self.clock()
+                if timeout is None or timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+            self.run_pending()
@@ -0,0 +1,419 @@
+"""
+テトリス セッション管理 - セッションIDごとに独立したゲームを保持
+"""
+
+import logging
+import secrets
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Type
+
+import metrics
+from broadcast import Broadcast
+from game_logic import TetrisGame
+from protocol import StateTracker
+from replay import Replay, ReplayRecorder
+from store import SessionStore, decode_game, encode_game
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# format, game data length, version, paused, input sequence, autoplayed;
+# followed by the game and the replay
+_SESSION_HEADER = struct.Struct('<BIQ?I?')
+_SESSION_FORMAT = 3
+# Restored sessions skip their version ahead of anything sent before the restart
+# (including changes that were never written back), so clients accept the new state
+RESTORE_VERSION_GAP = 1 << 20
+# Most inputs accepted in one batch (a frame's worth of key presses is a handful)
+MAX_BATCH_INPUTS = 64
+# Furthest back (seconds) an input is dated before its batch was received
+MAX_INPUT_AGE = 1.0
+
+
+class Input(NamedTuple):
+    """クライアントからの入力1つ（seq は連番、t はクライアントの時刻（ミリ秒、任意））"""
+    seq: int
+    action: str
+    t: Optional[float] = None
+
+
+class GameSession:
+    """1プレイヤー分のゲームと、その操作を直列化するロック。
+
+    ゲームの操作は ``lock`` を保持したまま :meth:`apply` で行い（リプレイに記録される）、
+    変更後に :meth:`mark_changed` を呼ぶ。``version`` が進み、``changed`` で待機している
+    ストリームが起こされる。``dirty`` は最後に書き戻してから変更があったかどうか、
+    ``input_seq`` は :meth:`apply_inputs` で受け付けた最後の入力の連番。
+    ``autoplayed`` は AI に操作させたことがあるか（ランキングには登録できない）。
+    ``on_lines`` を設定すると、ラインを消すたびに (セッション, 消したライン数) で呼ばれる
+    （ロック保持中に呼ばれるので、他のセッションのロックは取らないこと）。
+    ``broadcasts`` の観戦チャンネルには変更のたびに通知する。
+    """
+
+    __slots__ = ('session_id', 'game', 'lock', 'changed', 'version', 'tracker', 'recorder',
+                 'paused', 'closed', 'dirty', 'input_seq', 'autoplayed', 'on_lines', 'broadcasts',
+                 'listeners', 'created_at', 'last_access')
+
+    def __init__(self, session_id: str, game: TetrisGame, now: float,
+                 replay: Optional[Replay] = None):
+        self.session_id = session_id
+        self.game = game
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.version = 0
+        self.tracker = StateTracker()
+        self.recorder = ReplayRecorder(game, replay=replay)
+        self.paused = False
+        self.dirty = True
+        self.input_seq = 0
+        self.autoplayed = False
+        self.on_lines: Optional[Callable[['GameSession', int], None]] = None
+        self.broadcasts: List[Broadcast] = []
+        self.closed = False
+        self.listeners = 0
+        self.created_at = now
+        self.last_access = now
+
+    def apply(self, action: str, at: Optional[float] = None) -> bool:
+        """操作をゲームに適用してリプレイに記録（ロック保持中に呼ぶ、at はリプレイ上の時刻）"""
+        self.recorder.record(action, at)
+        game = self.game
+        lines = game.lines_cleared
+        was_over = game.game_over
+        start = time.perf_counter()
+        result = game.apply_action(action)
+        metrics.game_action_latency.observe(time.perf_counter() - start, action)
+        metrics.game_actions.inc(action)
+        if game.lines_cleared != lines:
+            metrics.lines_cleared.inc(str(game.lines_cleared - lines))
+            if self.on_lines is not None:
+                self.on_lines(self, game.lines_cleared - lines)
+        if game.game_over and not was_over:
+            metrics.games_over.inc()
+        return result
+
+    def add_garbage(self, count: int, hole: int) -> bool:
+        """おじゃま行を盤面に入れてリプレイに記録（ロック保持中に呼ぶ）"""
+        self.recorder.record_garbage(count, hole)
+        was_over = self.game.game_over
+        result = self.game.add_garbage(count, hole)
+        if self.game.game_over and not was_over:
+            metrics.games_over.inc()
+        return result
+
+    def apply_inputs(self, inputs: Sequence[Input]) -> int:
+        """連番付きの入力をまとめて適用し、適用した数を返す（ロック保持中に呼ぶ）
+
+        受け付け済みの連番以下の入力（再送）は無視する。一時停止中やゲームオーバー後の
+        入力は適用せずに受け付け済みにする。リプレイには、最後の入力を受け取った時刻から
+        クライアントの時刻の差だけさかのぼった時刻（最大 ``MAX_INPUT_AGE`` 秒）で記録する。
+        """
+        applied = 0
+        received = self.recorder.clock()
+        last_t = inputs[-1].t if inputs else None
+        for entry in inputs:
+            if entry.seq <= self.input_seq:
+                continue
+            self.input_seq = entry.seq
+            if self.paused or self.game.game_over:
+                continue
+            at = None
+            if entry.t is not None and last_t is not None:
+                at = received - min(max(0.0, last_t - entry.t) / 1000, MAX_INPUT_AGE)
+            self.apply(entry.action, at)
+            applied += 1
+        return applied
+
+    def mark_changed(self) -> None:
+        """状態のバージョンを進めて待機中のストリームに通知（ロック保持中に呼ぶ）"""
+        self.version += 1
+        self.dirty = True
+        self.changed.notify_all()
+        for channel in self.broadcasts:
+            channel.notify()
+
+    def to_bytes(self) -> bytes:
+        """ゲーム・リプレイ・バージョンをバイト列に変換（ロック保持中に呼ぶ）"""
+        game = encode_game(self.game)
+        header = _SESSION_HEADER.pack(_SESSION_FORMAT, len(game), self.version, self.paused,
+                                      self.input_seq, self.autoplayed)
+        return b''.join((header, game, self.recorder.replay.to_bytes()))
+
+    @classmethod
+    def from_bytes(cls, session_id: str, data: bytes, now: float,
+                   engine: Type[TetrisGame] = TetrisGame) -> 'GameSession':
+        """to_bytes のバイト列からセッションを復元"""
+        (format_version, game_length, version, paused, input_seq,
+         autoplayed) = _SESSION_HEADER.unpack_from(data)
+        if format_version != _SESSION_FORMAT:
+            raise ValueError(f"unsupported session format: {format_version}")
+        start = _SESSION_HEADER.size
+        game = decode_game(data[start:start + game_length], engine)
+        replay = Replay.from_bytes(data[start + game_length:])
+        session = cls(session_id, game, now, replay)
+        session.version = version + RESTORE_VERSION_GAP
+        session.paused = paused
+        session.input_seq = input_seq
+        session.autoplayed = autoplayed
+        session.dirty = False
+        return session
+
+    def close(self) -> None:
+        """セッションを終了し、待機中のストリーム・観戦者と重力タイマーを止める"""
+        with self.lock:
+            self.closed = True
+            self.changed.notify_all()
+            for channel in self.broadcasts:
+                channel.notify()
+
+
+def estimate_game_bytes(game: TetrisGame) -> int:
+    """ゲーム1つが保持するおおよそのメモリ量（バイト）を見積もる"""
+    size = sys.getsizeof(game) + sys.getsizeof(game.__dict__)
+    size += sys.getsizeof(game.board) + sum(sys.getsizeof(row) for row in game.board)
+    return size
+
+
+class SessionManager:
+    """容量上限とアイドルタイムアウト付きのセッションストア。
+
+    セッションは最終アクセス順（LRU）に並べて保持する。新規作成時に
+    アイドル時間を超えたセッションを先頭から破棄し、それでも容量を
+    超える場合は最も古いセッションを追い出す。管理用のロックは辞書操作の
+    間だけ保持し、ゲームの操作は各セッションの ``lock`` で直列化する。
+
+    ``store`` を渡すと、変更のあったセッションを :meth:`flush` でまとめて書き戻し、
+    メモリにないセッションは :meth:`get` で読み込む。容量超過で追い出したセッションは
+    書き戻してから閉じるので、再アクセスすれば続きから遊べる。
+    """
+
+    def __init__(self, game_factory: Callable[[], TetrisGame],
+                 capacity: int = 1000, idle_timeout: float = 1800.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 store: Optional[SessionStore] = None,
+                 engine: Type[TetrisGame] = TetrisGame):
+        """セッションマネージャーを初期化"""
+        self.game_factory = game_factory
+        self.capacity = capacity
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self.store = store
+        self.engine = engine
+        self._sessions: 'OrderedDict[str, GameSession]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._writeback: Optional[threading.Thread] = None
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+        self.restored = 0
+        self.written = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, game: Optional[TetrisGame] = None) -> GameSession:
+        """新しいゲームセッションを作成（game を省略すると game_factory で作る）"""
+        if game is None:
+            game = self.game_factory()
+        with self._lock:
+            now = self.clock()
+            expired = self._expire_idle_locked(now)
+            session_id = secrets.token_urlsafe(12)
+            while session_id in self._sessions:
+                session_id = secrets.token_urlsafe(12)
+            session = GameSession(session_id, game, now)
+            evicted = self._insert_locked(session)
+            self.created += 1
+
+        self._discard(expired)
+        self._evict(evicted)
+        return session
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        """セッションを取得して最終アクセス時刻を更新（期限切れなら None）
+
+        メモリになければストアから復元する。
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                now = self.clock()
+                expired = now - session.last_access > self.idle_timeout
+                if expired:
+                    del self._sessions[session_id]
+                    self.expired += 1
+                else:
+                    session.last_access = now
+                    self._sessions.move_to_end(session_id)
+
+        if session is None:
+            return self._load(session_id)
+        if expired:
+            self._discard([session])
+            return None
+        return session
+
+    def peek(self, session_id: str) -> Optional[GameSession]:
+        """メモリ上のセッションを取得（最終アクセス時刻は更新せず、ストアからも読まない）"""
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def _load(self, session_id: str) -> Optional[GameSession]:
+        """ストアからセッションを復元して登録（なければ None）"""
+        if self.store is None:
+            return None
+        data = self.store.load(session_id, max_age=self.idle_timeout)
+        if data is None:
+            return None
+        try:
+            session = GameSession.from_bytes(session_id, data, self.clock(), self.engine)
+        except (ValueError, IndexError, struct.error):
+            # Unreadable (e.g. an older format); the player starts a new game
+            self.store.delete(session_id)
+            return None
+
+        with self._lock:
+            current = self._sessions.get(session_id)
+            if current is not None:
+                # Another request restored it first
+                current.last_access = self.clock()
+                self._sessions.move_to_end(session_id)
+                return current
+            evicted = self._insert_locked(session)
+            self.restored += 1
+        self._evict(evicted)
+        return session
+
+    def _insert_locked(self, session: GameSession) -> List[GameSession]:
+        """Add a session, unlinking the least recently used ones beyond capacity.
+
+        The caller holds ``_lock`` and passes the returned sessions to :meth:`_evict`.
+        """
+        evicted = []
+        while len(self._sessions) >= self.capacity:
+            evicted.append(self._sessions.popitem(last=False)[1])
+            self.evicted += 1
+        self._sessions[session.session_id] = session
+        return evicted
+
+    def _evict(self, sessions: List[GameSession]) -> None:
+        """追い出したセッションをストアに書き戻してから閉じる"""
+        if self.store is not None and sessions:
+            self._write(sessions)
+        for session in sessions:
+            session.close()
+
+    def _discard(self, sessions: List[GameSession]) -> None:
+        """破棄したセッションを閉じてストアからも削除"""
+        for session in sessions:
+            session.close()
+            if self.store is not None:
+                self.store.delete(session.session_id)
+
+    def remove(self, session_id: str) -> bool:
+        """セッションを削除"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            if self.store is not None:
+                self.store.delete(session_id)
+            return False
+        self._discard([session])
+        return True
+
+    def expire_idle(self) -> int:
+        """アイドル時間を超えたセッションを破棄し、破棄した数を返す"""
+        with self._lock:
+            removed = self._expire_idle_locked(self.clock())
+        self._discard(removed)
+        if self.store is not None:
+            self.store.purge(self.idle_timeout)
+        return len(removed)
+
+    def flush(self) -> int:
+        """前回から変更のあったセッションをまとめてストアに書き戻し、書き戻した数を返す"""
+        if self.store is None:
+            return 0
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return self._write(sessions)
+
+    def _write(self, sessions: List[GameSession]) -> int:
+        """Encode the dirty sessions under their own locks and save them in one batch."""
+        items = []
+        for session in sessions:
+            with session.lock:
+                if session.dirty and not session.closed:
+                    items.append((session, session.to_bytes()))
+                    session.dirty = False
+        if not items:
+            return 0
+        try:
+            self.store.save_many((session.session_id, data) for session, data in items)
+        except BaseException:
+            for session, _ in items:
+                session.dirty = True
+            raise
+        self.written += len(items)
+        return len(items)
+
+    def start_writeback(self, interval: float) -> None:
+        """interval 秒ごとに :meth:`flush` するバックグラウンドスレッドを開始（既に動いていれば何もしない）"""
+        if self.store is None or self._writeback is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception:
+                    # The sessions stay dirty and are written on the next attempt
+                    logging.getLogger(__name__).exception("session write-back failed")
+
+        self._writeback = threading.Thread(target=run, name='session-writeback', daemon=True)
+        self._writeback.start()
+
+    def _expire_idle_locked(self, now: float) -> List[GameSession]:
+        """Unlink idle sessions from the LRU head; caller holds ``_lock``.
+
+        The returned sessions still have to be closed once ``_lock`` is released.
+        """
+        removed = []
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.idle_timeout:
+                break
+            del self._sessions[session_id]
+            removed.append(session)
+        self.expired += len(removed)
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        """稼働中のセッション数とメモリ使用量を取得"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            stats: Dict[str, object] = {
+                'sessions': len(sessions),
+                'capacity': self.capacity,
+                'idle_timeout': self.idle_timeout,
+                'created': self.created,
+                'evicted': self.evicted,
+                'expired': self.expired,
+            }
+            if self.store is not None:
+                stats['restored'] = self.restored
+                stats['written'] = self.written
+
+        session_bytes = estimate_game_bytes(sessions[-1].game) if sessions else 0
+        stats['approx_session_bytes'] = session_bytes
+        stats['approx_total_bytes'] = session_bytes * len(sessions)
+        if resource is not None:
+            stats['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return stats
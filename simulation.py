@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+テトリス ヘッドレスシミュレーション - 入力ポリシーで大量のゲームを並列実行
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from ai import AIPlayer
+from game_logic import RANDOMIZERS, TetrisGame
+
+
+class Policy:
+    """入力ポリシーの基底クラス。
+
+    ピースが出現するたびに :meth:`plan` が呼ばれ、返した操作を順に適用した後で
+    ハードドロップする。ワーカープロセスへ渡すため、サブクラスはピクル可能に保つ。
+    """
+
+    def reset(self, rng: random.Random) -> None:
+        """ゲーム開始時に呼ばれる（ポリシー用の乱数生成器を受け取る）"""
+        self.rng = rng
+
+    def plan(self, game: TetrisGame) -> Sequence[str]:
+        """現在のピースに対する操作列を返す"""
+        raise NotImplementedError
+
+
+class RandomPolicy(Policy):
+    """ランダムに回転・左右移動してから落とすポリシー"""
+
+    def plan(self, game: TetrisGame) -> Sequence[str]:
+        """現在のピースに対する操作列を返す"""
+        rng = self.rng
+        actions = ['rotate'] * rng.randrange(4)
+        shift = rng.randint(-game.width // 2, game.width // 2)
+        actions += ['left' if shift < 0 else 'right'] * abs(shift)
+        return actions
+
+
+class ScriptedPolicy(Policy):
+    """ピースごとの操作列を順番に（繰り返し）適用するポリシー"""
+
+    def __init__(self, script: Sequence[Sequence[str]]):
+        self.script = [tuple(actions) for actions in script]
+        self.index = 0
+
+    def reset(self, rng: random.Random) -> None:
+        """ゲーム開始時に呼ばれる（ポリシー用の乱数生成器を受け取る）"""
+        super().reset(rng)
+        self.index = 0
+
+    def plan(self, game: TetrisGame) -> Sequence[str]:
+        """現在のピースに対する操作列を返す"""
+        actions = self.script[self.index % len(self.script)]
+        self.index += 1
+        return actions
+
+
+class AIPolicy(Policy):
+    """ai.AIPlayer の配置探索で操作を決めるポリシー"""
+
+    def __init__(self, **options):
+        self.options = options
+        self.player = None
+
+    def reset(self, rng: random.Random) -> None:
+        """ゲーム開始時に呼ばれる（探索キャッシュはゲームをまたいで再利用）"""
+        super().reset(rng)
+        if self.player is None:
+            self.player = AIPlayer(**self.options)
+
+    def plan(self, game: TetrisGame) -> Sequence[str]:
+        """現在のピースに対する操作列を返す"""
+        return self.player.plan(game)
+
+
+POLICIES: Dict[str, Callable[[], Policy]] = {
+    'random': RandomPolicy,
+    'ai': lambda: AIPolicy(lookahead=False),
+    'ai-lookahead': AIPolicy,
+    'left-right': lambda: ScriptedPolicy([['left'] * 5, ['right'] * 5, []]),
+}
+
+
+@dataclass
+class GameResult:
+    """1ゲーム分のシミュレーション結果"""
+    seed: int
+    score: int
+    lines: int
+    pieces: int
+    duration: float
+    game_over: bool
+
+
+def play_game(seed: int, policy: Policy, engine: Type[TetrisGame] = TetrisGame,
+              width: int = 10, height: int = 20, max_pieces: int = 10000,
+              randomizer: str = 'uniform') -> GameResult:
+    """1ゲームを最後まで（または max_pieces 個まで）ヘッドレスで実行"""
+    start = time.perf_counter()
+    policy.reset(random.Random(seed ^ 0x5EED))
+    game = engine(width, height, seed=seed, randomizer=randomizer)
+    pieces = 0
+
+    while not game.game_over and pieces < max_pieces:
+        for action in policy.plan(game):
+            game.apply_action(action)
+        game.hard_drop()
+        pieces += 1
+        game.tick()
+
+    return GameResult(seed, game.score, game.lines_cleared, pieces,
+                      time.perf_counter() - start, game.game_over)
+
+
+def _play_chunk(args: Tuple[List[int], Policy, Type[TetrisGame], int, int, int, str]) -> List[GameResult]:
+    """ワーカープロセスで複数のゲームを実行"""
+    seeds, policy, engine, width, height, max_pieces, randomizer = args
+    return [play_game(seed, policy, engine, width, height, max_pieces, randomizer) for seed in seeds]
+
+
+def run_batch(num_games: int, policy: Policy, seed: int = 0, workers: Optional[int] = None,
+              engine: Type[TetrisGame] = TetrisGame, width: int = 10, height: int = 20,
+              max_pieces: int = 10000, chunk_size: int = 64,
+              randomizer: str = 'uniform') -> Iterator[GameResult]:
+    """num_games 個のゲームを全コアで実行し、終わった順に結果を返す
+
+    ゲーム i のシードは ``seed + i``。``workers=1`` のときはプロセスを作らずに実行する。
+    """
+    seeds = range(seed, seed + num_games)
+    if workers == 1:
+        for game_seed in seeds:
+            yield play_game(game_seed, policy, engine, width, height, max_pieces, randomizer)
+        return
+
+    chunks = (
+        (list(seeds[i:i + chunk_size]), policy, engine, width, height, max_pieces, randomizer)
+        for i in range(0, num_games, chunk_size)
+    )
+    with multiprocessing.Pool(workers) as pool:
+        for results in pool.imap_unordered(_play_chunk, chunks):
+            yield from results
+
+
+def main():
+    """コマンドラインからシミュレーションを実行"""
+    parser = argparse.ArgumentParser(description="Run headless Tetris games")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="default: all cores")
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='random')
+    parser.add_argument('--engine', choices=['list', 'bitboard'], default='list')
+    parser.add_argument('--randomizer', choices=RANDOMIZERS, default='uniform')
+    parser.add_argument('--max-pieces', type=int, default=10000)
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--quiet', action='store_true', help="only print the summary")
+    args = parser.parse_args()
+
+    engine = TetrisGame
+    if args.engine == 'bitboard':
+        from bitboard import BitboardTetrisGame
+        engine = BitboardTetrisGame
+
+    start = time.perf_counter()
+    games = total_score = total_lines = total_pieces = 0
+    for result in run_batch(args.games, POLICIES[args.policy](), args.seed, args.workers,
+                            engine, max_pieces=args.max_pieces, chunk_size=args.chunk_size,
+                            randomizer=args.randomizer):
+        games += 1
+        total_score += result.score
+        total_lines += result.lines
+        total_pieces += result.pieces
+        if not args.quiet:
+            print(json.dumps(asdict(result)))
+    elapsed = time.perf_counter() - start
+
+    print(f"games={games} elapsed={elapsed:.2f}s games/hour={games / elapsed * 3600:,.0f} "
+          f"avg_score={total_score / max(games, 1):.1f} avg_lines={total_lines / max(games, 1):.2f} "
+          f"avg_pieces={total_pieces / max(games, 1):.1f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,19 @@
+// セルのクラス名はピースタイプごとに一度だけ組み立てて使い回す
+const PIECE_TYPES = ['I', 'O', 'T', 'S', 'Z', 'J', 'L'];
+const BLOCK_CLASS = 'board-block';
+const FILLED_CLASSES = {};
+const CURRENT_CLASSES = {};
+PIECE_TYPES.forEach((type) => {
+    FILLED_CLASSES[type] = `${BLOCK_CLASS} filled ${type}`;
+    CURRENT_CLASSES[type] = `${BLOCK_CLASS} filled current ${type}`;
+});
+// セル値 -> クラス名（0 は空、1〜7 はピース、8 は対戦のおじゃま行）
+const CELL_CLASSES = [BLOCK_CLASS]
+    .concat(PIECE_TYPES.map((type) => FILLED_CLASSES[type]))
+    .concat([`${BLOCK_CLASS} filled garbage`]);
+// 1回のリクエストで送る入力の上限（サーバーの MAX_BATCH_INPUTS と同じ）
+const MAX_BATCH_INPUTS = 64;
+
 class TetrisGame {
     constructor() {
         this.gameBoard = document.getElementById('gameBoard');
@@ -9,6 +25,11 @@ class TetrisGame {
         this.pauseButton = document.getElementById('pauseButton');
         this.gameOverModal = document.getElementById('gameOverModal');
         this.retryButton = document.getElementById('retryButton');
+        this.scoreForm = document.getElementById('scoreForm');
+        this.playerName = document.getElementById('playerName');
+        this.submitScoreButton = document.getElementById('submitScoreButton');
+        this.scoreRank = document.getElementById('scoreRank');
+        this.leaderboardList = document.getElementById('leaderboard');
         
         // モバイルコントロール要素
         this.leftBtn = document.getElementById('leftBtn');
@@ -21,8 +42,30 @@ class TetrisGame {
         this.isRunning = false;
         this.isPaused = false;
         this.gameState = null;
-        this.gameSpeed = 500; // ms
+        this.sessionId = null;
+        this.gameSpeed = 500; // ms（EventSource 非対応ブラウザのポーリング間隔）
         this.gameLoopInterval = null;
+        this.eventSource = null;
+        
+        // 入力はフレームごとにまとめて送り、サーバーの応答を待たずに手元で先に動かす
+        this.inputSeq = 0;
+        this.pendingInputs = [];  // まだ送っていない入力
+        this.sentInputs = [];     // 送ったがサーバーの状態に反映されていない入力
+        this.inputFlushPending = false;
+        this.inputInFlight = false;
+        
+        // 描画済みの状態（差分描画用）
+        this.boardWidth = 0;
+        this.boardHeight = 0;
+        this.boardCells = [];
+        this.boardClasses = [];
+        this.nextFrame = [];
+        this.renderPending = false;
+        this.renderedScore = null;
+        this.renderedLevel = null;
+        this.renderedLines = null;
+        this.renderedNextPiece = null;
+        this.nextPieceLabel = null;
         
         this.setupEventListeners();
         this.setupMobileControls();
@@ -33,6 +76,10 @@ class TetrisGame {
         this.startButton.addEventListener('click', () => this.startGame());
         this.pauseButton.addEventListener('click', () => this.togglePause());
         this.retryButton.addEventListener('click', () => this.startGame());
+        this.scoreForm.addEventListener('submit', (e) => {
+            e.preventDefault();
+            this.submitScore();
+        });
         
         // キーボード入力
         document.addEventListener('keydown', (e) => this.handleKeyPress(e));
@@ -88,52 +135,250 @@ class TetrisGame {
         button.addEventListener('touchend', handleEnd);
     }
     
-    async moveLeft() {
-        if (!this.isRunning || this.isPaused) return;
-        await this.makeMove('left');
+    moveLeft() {
+        this.queueInput('left');
     }
     
-    async moveRight() {
-        if (!this.isRunning || this.isPaused) return;
-        await this.makeMove('right');
+    moveRight() {
+        this.queueInput('right');
     }
     
-    async moveDown() {
-        if (!this.isRunning || this.isPaused) return;
-        await this.makeMove('down');
+    moveDown() {
+        this.queueInput('down');
     }
     
-    async moveUp() {
-        if (!this.isRunning || this.isPaused) return;
-        await this.makeMove('rotate');
+    moveUp() {
+        this.queueInput('rotate');
     }
     
-    async rotate() {
-        if (!this.isRunning || this.isPaused) return;
-        await this.makeMove('rotate');
+    rotate() {
+        this.queueInput('rotate');
+    }
+    
+    drop() {
+        this.queueInput('drop');
+    }
+    
+    apiUrl(path, withSince = true) {
+        // セッションIDと手元の状態バージョンを付与し、差分だけを受け取る
+        const params = new URLSearchParams({ format: 'packed' });
+        if (this.sessionId) {
+            params.set('session_id', this.sessionId);
+            if (withSince && this.gameState && this.gameState.session_id === this.sessionId) {
+                params.set('since', this.gameState.version);
+            }
+        }
+        return `${path}?${params}`;
+    }
+    
+    decodeCells(packed) {
+        // base64 のセル値（b64u8: 1 セル 1 バイト）を配列に戻す
+        const bytes = atob(packed);
+        const cells = new Array(bytes.length);
+        for (let i = 0; i < cells.length; i++) {
+            cells[i] = bytes.charCodeAt(i);
+        }
+        return cells;
+    }
+    
+    mergeState(state) {
+        // 全体スナップショットまたは差分から新しい状態を組み立てる（適用できなければ null）
+        if (state.full) {
+            if (state.encoding) {
+                const cells = this.decodeCells(state.board);
+                state.board = [];
+                for (let y = 0; y < state.height; y++) {
+                    state.board.push(cells.slice(y * state.width, (y + 1) * state.width));
+                }
+            }
+            return state;
+        }
+        
+        const current = this.gameState;
+        if (!current || current.session_id !== state.session_id || state.since > current.version) {
+            return null;
+        }
+        const merged = Object.assign({}, current, state);
+        merged.board = current.board.slice();
+        state.rows.forEach(([y, row]) => {
+            merged.board[y] = state.encoding ? this.decodeCells(row) : row;
+        });
+        delete merged.rows;
+        return merged;
+    }
+    
+    applyState(state) {
+        // ストリームと移動レスポンスの到着順が前後しても古い状態で上書きしない
+        if (this.gameState && state.session_id === this.sessionId &&
+            state.version < this.gameState.version) {
+            return;
+        }
+        const merged = this.mergeState(state);
+        if (!merged) {
+            this.refreshState();
+            return;
+        }
+        this.gameState = merged;
+        this.sessionId = merged.session_id;
+        // サーバーが受け付けた入力は予測から外す
+        const ack = merged.input_seq || 0;
+        this.sentInputs = this.sentInputs.filter((input) => input.seq > ack);
+        this.scheduleRender();
+        
+        if (this.isRunning && merged.game_over) {
+            this.endGame();
+        }
+    }
+    
+    async handleStateResponse(response) {
+        if (response.status === 404) {
+            this.sessionLost();
+            return;
+        }
+        this.applyState(await response.json());
+    }
+    
+    sessionLost() {
+        // サーバーがセッションを知らない（再起動や追い出し）ので、新しいゲームを始め直してもらう
+        console.error('セッションが見つかりません');
+        this.isRunning = false;
+        this.sessionId = null;
+        clearInterval(this.gameLoopInterval);
+        this.closeStream();
+        this.pendingInputs = [];
+        this.sentInputs = [];
+        this.startButton.disabled = false;
+        this.pauseButton.disabled = true;
+        this.startButton.textContent = '▶ 開始';
     }
     
-    async drop() {
+    scheduleRender() {
+        // 1フレームに複数の状態が届いても描画は1回にまとめる
+        if (this.renderPending) return;
+        this.renderPending = true;
+        requestAnimationFrame(() => {
+            this.renderPending = false;
+            this.renderBoard(this.predictState());
+            this.updateUI();
+        });
+    }
+    
+    queueInput(action) {
+        // 入力に連番と時刻を付けて溜め、次のフレームでまとめて送る
         if (!this.isRunning || this.isPaused) return;
-        await this.makeMove('drop');
+        this.inputSeq += 1;
+        this.pendingInputs.push({ seq: this.inputSeq, action, t: performance.now() });
+        this.scheduleRender();
+        if (!this.inputFlushPending) {
+            this.inputFlushPending = true;
+            requestAnimationFrame(() => {
+                this.inputFlushPending = false;
+                this.flushInputs();
+            });
+        }
     }
     
-    async makeMove(direction) {
+    async flushInputs() {
+        // 送信中のバッチがあれば応答を待つ（入力の順序を保つ）
+        if (this.inputInFlight || this.pendingInputs.length === 0) return;
+        const batch = this.pendingInputs.splice(0, MAX_BATCH_INPUTS);
+        this.sentInputs.push(...batch);
+        this.inputInFlight = true;
         try {
-            const response = await fetch(`/api/game/move/${direction}`, { method: 'POST' });
-            this.gameState = await response.json();
-            this.renderBoard();
-            this.updateUI();
+            const response = await fetch(this.apiUrl('/api/game/input'), {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ inputs: batch }),
+            });
+            if (response.status === 404) {
+                this.sessionLost();
+            } else if (response.ok) {
+                this.applyState(await response.json());
+            } else {
+                // 受け付けられなかった入力は予測からも外す
+                console.error('入力エラー:', response.status);
+                this.sentInputs = [];
+                this.scheduleRender();
+            }
+        } catch (error) {
+            // 連番付きなので、届いていた入力を再送しても二重には適用されない
+            console.error('入力送信エラー:', error);
+            this.pendingInputs.unshift(...this.sentInputs);
+            this.sentInputs = [];
+        } finally {
+            this.inputInFlight = false;
+        }
+        if (this.pendingInputs.length > 0 && this.isRunning) {
+            this.flushInputs();
+        }
+    }
+    
+    fits(board, piece, x, y) {
+        // サーバーの TetrisGame._fits と同じ判定
+        for (const [blockX, blockY] of piece) {
+            const boardX = x + blockX;
+            const boardY = y + blockY;
+            if (boardX < 0 || boardX >= board[0].length || boardY >= board.length) return false;
+            if (boardY >= 0 && board[boardY][boardX] !== 0) return false;
+        }
+        return true;
+    }
+    
+    rotateCells(piece) {
+        // 90度時計回りに回して原点に寄せる（サーバーの回転テーブルと同じ形になる）
+        const rotated = piece.map(([x, y]) => [-y, x]);
+        const minX = Math.min(...rotated.map(([x]) => x));
+        const minY = Math.min(...rotated.map(([, y]) => y));
+        return rotated.map(([x, y]) => [x - minX, y - minY]);
+    }
+    
+    predictState() {
+        // サーバーの状態に未反映の入力を重ねた、表示用の状態（ピースの位置だけを予測）
+        const state = this.gameState;
+        const inputs = this.sentInputs.concat(this.pendingInputs);
+        if (inputs.length === 0 || !state.piece || state.game_over || state.paused) {
+            return state;
+        }
+        const board = state.board;
+        let piece = state.piece;
+        let x = state.piece_x;
+        let y = state.piece_y;
+        for (const { action } of inputs) {
+            if (action === 'left' || action === 'right') {
+                const dx = action === 'left' ? -1 : 1;
+                if (this.fits(board, piece, x + dx, y)) x += dx;
+            } else if (action === 'rotate') {
+                const rotated = this.rotateCells(piece);
+                if (this.fits(board, rotated, x, y)) piece = rotated;
+            } else if (action === 'down' && this.fits(board, piece, x, y + 1)) {
+                y += 1;
+            } else {
+                // 固定やハードドロップはサーバーの結果を待つ
+                break;
+            }
+        }
+        return Object.assign({}, state, { piece, piece_x: x, piece_y: y });
+    }
+    
+    async refreshState() {
+        // 差分を適用できないときは全体スナップショットを取り直す
+        try {
+            const response = await fetch(this.apiUrl('/api/game/state', false));
+            await this.handleStateResponse(response);
         } catch (error) {
-            console.error('移動エラー:', error);
+            console.error('状態取得エラー:', error);
         }
     }
     
     async initializeBoard() {
         try {
-            const response = await fetch('/api/game/new');
-            this.gameState = await response.json();
-            this.renderBoard();
+            const response = await fetch(this.apiUrl('/api/game/new', false));
+            this.gameState = this.mergeState(await response.json());
+            this.sessionId = this.gameState.session_id;
+            this.inputSeq = 0;
+            this.pendingInputs = [];
+            this.sentInputs = [];
+            this.renderBoard(this.gameState);
             this.updateUI();
         } catch (error) {
             console.error('ボード初期化エラー:', error);
@@ -150,14 +395,47 @@ class TetrisGame {
         this.pauseButton.disabled = false;
         this.pauseButton.textContent = '⏸ 一時停止';
         
-        this.gameLoopInterval = setInterval(() => this.gameLoop(), this.gameSpeed);
+        if (window.EventSource) {
+            this.openStream();
+        } else {
+            this.gameLoopInterval = setInterval(() => this.gameLoop(), this.gameSpeed);
+        }
     }
     
-    togglePause() {
+    openStream() {
+        // 自動落下はサーバーが実行し、状態の変化だけがストリームで届く
+        this.closeStream();
+        this.eventSource = new EventSource(this.apiUrl('/api/game/stream'));
+        this.eventSource.onmessage = (event) => this.applyState(JSON.parse(event.data));
+        this.eventSource.onerror = (error) => {
+            console.error('ストリームエラー:', error);
+            // 404 などで閉じられたストリームは再接続しないので、状態を取り直して原因を確かめる
+            if (this.eventSource && this.eventSource.readyState === EventSource.CLOSED) {
+                this.refreshState();
+            }
+        };
+    }
+    
+    closeStream() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+    
+    async togglePause() {
         this.isPaused = !this.isPaused;
         this.pauseButton.textContent = this.isPaused ? '▶ 再開' : '⏸ 一時停止';
         
-        if (this.isPaused) {
+        if (this.eventSource) {
+            const action = this.isPaused ? 'pause' : 'resume';
+            try {
+                const response = await fetch(this.apiUrl(`/api/game/${action}`), { method: 'POST' });
+                await this.handleStateResponse(response);
+            } catch (error) {
+                console.error('一時停止エラー:', error);
+            }
+        } else if (this.isPaused) {
             clearInterval(this.gameLoopInterval);
         } else {
             this.gameLoopInterval = setInterval(() => this.gameLoop(), this.gameSpeed);
@@ -168,21 +446,14 @@ class TetrisGame {
         if (!this.isRunning || this.isPaused) return;
         
         try {
-            const response = await fetch('/api/game/tick', { method: 'POST' });
-            this.gameState = await response.json();
-            
-            this.renderBoard();
-            this.updateUI();
-            
-            if (this.gameState.game_over) {
-                this.endGame();
-            }
+            const response = await fetch(this.apiUrl('/api/game/tick'), { method: 'POST' });
+            await this.handleStateResponse(response);
         } catch (error) {
             console.error('ゲームループエラー:', error);
         }
     }
     
-    async handleKeyPress(event) {
+    handleKeyPress(event) {
         if (!this.isRunning || this.isPaused) return;
         
         let direction = null;
@@ -211,81 +482,106 @@ class TetrisGame {
         }
         
         if (direction) {
-            await this.makeMove(direction);
+            this.queueInput(direction);
+        }
+    }
+    
+    buildBoardGrid(width, height) {
+        // 盤面サイズが変わったときだけセル要素を作り直す
+        this.boardWidth = width;
+        this.boardHeight = height;
+        this.gameBoard.style.gridTemplateColumns = `repeat(${width}, 1fr)`;
+        this.gameBoard.style.gridTemplateRows = `repeat(${height}, 1fr)`;
+        this.gameBoard.style.aspectRatio = `${width} / ${height}`;
+        
+        const fragment = document.createDocumentFragment();
+        this.boardCells = new Array(width * height);
+        this.boardClasses = new Array(width * height).fill(BLOCK_CLASS);
+        this.nextFrame = new Array(width * height);
+        for (let i = 0; i < width * height; i++) {
+            const block = document.createElement('div');
+            block.className = BLOCK_CLASS;
+            this.boardCells[i] = block;
+            fragment.appendChild(block);
         }
+        this.gameBoard.replaceChildren(fragment);
     }
     
-    renderBoard() {
-        // ボードをクリア
-        this.gameBoard.innerHTML = '';
+    renderBoard(state) {
+        const board = state.board;
+        const height = board.length;
+        const width = height > 0 ? board[0].length : 0;
+        if (width !== this.boardWidth || height !== this.boardHeight) {
+            this.buildBoardGrid(width, height);
+        }
+        
+        // 新しいフレームの各セルのクラスを求める
+        const frame = this.nextFrame;
+        for (let y = 0; y < height; y++) {
+            const row = board[y];
+            for (let x = 0; x < width; x++) {
+                frame[y * width + x] = CELL_CLASSES[row[x]] || BLOCK_CLASS;
+            }
+        }
         
-        // ピースの座標を取得
-        const currentPieceCoords = new Set();
-        if (this.gameState.piece && this.gameState.piece.length > 0) {
-            this.gameState.piece.forEach(([x, y]) => {
-                const boardX = this.gameState.piece_x + x;
-                const boardY = this.gameState.piece_y + y;
-                if (boardX >= 0 && boardX < 10 && boardY >= 0 && boardY < 20) {
-                    currentPieceCoords.add(`${boardY},${boardX}`);
+        // 落下中のピースを重ねる
+        if (state.piece && state.piece.length > 0) {
+            const currentClass = CURRENT_CLASSES[state.piece_type];
+            state.piece.forEach(([x, y]) => {
+                const boardX = state.piece_x + x;
+                const boardY = state.piece_y + y;
+                if (boardX >= 0 && boardX < width && boardY >= 0 && boardY < height) {
+                    frame[boardY * width + boardX] = currentClass;
                 }
             });
         }
         
-        // ボードブロックをレンダリング
-        for (let y = 0; y < 20; y++) {
-            for (let x = 0; x < 10; x++) {
-                const block = document.createElement('div');
-                block.className = 'board-block';
-                
-                const key = `${y},${x}`;
-                const isCurrentPiece = currentPieceCoords.has(key);
-                const boardValue = this.gameState.board[y][x];
-                
-                if (isCurrentPiece) {
-                    block.classList.add('filled', 'current');
-                    block.classList.add(this.gameState.piece_type);
-                } else if (boardValue !== 0) {
-                    block.classList.add('filled');
-                    // ボード値からピースタイプを判定
-                    const colors = ['I', 'O', 'T', 'S', 'Z', 'J', 'L'];
-                    const pieceType = colors[Math.abs(boardValue) % colors.length];
-                    block.classList.add(pieceType);
-                }
-                
-                this.gameBoard.appendChild(block);
+        // 前のフレームから変わったセルだけを書き換える
+        const classes = this.boardClasses;
+        const cells = this.boardCells;
+        for (let i = 0; i < frame.length; i++) {
+            if (frame[i] !== classes[i]) {
+                classes[i] = frame[i];
+                cells[i].className = frame[i];
             }
         }
     }
     
     renderNextPiece() {
-        this.nextPieceDisplay.innerHTML = '';
-        
-        if (!this.gameState.next_piece) return;
-        
-        // 次のピースを4x4グリッドで表示
-        for (let y = 0; y < 4; y++) {
-            for (let x = 0; x < 4; x++) {
-                const block = document.createElement('div');
-                block.className = 'next-piece-block';
-                
-                this.nextPieceDisplay.appendChild(block);
-            }
-        }
+        const nextPiece = this.gameState.next_piece || '';
+        if (nextPiece === this.renderedNextPiece) return;
+        this.renderedNextPiece = nextPiece;
         
         // 日本語でピースのラベルを表示
-        this.nextPieceDisplay.innerHTML = `<div style="grid-column: 1/-1; display: flex; align-items: center; justify-content: center; color: #667eea; font-weight: bold; font-size: 1.2em;">${this.gameState.next_piece}</div>`;
+        if (!this.nextPieceLabel) {
+            this.nextPieceLabel = document.createElement('div');
+            this.nextPieceLabel.style.cssText = 'grid-column: 1/-1; display: flex; align-items: center; justify-content: center; color: #667eea; font-weight: bold; font-size: 1.2em;';
+            this.nextPieceDisplay.replaceChildren(this.nextPieceLabel);
+        }
+        this.nextPieceLabel.textContent = nextPiece;
     }
     
     updateUI() {
-        this.scoreDisplay.textContent = this.gameState.score.toLocaleString();
-        this.levelDisplay.textContent = this.gameState.level;
-        this.linesDisplay.textContent = this.gameState.lines;
+        const state = this.gameState;
+        if (state.score !== this.renderedScore) {
+            this.renderedScore = state.score;
+            this.scoreDisplay.textContent = state.score.toLocaleString();
+        }
+        if (state.level !== this.renderedLevel) {
+            this.renderedLevel = state.level;
+            this.levelDisplay.textContent = state.level;
+        }
+        if (state.lines !== this.renderedLines) {
+            this.renderedLines = state.lines;
+            this.linesDisplay.textContent = state.lines;
+        }
         this.renderNextPiece();
     }
     
     endGame() {
         this.isRunning = false;
         clearInterval(this.gameLoopInterval);
+        this.closeStream();
         
         this.startButton.disabled = false;
         this.pauseButton.disabled = true;
@@ -295,7 +591,57 @@ class TetrisGame {
         document.getElementById('finalLevel').textContent = this.gameState.level;
         document.getElementById('finalLines').textContent = this.gameState.lines;
         
+        this.scoreRank.textContent = '';
+        this.submitScoreButton.disabled = false;
+        this.playerName.value = localStorage.getItem('tetrisPlayerName') || '';
         this.gameOverModal.style.display = 'flex';
+        this.loadLeaderboard();
+    }
+    
+    async submitScore() {
+        // スコアはサーバー側のゲームの値で登録される
+        const name = this.playerName.value.trim();
+        if (!name) return;
+        this.submitScoreButton.disabled = true;
+        try {
+            const response = await fetch(this.apiUrl('/api/leaderboard/submit', false), {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ name })
+            });
+            const result = await response.json();
+            if (!response.ok) {
+                this.scoreRank.textContent = result.error;
+                return;
+            }
+            localStorage.setItem('tetrisPlayerName', name);
+            this.scoreRank.textContent = `${result.rank} 位にランクインしました！`;
+            this.renderLeaderboard(result.top);
+        } catch (error) {
+            console.error('スコア登録エラー:', error);
+            this.submitScoreButton.disabled = false;
+        }
+    }
+    
+    async loadLeaderboard() {
+        try {
+            const response = await fetch('/api/leaderboard?limit=10');
+            this.renderLeaderboard((await response.json()).entries);
+        } catch (error) {
+            console.error('ランキング取得エラー:', error);
+        }
+    }
+    
+    renderLeaderboard(entries) {
+        this.leaderboardList.replaceChildren(...entries.map((entry) => {
+            const item = document.createElement('li');
+            const name = document.createElement('span');
+            name.textContent = `${entry.rank}. ${entry.name}`;
+            const score = document.createElement('span');
+            score.textContent = entry.score.toLocaleString();
+            item.append(name, score);
+            return item;
+        }));
     }
 }
 
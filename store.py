@@ -0,0 +1,225 @@
+"""
+テトリス セッションストア - ゲーム状態のバイナリ直列化と永続化バックエンド
+
+:class:`SessionStore` はセッションID -> バイト列の保存先。SessionManager が
+変更のあったセッションだけを一定間隔でまとめて書き戻し（:meth:`SessionStore.save_many`）、
+メモリにないセッションを取得時に復元する。
+"""
+
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, Optional, Tuple, Type
+
+from game_logic import PIECE_IDS, PIECE_TYPES, RANDOMIZERS, GameSnapshot, TetrisGame
+
+# version, width, height, seed, randomizer, piece, rotation, x, y, flags,
+# next piece, score, level, lines, bag length, rng index
+_GAME_HEADER = struct.Struct('<BBBQBBBbbBBQHIBH')
+_GAME_FORMAT = 1
+_LOCKED = 1
+_GAME_OVER = 2
+# Mersenne Twister state words in random.Random.getstate()
+_RNG_WORDS = 624
+
+
+def _piece_code(piece_type: Optional[str]) -> int:
+    return 0 if piece_type is None else PIECE_IDS[piece_type]
+
+
+def _piece_type(code: int) -> Optional[str]:
+    return None if code == 0 else PIECE_TYPES[code - 1]
+
+
+def encode_game(game: TetrisGame) -> bytes:
+    """ゲームの状態をコンパクトなバイト列に変換
+
+    盤面は1セル1バイト、乱数の状態は 32 ビット整数 624 個（約 2.5KB）。
+    """
+    snapshot = game.snapshot()
+    flags = (_LOCKED if snapshot.piece_locked else 0) | (_GAME_OVER if snapshot.game_over else 0)
+    version, words, gauss = snapshot.rng_state
+    if gauss is not None:
+        raise ValueError("cannot encode a random generator with a pending gauss value")
+    state = array('I', words[:_RNG_WORDS])
+    if sys.byteorder == 'big':
+        state.byteswap()
+    header = _GAME_HEADER.pack(
+        _GAME_FORMAT, game.width, game.height, game.seed, RANDOMIZERS.index(game.randomizer),
+        _piece_code(snapshot.piece_type), snapshot.rotation, snapshot.x, snapshot.y, flags,
+        _piece_code(snapshot.next_piece_type), snapshot.score, snapshot.level,
+        snapshot.lines_cleared, len(snapshot.bag), words[_RNG_WORDS],
+    )
+    bag = bytes(PIECE_IDS[piece_type] for piece_type in snapshot.bag)
+    return b''.join((header, *snapshot.rows, bag, state.tobytes()))
+
+
+def decode_game(data: bytes, engine: Type[TetrisGame] = TetrisGame) -> TetrisGame:
+    """encode_game のバイト列からゲームを復元"""
+    (format_version, width, height, seed, randomizer, piece, rotation, x, y, flags,
+     next_piece, score, level, lines, bag_length, rng_index) = _GAME_HEADER.unpack_from(data)
+    if format_version != _GAME_FORMAT:
+        raise ValueError(f"unsupported game format: {format_version}")
+
+    offset = _GAME_HEADER.size
+    rows = tuple(data[offset + y * width:offset + (y + 1) * width] for y in range(height))
+    offset += width * height
+    bag = tuple(_piece_type(code) for code in data[offset:offset + bag_length])
+    offset += bag_length
+    state = array('I')
+    state.frombytes(data[offset:offset + 4 * _RNG_WORDS])
+    if sys.byteorder == 'big':
+        state.byteswap()
+    if len(state) != _RNG_WORDS:
+        raise ValueError("game data is truncated")
+
+    game = engine(width, height, seed=seed, randomizer=RANDOMIZERS[randomizer])
+    game.restore(GameSnapshot(
+        rows, _piece_type(piece), rotation, x, y, bool(flags & _LOCKED), _piece_type(next_piece),
+        score, level, lines, bool(flags & _GAME_OVER), (3, tuple(state) + (rng_index,), None), bag,
+    ))
+    return game
+
+
+class SessionStore:
+    """セッションの保存先の基底クラス（値は不透明なバイト列）"""
+
+    def load(self, session_id: str, max_age: Optional[float] = None) -> Optional[bytes]:
+        """保存されたデータを取得（ないか、最終更新から max_age 秒を超えていれば None）"""
+        raise NotImplementedError
+
+    def save_many(self, items: Iterable[Tuple[str, bytes]]) -> int:
+        """複数のセッションをまとめて保存し、保存した数を返す"""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        """セッションを削除"""
+        raise NotImplementedError
+
+    def purge(self, max_age: float) -> int:
+        """最終更新から max_age 秒を超えたセッションを削除し、削除した数を返す"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """保存先を閉じる"""
+
+
+class MemoryStore(SessionStore):
+    """プロセス内の辞書に保存するストア（テストや単一プロセスでの退避用）"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._data: Dict[str, Tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str, max_age: Optional[float] = None) -> Optional[bytes]:
+        """保存されたデータを取得（ないか、最終更新から max_age 秒を超えていれば None）"""
+        with self._lock:
+            entry = self._data.get(session_id)
+        if entry is None or (max_age is not None and self.clock() - entry[1] > max_age):
+            return None
+        return entry[0]
+
+    def save_many(self, items: Iterable[Tuple[str, bytes]]) -> int:
+        """複数のセッションをまとめて保存し、保存した数を返す"""
+        now = self.clock()
+        with self._lock:
+            count = 0
+            for session_id, data in items:
+                self._data[session_id] = (bytes(data), now)
+                count += 1
+        return count
+
+    def delete(self, session_id: str) -> None:
+        """セッションを削除"""
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def purge(self, max_age: float) -> int:
+        """最終更新から max_age 秒を超えたセッションを削除し、削除した数を返す"""
+        oldest = self.clock() - max_age
+        with self._lock:
+            stale = [key for key, (_, updated) in self._data.items() if updated < oldest]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteStore(SessionStore):
+    """SQLite ファイルに保存するストア（WAL モード、書き込みは1トランザクションにまとめる）"""
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS sessions '
+                         '(id TEXT PRIMARY KEY, data BLOB NOT NULL, updated REAL NOT NULL)')
+
+    def load(self, session_id: str, max_age: Optional[float] = None) -> Optional[bytes]:
+        """保存されたデータを取得（ないか、最終更新から max_age 秒を超えていれば None）"""
+        oldest = float('-inf') if max_age is None else self.clock() - max_age
+        with self._lock:
+            row = self._db.execute('SELECT data FROM sessions WHERE id = ? AND updated >= ?',
+                                   (session_id, oldest)).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def save_many(self, items: Iterable[Tuple[str, bytes]]) -> int:
+        """複数のセッションを1トランザクションで保存し、保存した数を返す"""
+        now = self.clock()
+        rows = [(session_id, data, now) for session_id, data in items]
+        if not rows:
+            return 0
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany('INSERT OR REPLACE INTO sessions (id, data, updated) '
+                                     'VALUES (?, ?, ?)', rows)
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+        return len(rows)
+
+    def delete(self, session_id: str) -> None:
+        """セッションを削除"""
+        with self._lock:
+            self._db.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+
+    def purge(self, max_age: float) -> int:
+        """最終更新から max_age 秒を超えたセッションを削除し、削除した数を返す"""
+        with self._lock:
+            return self._db.execute('DELETE FROM sessions WHERE updated < ?',
+                                    (self.clock() - max_age,)).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def close(self) -> None:
+        """データベースを閉じる"""
+        with self._lock:
+            self._db.close()
+
+
+def open_store(spec: Optional[str]) -> Optional[SessionStore]:
+    """設定文字列からストアを作成（'memory'、'sqlite:パス'、空なら None）"""
+    if not spec:
+        return None
+    if spec == 'memory':
+        return MemoryStore()
+    if spec.startswith('sqlite:'):
+        return SQLiteStore(spec[len('sqlite:'):])
+    raise ValueError(f"unknown session store: {spec!r}")
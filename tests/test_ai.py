@@ -0,0 +1,92 @@
+"""
+Tests for the placement-search AI
+"""
+
+from ai import AIPlayer, LRUCache, board_masks
+from bitboard import BitboardTetrisGame
+from game_logic import ROTATIONS, TetrisGame
+
+
+def set_piece(game, piece_type, rotation=0):
+    game.current_piece_type = piece_type
+    game.current_rotation = rotation
+    game.current_piece = ROTATIONS[piece_type][rotation].cells
+
+
+class TestPlacements:
+    """Test placement enumeration."""
+
+    def test_all_columns_for_each_rotation(self):
+        """Test every column is reachable on an empty board."""
+        player = AIPlayer()
+        rows = (0,) * 20
+        placements = player.placements(rows, 10, 'I')
+        columns = {}
+        for rotation, x, landing in placements:
+            columns.setdefault(rotation, set()).add(x)
+        assert columns[0] == set(range(7))
+        assert columns[1] == set(range(10))
+
+    def test_landing_row(self):
+        """Test pieces land on top of the stack."""
+        player = AIPlayer()
+        rows = (0,) * 19 + (0b1111111111,)
+        placements = player.placements(rows, 10, 'O')
+        assert all(landing == 17 for _, _, landing in placements)
+
+    def test_board_masks_match_engines(self):
+        """Test both engines give the same occupancy masks."""
+        games = [TetrisGame(), BitboardTetrisGame()]
+        for game in games:
+            game.board[19][0] = 1
+            game.board[18][9] = 3
+        assert board_masks(games[0]) == board_masks(games[1])
+
+
+class TestDecisions:
+    """Test the AI's choices."""
+
+    def test_completes_a_line(self):
+        """Test a vertical I fills the only gap in the bottom rows."""
+        game = TetrisGame()
+        for y in range(16, 20):
+            for x in range(9):
+                game.board[y][x] = 1
+        set_piece(game, 'I')
+        game.next_piece_type = 'O'
+        player = AIPlayer()
+        placement = player.choose(game)
+        assert (placement.rotation, placement.x) == (1, 9)
+        player.play_piece(game)
+        assert game.lines_cleared == 4
+
+    def test_plays_long_games(self):
+        """Test the AI survives many pieces and clears lines."""
+        game = TetrisGame(seed=5)
+        player = AIPlayer(lookahead=False)
+        for _ in range(150):
+            assert player.play_piece(game)
+        assert game.lines_cleared > 30
+
+    def test_decisions_are_cached(self):
+        """Test a repeated board and piece reuses the cached decision."""
+        player = AIPlayer()
+        game = TetrisGame()
+        first = player.choose(game)
+        assert player.choose(game) == first
+        assert player.decisions.hits == 1
+
+
+class TestLRUCache:
+    """Test the bounded cache."""
+
+    def test_evicts_least_recent(self):
+        """Test the oldest unused entry is evicted at capacity."""
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert len(cache) == 2
@@ -0,0 +1,525 @@
+"""
+Tests for the Flask game server
+"""
+
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app as app_module
+import thumbnails as thumbnails_module
+from app import app
+from replay import Replay
+from sessions import MAX_INPUT_AGE
+from thumbnails import ThumbnailService, render_png
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+class TestGameSessions:
+    """Test that each client plays its own game."""
+
+    def test_new_game_returns_session(self, client):
+        """Test a new game reports its session id."""
+        state = client.get('/api/game/new').get_json()
+        assert state['session_id']
+        assert len(state['board']) == 20
+        assert not state['game_over']
+
+    def test_sessions_do_not_share_games(self, client):
+        """Test moves in one session leave another untouched."""
+        first = client.get('/api/game/new').get_json()
+        second = client.get('/api/game/new').get_json()
+
+        moved = client.post(f"/api/game/move/left?session_id={first['session_id']}").get_json()
+        assert moved['piece_x'] == first['piece_x'] - 1
+
+        other = client.get(f"/api/game/state?session_id={second['session_id']}").get_json()
+        assert other['piece_x'] == second['piece_x']
+
+    def test_session_header(self, client):
+        """Test the session can be given in the X-Session-Id header."""
+        first = client.get('/api/game/new').get_json()
+        ticked = client.post('/api/game/tick',
+                             headers={'X-Session-Id': first['session_id']}).get_json()
+        assert ticked['session_id'] == first['session_id']
+        assert ticked['piece_y'] == first['piece_y'] + 1
+
+    def test_unknown_sessions_are_not_created(self, client):
+        """Test game routes refuse missing or unknown ids instead of starting new games."""
+        before = len(app_module.sessions)
+        for method, route in (('get', '/api/game/state'), ('post', '/api/game/tick'),
+                              ('post', '/api/game/move/left'), ('post', '/api/game/autoplay'),
+                              ('get', '/api/game/replay'), ('post', '/api/game/watch')):
+            for query in ('', '?session_id=doesnotexist'):
+                response = getattr(client, method)(route + query)
+                assert response.status_code == 404
+                assert response.get_json()['error'] == 'unknown session'
+        url = '/api/leaderboard/submit?session_id=doesnotexist'
+        assert client.post(url, json={'name': 'alice'}).status_code == 404
+        assert len(app_module.sessions) == before
+
+    def test_stats(self, client):
+        """Test the stats endpoint reports live sessions."""
+        client.get('/api/game/new')
+        stats = client.get('/api/stats').get_json()
+        assert stats['sessions'] >= 1
+
+
+class TestAutoplay:
+    """Test the AI autoplay route."""
+
+    def test_autoplay_places_piece(self, client):
+        """Test autoplay locks the current piece and spawns the next one."""
+        first = client.get('/api/game/new').get_json()
+        state = client.post(f"/api/game/autoplay?session_id={first['session_id']}").get_json()
+        assert state['piece_type'] == first['next_piece']
+        assert state['piece_y'] == 0
+        assert any(any(row) for row in state['board'])
+
+
+class TestDeltaProtocol:
+    """Test versioned delta responses."""
+
+    def test_move_returns_delta(self, client):
+        """Test a move with since= returns only what changed."""
+        first = client.get('/api/game/new').get_json()
+        assert first['full']
+        session_id = first['session_id']
+        delta = client.post(f"/api/game/move/left?session_id={session_id}"
+                            f"&since={first['version']}").get_json()
+        assert not delta['full']
+        assert delta['since'] == first['version']
+        assert delta['piece_x'] == first['piece_x'] - 1
+        assert 'board' not in delta
+        assert 'score' not in delta
+
+    def test_version_mismatch_returns_snapshot(self, client):
+        """Test an unknown version gets a full snapshot."""
+        first = client.get('/api/game/new').get_json()
+        state = client.get(f"/api/game/state?session_id={first['session_id']}"
+                           f"&since=999").get_json()
+        assert state['full']
+        assert len(state['board']) == 20
+
+    def test_packed_snapshot(self, client):
+        """Test the packed format encodes the board as one string."""
+        state = client.get('/api/game/new?format=packed').get_json()
+        assert state['encoding'] == 'b64u8'
+        assert isinstance(state['board'], str)
+
+
+class TestBatchInput:
+    """Test the batched input route."""
+
+    def test_batch_applies_inputs_in_order(self, client):
+        """Test a batch is applied atomically and acknowledged by sequence number."""
+        first = client.get('/api/game/new').get_json()
+        url = f"/api/game/input?session_id={first['session_id']}"
+        inputs = [{'seq': 1, 'action': 'left', 't': 10.0},
+                  {'seq': 2, 'action': 'left', 't': 25.0},
+                  {'seq': 3, 'action': 'down', 't': 40.0}]
+        state = client.post(url, json={'inputs': inputs}).get_json()
+        assert state['input_seq'] == 3
+        assert state['piece_x'] == first['piece_x'] - 2
+        assert state['piece_y'] == first['piece_y'] + 1
+
+        # A resent batch is acknowledged without being applied twice
+        again = client.post(url, json={'inputs': inputs}).get_json()
+        assert again['piece_x'] == state['piece_x']
+        assert again['input_seq'] == 3
+
+    def test_batch_is_recorded_in_replay(self, client):
+        """Test batched inputs can be replayed to the same score."""
+        first = client.get('/api/game/new').get_json()
+        url = f"/api/game/input?session_id={first['session_id']}"
+        inputs = [{'seq': i, 'action': action}
+                  for i, action in enumerate(['rotate', 'right', 'drop'], 1)]
+        client.post(url, json={'inputs': inputs})
+        replay = client.get(f"/api/game/replay?session_id={first['session_id']}").get_json()
+        assert replay['inputs'] == 3
+        verified = client.post('/api/replay/verify', json={
+            'replay': replay['replay'], 'score': replay['score']}).get_json()
+        assert verified['valid']
+
+    @pytest.mark.parametrize('body', [
+        {},
+        {'inputs': 'left'},
+        {'inputs': [{'seq': 1, 'action': 'tick'}]},
+        {'inputs': [{'seq': 0, 'action': 'left'}]},
+        {'inputs': [{'seq': 1, 'action': 'left', 't': 'now'}]},
+        {'inputs': [{'seq': i, 'action': 'left'} for i in range(1, 100)]},
+    ])
+    def test_rejects_invalid_batches(self, client, body):
+        """Test malformed batches are rejected with 400."""
+        assert client.post('/api/game/input', json=body).status_code == 400
+
+    @pytest.mark.parametrize('t', ['Infinity', '-Infinity', 'NaN'])
+    def test_rejects_non_finite_times(self, client, t):
+        """Test the non-standard JSON literals the parser accepts are refused as times."""
+        session_id = client.get('/api/game/new').get_json()['session_id']
+        body = '{"inputs": [{"seq": 1, "action": "left", "t": %s}]}' % t
+        response = client.post(f'/api/game/input?session_id={session_id}', data=body,
+                               content_type='application/json')
+        assert response.status_code == 400
+
+    def test_far_apart_times_are_clamped(self, client):
+        """Test huge gaps between client times neither crash nor date inputs far back."""
+        session_id = client.get('/api/game/new').get_json()['session_id']
+        inputs = [{'seq': 1, 'action': 'left', 't': -1e308},
+                  {'seq': 2, 'action': 'right', 't': 1e308}]
+        response = client.post(f'/api/game/input?session_id={session_id}',
+                               json={'inputs': inputs})
+        assert response.status_code == 200
+        assert response.get_json()['input_seq'] == 2
+        replay = client.get(f'/api/game/replay?session_id={session_id}').get_json()
+        times = [elapsed for elapsed, _ in Replay.from_string(replay['replay'])]
+        assert times[-1] - times[0] <= MAX_INPUT_AGE * 1000
+
+
+class TestReplay:
+    """Test replay recording on the server."""
+
+    def test_replay_reproduces_session(self, client):
+        """Test the recorded replay verifies against the session's score."""
+        first = client.get('/api/game/new').get_json()
+        session_id = first['session_id']
+        for _ in range(5):
+            client.post(f'/api/game/autoplay?session_id={session_id}')
+        client.post(f'/api/game/move/left?session_id={session_id}')
+
+        recorded = client.get(f'/api/game/replay?session_id={session_id}').get_json()
+        assert recorded['inputs'] > 10
+        assert recorded['complete']
+        result = client.post('/api/replay/verify', json={
+            'replay': recorded['replay'],
+            'score': recorded['score'],
+            'lines': recorded['lines'],
+        }).get_json()
+        assert result['valid']
+        assert result['score'] == recorded['score']
+
+    def test_verify_rejects_garbage(self, client):
+        """Test an undecodable replay is a client error."""
+        response = client.post('/api/replay/verify', json={'replay': 'AAAA'})
+        assert response.status_code == 400
+        for body in ({'replay': 123}, {'replay': ['x']}, ['replay'], {}):
+            assert client.post('/api/replay/verify', json=body).status_code == 400
+
+    def test_verify_limits_body_size(self, client):
+        """Test oversized bodies are refused before decoding."""
+        response = client.post('/api/replay/verify', json={'replay': 'A' * (2 * 1024 * 1024)})
+        assert response.status_code == 413
+
+
+class TestMetrics:
+    """Test the Prometheus metrics and profiler routes."""
+
+    def test_metrics_count_requests_and_actions(self, client):
+        """Test route latency and game actions show up in /metrics."""
+        first = client.get('/api/game/new').get_json()
+        client.post(f"/api/game/move/left?session_id={first['session_id']}")
+        response = client.get('/metrics')
+        assert response.content_type.startswith('text/plain')
+        text = response.get_data(as_text=True)
+        assert 'tetris_http_request_duration_seconds_count{route="/api/game/move/<direction>"}' in text
+        assert 'tetris_game_actions_total{action="left"}' in text
+        assert 'tetris_active_sessions' in text
+
+    def test_profiler_toggle(self, client, monkeypatch):
+        """Test the profiler can be switched on and reports slow requests."""
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+        admin = {'X-Admin-Token': 'secret'}
+        settings = client.post('/metrics/profile', headers=admin,
+                               json={'enabled': True, 'sample_rate': 1.0}).get_json()
+        assert settings['enabled']
+        try:
+            client.get('/api/game/new')
+            slowest = client.get('/metrics/profile', headers=admin).get_json()['slowest']
+            assert any(entry['route'] == 'GET /api/game/new' for entry in slowest)
+        finally:
+            client.post('/metrics/profile', headers=admin, json={'enabled': False, 'clear': True})
+
+    def test_profiler_requires_token(self, client, monkeypatch):
+        """Test the profiler routes are off without a token and refuse wrong tokens."""
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', None)
+        assert client.get('/metrics/profile').status_code == 404
+        assert client.post('/metrics/profile', json={'enabled': True}).status_code == 404
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+        assert client.get('/metrics/profile').status_code == 403
+        assert client.get('/metrics/profile', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+
+    def test_profiler_enabled_must_be_bool(self, client, monkeypatch):
+        """Test a string like "false" does not switch the profiler on."""
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+        response = client.post('/metrics/profile', headers={'X-Admin-Token': 'secret'},
+                               json={'enabled': 'false'})
+        assert response.status_code == 400
+        assert not app_module.metrics.profiler.enabled
+
+
+class TestServerGravity:
+    """Test the server-pushed event stream."""
+
+    def test_stream_pushes_state_changes(self, client):
+        """Test the stream sends the current state, then each change."""
+        first = client.get('/api/game/new').get_json()
+        session_id = first['session_id']
+        response = client.get(f'/api/game/stream?session_id={session_id}', buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        events = iter(response.response)
+        try:
+            initial = json.loads(next(events).decode()[len('data: '):])
+            assert initial['session_id'] == session_id
+
+            client.post(f'/api/game/move/left?session_id={session_id}')
+            update = json.loads(next(events).decode()[len('data: '):])
+            assert update['version'] > initial['version']
+        finally:
+            response.close()
+
+    def test_pause_and_resume(self, client):
+        """Test pausing blocks moves until resumed."""
+        first = client.get('/api/game/new').get_json()
+        session_id = first['session_id']
+        paused = client.post(f'/api/game/pause?session_id={session_id}').get_json()
+        assert paused['paused']
+        moved = client.post(f'/api/game/move/left?session_id={session_id}').get_json()
+        assert moved['piece_x'] == first['piece_x']
+        resumed = client.post(f'/api/game/resume?session_id={session_id}').get_json()
+        assert not resumed['paused']
+
+
+class TestRooms:
+    """Test the versus room API."""
+
+    def test_create_join_and_start(self, client):
+        """Test the room starts once the last player joins."""
+        created = client.post('/api/room/new?players=2').get_json()
+        room_id = created['room']['room_id']
+        assert not created['room']['started']
+        joined = client.post(f'/api/room/{room_id}/join').get_json()
+        assert joined['session_id'] != created['session_id']
+        assert joined['room']['started']
+
+        state = client.get(f"/api/game/state?session_id={joined['session_id']}").get_json()
+        assert not state['paused']
+        summary = client.get(f'/api/room/{room_id}').get_json()
+        assert [player['player'] for player in summary['players']] == [0, 1]
+
+        full = client.post(f'/api/room/{room_id}/join')
+        assert full.status_code == 409
+
+    def test_room_players_cannot_pause_or_autoplay(self, client):
+        """Test the room controls gravity and the AI cannot play a versus match."""
+        created = client.post('/api/room/new?players=2').get_json()
+        session_id = created['session_id']
+        for route in ('pause', 'resume', 'autoplay'):
+            response = client.post(f'/api/game/{route}?session_id={session_id}')
+            assert response.status_code == 409
+        state = client.get(f'/api/game/state?session_id={session_id}').get_json()
+        assert state['paused']  # still waiting for the room to fill
+
+    def test_invalid_rooms(self, client):
+        """Test bad sizes and unknown rooms are rejected."""
+        assert client.post('/api/room/new?players=1').status_code == 400
+        assert client.post('/api/room/new?players=9').status_code == 400
+        assert client.post('/api/room/missing/join').status_code == 404
+        assert client.get('/api/room/missing').status_code == 404
+
+
+def read_event(events):
+    """Read the next data event of an SSE response, skipping keepalives."""
+    while True:
+        chunk = next(events).decode()
+        if chunk.startswith('data: '):
+            return json.loads(chunk[len('data: '):])
+
+
+class TestSpectators:
+    """Test read-only spectator streams."""
+
+    def test_watch_game(self, client):
+        """Test spectators see the game without learning its session id."""
+        first = client.get('/api/game/new').get_json()
+        session_id = first['session_id']
+        shared = client.post(f'/api/game/watch?session_id={session_id}').get_json()
+        again = client.post(f'/api/game/watch?session_id={session_id}').get_json()
+        assert again['watch_id'] == shared['watch_id']
+
+        response = client.get(f"/api/watch/{shared['watch_id']}", buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        events = iter(response.response)
+        try:
+            initial = read_event(events)
+            assert initial['full'] and 'session_id' not in initial
+            client.post(f'/api/game/move/left?session_id={session_id}')
+            update = read_event(events)
+            assert update['piece_x'] == first['piece_x'] - 1
+        finally:
+            response.close()
+
+    def test_watch_room(self, client):
+        """Test a room stream carries the room summary."""
+        created = client.post('/api/room/new?players=2').get_json()
+        room_id = created['room']['room_id']
+        response = client.get(f'/api/room/{room_id}/watch', buffered=False)
+        events = iter(response.response)
+        try:
+            assert not read_event(events)['started']
+            client.post(f'/api/room/{room_id}/join')
+            assert read_event(events)['started']
+        finally:
+            response.close()
+
+    def test_unknown_watch_ids(self, client):
+        """Test unknown watch ids and rooms are 404."""
+        assert client.get('/api/watch/missing').status_code == 404
+        assert client.get('/api/room/missing/watch').status_code == 404
+
+
+class TestThumbnails:
+    """Test board thumbnails of watched games and room players."""
+
+    @pytest.fixture(autouse=True)
+    def thread_renders(self, monkeypatch):
+        # Render in a thread so the tests do not start worker processes
+        pytest.importorskip('pygame')
+        service = ThumbnailService(executor=ThreadPoolExecutor(1))
+        monkeypatch.setattr(app_module, 'thumbnails', service)
+        yield
+        service.close()
+
+    def test_game_thumbnail(self, client):
+        """Test a watched game's thumbnail is a PNG revalidated by ETag."""
+        session_id = client.get('/api/game/new').get_json()['session_id']
+        watch_id = client.post(f'/api/game/watch?session_id={session_id}').get_json()['watch_id']
+        response = client.get(f'/api/watch/{watch_id}/thumbnail.png')
+        assert response.status_code == 200
+        assert response.mimetype == 'image/png'
+        assert response.data.startswith(b'\x89PNG')
+
+        etag = response.headers['ETag']
+        assert client.get(f'/api/watch/{watch_id}/thumbnail.png',
+                          headers={'If-None-Match': etag}).status_code == 304
+        client.post(f'/api/game/move/left?session_id={session_id}')
+        moved = client.get(f'/api/watch/{watch_id}/thumbnail.png', headers={'If-None-Match': etag})
+        assert moved.status_code == 200
+        assert moved.headers['ETag'] != etag
+
+    def test_failed_render_returns_503(self, client, monkeypatch):
+        """Test a crashed render is reported as unavailable and retried next time."""
+        calls = []
+
+        def crash_once(job):
+            calls.append(job)
+            if len(calls) == 1:
+                raise RuntimeError("worker crashed")
+            return render_png(job)
+
+        monkeypatch.setattr(thumbnails_module, 'render_png', crash_once)
+        session_id = client.get('/api/game/new').get_json()['session_id']
+        watch_id = client.post(f'/api/game/watch?session_id={session_id}').get_json()['watch_id']
+        failed = client.get(f'/api/watch/{watch_id}/thumbnail.png')
+        assert failed.status_code == 503
+        assert failed.headers['Retry-After'] == '1'
+        assert client.get(f'/api/watch/{watch_id}/thumbnail.png').status_code == 200
+
+    def test_room_thumbnail(self, client):
+        """Test room players' thumbnails and unknown ids."""
+        room_id = client.post('/api/room/new?players=2').get_json()['room']['room_id']
+        assert client.get(f'/api/room/{room_id}/thumbnail.png').mimetype == 'image/png'
+        assert client.get(f'/api/room/{room_id}/thumbnail.png?player=1').status_code == 404
+        assert client.get('/api/room/missing/thumbnail.png').status_code == 404
+        assert client.get('/api/watch/missing/thumbnail.png').status_code == 404
+
+
+class TestLeaderboard:
+    """Test recording finished games."""
+
+    def finish(self, client):
+        session_id = client.get('/api/game/new').get_json()['session_id']
+        state = {}
+        for _ in range(200):
+            client.post(f'/api/game/move/drop?session_id={session_id}')
+            state = client.post(f'/api/game/tick?session_id={session_id}').get_json()
+            if state['game_over']:
+                break
+        assert state['game_over']
+        return session_id, state['score']
+
+    def test_submit_finished_game(self, client):
+        """Test the server records its own score once per game."""
+        session_id, score = self.finish(client)
+        url = f'/api/leaderboard/submit?session_id={session_id}'
+        result = client.post(url, json={'name': 'alice', 'score': 10 ** 9}).get_json()
+        assert result['score'] == score
+        assert result['rank'] >= 1
+        assert client.post(url, json={'name': 'alice'}).status_code == 409
+
+        best = client.get('/api/leaderboard/player/alice').get_json()
+        assert best['score'] == score
+        ranked = client.get(f'/api/leaderboard/rank?score={score}&around=1').get_json()
+        assert ranked['rank'] <= result['rank']
+        assert client.get('/api/leaderboard?limit=5').get_json()['total'] >= 1
+
+    def test_rejected_submits(self, client):
+        """Test running games and bad names are refused."""
+        session_id = client.get('/api/game/new').get_json()['session_id']
+        url = f'/api/leaderboard/submit?session_id={session_id}'
+        assert client.post(url, json={'name': 'bob'}).status_code == 409
+        assert client.post(url, json={'name': ''}).status_code == 400
+        assert client.post(url, json={'name': 'x' * 17}).status_code == 400
+        assert client.get('/api/leaderboard?limit=0').status_code == 400
+        assert client.get('/api/leaderboard/rank').status_code == 400
+        assert client.get('/api/leaderboard/player/nobody-here').status_code == 404
+
+    def test_autoplayed_games_are_refused(self, client):
+        """Test a game the AI played even once cannot be submitted."""
+        session_id = client.get('/api/game/new').get_json()['session_id']
+        client.post(f'/api/game/autoplay?session_id={session_id}')
+        state = {}
+        for _ in range(200):
+            client.post(f'/api/game/move/drop?session_id={session_id}')
+            state = client.post(f'/api/game/tick?session_id={session_id}').get_json()
+            if state['game_over']:
+                break
+        assert state['game_over']
+        url = f'/api/leaderboard/submit?session_id={session_id}'
+        assert client.post(url, json={'name': 'robot'}).status_code == 409
+        assert client.get('/api/leaderboard/player/robot').status_code == 404
+
+
+class TestStaticAssets:
+    """Test the cached index page and fingerprinted assets."""
+
+    def test_index_links_fingerprinted_assets(self, client):
+        """Test the index is served compressed and revalidated by ETag."""
+        response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        html = gzip.decompress(response.data).decode()
+        assert 'src="/assets/game.' in html
+
+        again = client.get('/', headers={'Accept-Encoding': 'gzip',
+                                         'If-None-Match': response.headers['ETag']})
+        assert again.status_code == 304
+        assert again.data == b''
+
+    def test_assets_are_immutable(self, client):
+        """Test fingerprinted assets carry a long-lived immutable cache policy."""
+        html = client.get('/').get_data(as_text=True)
+        url = html.split('src="')[1].split('"')[0]
+        response = client.get(url)
+        assert response.status_code == 200
+        assert 'immutable' in response.headers['Cache-Control']
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert 'Content-Encoding' not in response.headers
+        assert client.get('/assets/missing.js').status_code == 404
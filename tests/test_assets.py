@@ -0,0 +1,74 @@
+"""
+Tests for fingerprinted, precompressed static assets
+"""
+
+import gzip
+
+import assets
+from assets import AssetPipeline, accepted_encodings, build, fingerprinted_name
+
+
+def make_static(tmp_path, content=b'body { color: red; }\n' * 50):
+    static = tmp_path / 'static'
+    static.mkdir()
+    (static / 'style.css').write_bytes(content)
+    return static
+
+
+class TestEncodings:
+    """Test Accept-Encoding handling."""
+
+    def test_accepted_encodings(self):
+        """Test q=0 encodings are refused and others accepted."""
+        assert accepted_encodings('gzip, deflate, br') == {'gzip', 'deflate', 'br'}
+        assert accepted_encodings('br;q=0, gzip;q=0.5') == {'gzip'}
+        assert accepted_encodings('') == set()
+
+    def test_select_prefers_brotli(self, tmp_path):
+        """Test brotli is chosen over gzip when both are available."""
+        asset = next(iter(AssetPipeline(make_static(tmp_path), None).assets.values()))
+        assert asset.select('gzip') == 'gzip'
+        assert asset.select('identity') == 'identity'
+        expected = 'br' if assets.HAVE_BROTLI else 'gzip'
+        assert asset.select('gzip, br') == expected
+        assert gzip.decompress(asset.bodies['gzip']) == asset.bodies['identity']
+
+
+class TestPipeline:
+    """Test fingerprinting and prebuilt assets."""
+
+    def test_fingerprinted_urls(self, tmp_path):
+        """Test the URL changes with the content."""
+        first = AssetPipeline(make_static(tmp_path), None).url('style.css')
+        (tmp_path / 'static' / 'style.css').write_bytes(b'body { color: blue; }\n' * 50)
+        second = AssetPipeline(tmp_path / 'static', None).url('style.css')
+        assert first != second
+        assert first.startswith('/assets/style.') and first.endswith('.css')
+        assert fingerprinted_name('game.js', 'abc') == 'game.abc.js'
+
+    def test_prebuilt_assets_are_reused(self, tmp_path):
+        """Test the pipeline loads compressed files written by the build step."""
+        static = make_static(tmp_path)
+        out = tmp_path / 'build'
+        manifest = build(static, out)
+        pipeline = AssetPipeline(static, out)
+        assert pipeline.prebuilt == 1
+        assert pipeline.url('style.css') == '/assets/' + manifest['style.css']
+
+    def test_stale_build_is_ignored(self, tmp_path):
+        """Test a build of older content is not served for new content."""
+        static = make_static(tmp_path)
+        out = tmp_path / 'build'
+        build(static, out)
+        (static / 'style.css').write_bytes(b'p { margin: 0; }\n' * 50)
+        pipeline = AssetPipeline(static, out)
+        assert pipeline.prebuilt == 0
+        asset = pipeline.assets[pipeline.url('style.css')[len('/assets/'):]]
+        assert gzip.decompress(asset.bodies['gzip']) == b'p { margin: 0; }\n' * 50
+
+    def test_without_brotli(self, tmp_path, monkeypatch):
+        """Test only gzip is produced when brotli is not installed."""
+        monkeypatch.setattr(assets, 'brotli', None)
+        asset = next(iter(AssetPipeline(make_static(tmp_path), None).assets.values()))
+        assert set(asset.bodies) == {'identity', 'gzip'}
+        assert asset.select('br, gzip') == 'gzip'
@@ -0,0 +1,83 @@
+"""
+Tests for batch board evaluation
+"""
+
+import random
+
+import pytest
+
+import batch_eval
+from ai import _landing_row
+from game_logic import ROTATIONS, TetrisGame
+
+
+def random_boards(count, seed=0, width=10, height=20):
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = [[0] * width for _ in range(height)]
+        for x in range(width):
+            for y in range(height - rng.randrange(height // 2), height):
+                if rng.random() < 0.8:
+                    board[y][x] = rng.randrange(1, 8)
+        if rng.random() < 0.5:
+            board[height - 1] = [1] * width
+        boards.append(board)
+    return boards
+
+
+class TestPythonFallback:
+    """Test the pure-Python path on lists of boards."""
+
+    def test_features(self):
+        """Test heights, holes, bumpiness and completed rows on a small board."""
+        board = [
+            [0, 0, 0, 0],
+            [0, 1, 0, 0],
+            [0, 0, 0, 1],
+            [1, 1, 1, 1],
+        ]
+        features = batch_eval.evaluate([board])
+        assert features['heights'] == [[1, 3, 1, 2]]
+        assert features['aggregate_height'] == [7]
+        assert features['holes'] == [1]
+        assert features['bumpiness'] == [2 + 2 + 1]
+        assert features['completed_rows'] == [1]
+
+    def test_landing_rows(self):
+        """Test landing rows match the AI's straight-drop search."""
+        boards = random_boards(20, seed=1)
+        for piece_type, states in ROTATIONS.items():
+            for rotation, state in enumerate(states):
+                landings = batch_eval.landing_rows(boards, piece_type, rotation)
+                for board, row in zip(boards, landings):
+                    masks = tuple(sum(1 << x for x, cell in enumerate(r) if cell) for r in board)
+                    for x, landing in enumerate(row):
+                        if landing >= 0:
+                            assert landing == _landing_row(masks, 20, state, x, 0)
+
+    def test_stack_games(self):
+        """Test games can be stacked directly."""
+        game = TetrisGame()
+        game.board[19][0] = 1
+        boards = batch_eval.stack_boards([game])
+        assert batch_eval.to_list(batch_eval.column_heights(boards))[0][0] == 1
+
+
+class TestNumpyPath:
+    """Test the vectorized path agrees with the fallback."""
+
+    def test_matches_fallback(self):
+        """Test every feature matches the pure-Python results."""
+        np = pytest.importorskip('numpy')
+        boards = random_boards(50, seed=2)
+        stacked = np.array(boards, dtype=np.uint8)
+        vectorized = batch_eval.evaluate(stacked)
+        fallback = batch_eval.evaluate(boards)
+        for name in fallback:
+            assert batch_eval.to_list(vectorized[name]) == fallback[name]
+
+        for piece_type, states in ROTATIONS.items():
+            for rotation in range(len(states)):
+                assert (batch_eval.to_list(batch_eval.landing_rows(stacked, piece_type, rotation))
+                        == batch_eval.landing_rows(boards, piece_type, rotation))
@@ -0,0 +1,152 @@
+"""
+Tests for the bitboard board engine
+"""
+
+import pytest
+
+import test_game_logic as base
+from bitboard import BitboardTetrisGame, BoardRow
+from game_logic import ROTATIONS, TetrisGame
+
+
+@pytest.fixture(autouse=True)
+def use_bitboard_engine(monkeypatch):
+    """Run the shared game logic tests against BitboardTetrisGame."""
+    monkeypatch.setattr(base, 'TetrisGame', BitboardTetrisGame)
+
+
+class TestBitboardInitialization(base.TestTetrisGameInitialization):
+    pass
+
+
+class TestBitboardPieceMovement(base.TestPieceMovement):
+    pass
+
+
+class TestBitboardPieceRotation(base.TestPieceRotation):
+    pass
+
+
+class TestBitboardLineClearing(base.TestLineClearing):
+    pass
+
+
+class TestBitboardGameOver(base.TestGameOver):
+    pass
+
+
+class TestBitboardScoring(base.TestScoring):
+    pass
+
+
+class TestBitboardSnapshot(base.TestSnapshot):
+    def test_restore_rebuilds_masks(self):
+        """Test collision masks follow the restored board."""
+        game = BitboardTetrisGame(seed=2)
+        saved = game.snapshot()
+        game.hard_drop()
+        dropped = game.get_board()
+        game.restore(saved)
+        assert all(row.mask == 0 for row in game.board)
+        game.hard_drop()
+        assert game.get_board() == dropped
+
+    def test_restore_keeps_unchanged_rows(self):
+        """Test restore rebuilds only the rows that differ, with correct masks."""
+        game = BitboardTetrisGame(seed=2)
+        game.board[19][0] = 1
+        saved = game.snapshot()
+        rows = list(game.board)
+        game.hard_drop()
+        game.restore(saved)
+        assert game.board[0] is rows[0]
+        assert game.board[19].mask == 1
+        assert all(row.owner is game for row in game.board)
+        assert all(row.mask == sum(1 << x for x, cell in enumerate(row) if cell)
+                   for row in game.board)
+
+    def test_slice_write_rebuilds_mask(self):
+        """Test slice assignment recomputes the whole mask."""
+        row = BoardRow(bytes(4))
+        row[:] = bytes([0, 5, 0, 9])
+        assert row.mask == 0b1010
+
+
+class TestBitboardDropDistance(base.TestDropDistance):
+    def test_direct_writes_reset_heights(self):
+        """Test writing a cell directly is seen by the next drop distance."""
+        game = BitboardTetrisGame(10, 20, seed=3)
+        distance = game.drop_distance()
+        for x in range(game.width):
+            game.board[game.height - 1][x] = 1
+        assert game.drop_distance() == distance - 1
+
+
+class TestBitboardGarbage(base.TestGarbage):
+    def test_masks_follow_garbage(self):
+        """Test collision masks see the garbage rows."""
+        game = BitboardTetrisGame(10, 20, seed=5)
+        distance = game.drop_distance()
+        game.add_garbage(4, hole=0)
+        assert game.drop_distance() == distance - 4
+        assert all(row.mask == sum(1 << x for x, cell in enumerate(row) if cell)
+                   for row in game.board)
+
+
+class TestBoardRowMask:
+    """Test that row masks follow cell writes."""
+
+    def test_mask_tracks_writes(self):
+        """Test setting and clearing cells updates the mask."""
+        row = BoardRow([0] * 10)
+        row[0] = 3
+        row[9] = 1
+        assert row.mask == (1 << 0) | (1 << 9)
+        row[0] = 0
+        row[-1] = 0
+        assert row.mask == 0
+
+    def test_mask_from_initial_cells(self):
+        """Test the mask is built from initial cell values."""
+        row = BoardRow([1, 0, 2, 0])
+        assert row.mask == 0b0101
+
+    def test_masks_match_board_after_play(self):
+        """Test masks stay consistent with cells across locks and clears."""
+        game = BitboardTetrisGame(10, 20)
+        for x in range(game.width - 1):
+            game.board[game.height - 1][x] = 1
+        for _ in range(30):
+            game.hard_drop()
+            if not game.spawn_next_piece():
+                break
+        for row in game.board:
+            expected = sum(1 << x for x, cell in enumerate(row) if cell != 0)
+            assert row.mask == expected
+
+    def test_collision_with_locked_cells(self):
+        """Test pieces cannot move into occupied cells."""
+        game = BitboardTetrisGame(10, 20)
+        game.current_piece_type = 'O'
+        game.current_rotation = 0
+        game.current_piece = ROTATIONS['O'][0].cells
+        game.current_piece_x = 4
+        game.current_piece_y = 0
+        game.board[1][3] = 1
+        assert not game.move_piece_left()
+        assert game.move_piece_right()
+        assert game._fits('O', 0, 5, 0)
+        assert not game._fits('O', 0, 3, 0)
+
+    def test_fits_above_the_board(self):
+        """Test pieces partly above the top agree with the list engine."""
+        game = BitboardTetrisGame(10, 20)
+        reference = TetrisGame(10, 20)
+        for board in (game.board, reference.board):
+            board[0][4] = 1
+        for piece_type, states in ROTATIONS.items():
+            for rotation, state in enumerate(states):
+                for x in range(10 - state.width + 1):
+                    for y in range(-state.height + 1, 0):
+                        assert game._fits(piece_type, rotation, x, y) == \
+                            reference._fits(piece_type, rotation, x, y)
@@ -0,0 +1,129 @@
+"""
+Tests for spectator broadcast channels
+"""
+
+import threading
+
+from broadcast import Broadcast, BroadcastHub, sse_event
+
+
+class Source:
+    """A changing state whose renders are counted."""
+
+    def __init__(self):
+        self.state = 0
+        self.renders = 0
+
+    def render(self):
+        self.renders += 1
+        return sse_event({'state': self.state})
+
+    def change(self, channel):
+        self.state += 1
+        channel.notify()
+
+
+class TestBroadcast:
+    """Test encode-once frames and latest-frame delivery."""
+
+    def test_thousands_of_subscribers_share_one_encoding(self):
+        """Test every subscriber gets the same bytes from a single render per change."""
+        source = Source()
+        channel = Broadcast(source.render)
+        subscribers = [channel.frames() for _ in range(2000)]
+        first = [next(frames) for frames in subscribers]
+        assert channel.subscribers == 2000
+        assert source.renders == 1
+        assert all(frame is first[0] for frame in first)
+
+        for _ in range(3):
+            source.change(channel)
+            frames = [next(frames) for frames in subscribers]
+            assert all(frame.data is frames[0].data for frame in frames)
+        assert source.renders == 4
+        assert frames[0].data == b'data: {"state":3}\n\n'
+
+        for frames in subscribers:
+            frames.close()
+        assert channel.subscribers == 0
+
+    def test_slow_subscriber_skips_to_latest(self):
+        """Test a subscriber that falls behind gets only the newest frame."""
+        source = Source()
+        channel = Broadcast(source.render)
+        slow = channel.frames()
+        assert next(slow).data == b'data: {"state":0}\n\n'
+        for _ in range(5):
+            source.change(channel)
+        assert next(slow).data == b'data: {"state":5}\n\n'
+        # Nobody asked for the intermediate states, so they were never encoded
+        assert source.renders == 2
+
+    def test_waiting_threads_wake_on_change(self):
+        """Test blocked subscriber threads all receive the next frame."""
+        source = Source()
+        channel = Broadcast(source.render)
+        initial = channel.latest()
+        received = []
+        lock = threading.Lock()
+
+        def subscriber():
+            frame = channel.wait(initial.version, timeout=5.0)
+            with lock:
+                received.append(frame)
+
+        threads = [threading.Thread(target=subscriber) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        source.change(channel)
+        for thread in threads:
+            thread.join(5.0)
+        assert len(received) == 50
+        assert len({id(frame) for frame in received}) == 1
+        assert source.renders == 2
+
+    def test_keepalive_and_close(self):
+        """Test idle subscribers get keepalives and stop when the channel closes."""
+        source = Source()
+        channel = Broadcast(source.render)
+        frames = channel.frames(keepalive=0.01)
+        next(frames)
+        assert next(frames) is None
+        channel.close()
+        assert list(frames) == []
+        assert channel.subscribers == 0
+
+    def test_stops_when_source_is_gone(self):
+        """Test the stream ends once ``alive`` reports the source ended."""
+        source = Source()
+        alive = [True]
+        channel = Broadcast(source.render, lambda: alive[0])
+        frames = channel.frames()
+        next(frames)
+        alive[0] = False
+        channel.notify()
+        assert list(frames) == []
+
+
+class TestBroadcastHub:
+    """Test watch ids for spectator channels."""
+
+    def test_open_is_idempotent(self):
+        """Test the same key keeps its watch id and channel."""
+        hub = BroadcastHub()
+        watch_id, channel, created = hub.open('session', Source().render)
+        assert created
+        assert hub.open('session', Source().render) == (watch_id, channel, False)
+        assert hub.get(watch_id) is channel
+        assert hub.get('missing') is None
+
+    def test_prune_ended_sources(self):
+        """Test channels whose source ended are closed and dropped."""
+        hub = BroadcastHub()
+        alive = [True]
+        watch_id, channel, _ = hub.open('session', Source().render, lambda: alive[0])
+        alive[0] = False
+        assert hub.prune() == 1
+        assert channel.closed
+        assert hub.get(watch_id) is None
+        assert len(hub) == 0
@@ -3,7 +3,7 @@ Tests for Tetris Game Logic
 """
 
 import pytest
-from game_logic import TetrisGame, PIECES
+from game_logic import GARBAGE, TetrisGame, PALETTE, PIECE_IDS, PIECES, ROTATIONS, drop_interval
 
 
 class TestTetrisGameInitialization:
@@ -106,6 +106,53 @@ class TestPieceRotation:
             assert game.current_piece == initial_piece
 
 
+class TestRotationTable:
+    """Test the precomputed rotation table."""
+    
+    def test_rotation_counts(self):
+        """Test each piece has only its distinct rotation states."""
+        counts = {piece_type: len(states) for piece_type, states in ROTATIONS.items()}
+        assert counts == {'I': 2, 'O': 1, 'T': 4, 'S': 2, 'Z': 2, 'J': 4, 'L': 4}
+    
+    def test_spawn_state_matches_shape(self):
+        """Test rotation 0 is the spawn shape."""
+        for piece_type, piece_data in PIECES.items():
+            assert list(ROTATIONS[piece_type][0].cells) == piece_data['shape']
+    
+    def test_bounding_box_and_masks(self):
+        """Test bounding boxes and row masks agree with the cells."""
+        for states in ROTATIONS.values():
+            for state in states:
+                assert min(x for x, y in state.cells) == 0
+                assert min(y for x, y in state.cells) == 0
+                assert state.width == max(x for x, y in state.cells) + 1
+                assert state.height == len(state.row_masks)
+                for x, y in state.cells:
+                    assert state.row_masks[y] >> x & 1
+                assert sum(bin(mask).count('1') for mask in state.row_masks) == 4
+    
+    def test_rotation_cycles(self):
+        """Test rotating through all states returns to the spawn state."""
+        game = TetrisGame()
+        piece_type = game.current_piece_type
+        game.current_piece_y = 5
+        for _ in range(len(ROTATIONS[piece_type])):
+            assert game.rotate_piece()
+        assert game.current_rotation == 0
+        assert game.current_piece == ROTATIONS[piece_type][0].cells
+    
+    def test_rotation_blocked_at_wall(self):
+        """Test a vertical I piece cannot rotate into the right wall."""
+        game = TetrisGame()
+        game.current_piece_type = 'I'
+        game.current_rotation = 1
+        game.current_piece = ROTATIONS['I'][1].cells
+        game.current_piece_x = game.width - 1
+        game.current_piece_y = 5
+        assert not game.rotate_piece()
+        assert game.current_rotation == 1
+
+
 class TestLineClearing:
     """Test line clearing."""
     
@@ -130,6 +177,27 @@ class TestLineClearing:
         # Lines cleared should increase
         assert game.lines_cleared == initial_lines + 1
     
+    def test_locked_cells_hold_piece_id(self):
+        """Test locked cells store the piece type's palette index."""
+        game = TetrisGame(seed=3)
+        piece_type = game.current_piece_type
+        game.hard_drop()
+        cells = {cell for row in game.board for cell in row if cell}
+        assert cells == {PIECE_IDS[piece_type]}
+        assert PALETTE[PIECE_IDS[piece_type]] == PIECES[piece_type]['color']
+
+    def test_memory_constant_over_long_game(self):
+        """Test a long game keeps no per-piece bookkeeping."""
+        game = TetrisGame(seed=3)
+        attributes = set(vars(game))
+        for _ in range(500):
+            if game.game_over:
+                break
+            game.hard_drop()
+            game.tick()
+        assert set(vars(game)) == attributes
+        assert all(len(row) == game.width for row in game.board)
+
     def test_no_line_cleared(self):
         """Test that incomplete lines are not cleared."""
         game = TetrisGame()
@@ -155,6 +223,58 @@ class TestGameOver:
         assert not success
 
 
+class TestTick:
+    """Test advancing the game one tick at a time."""
+    
+    def test_tick_moves_piece_down(self):
+        """Test a tick drops the piece one row."""
+        game = TetrisGame()
+        assert game.tick()
+        assert game.current_piece_y == 1
+    
+    def test_hard_drop_locks_until_next_tick(self):
+        """Test a hard-dropped piece is locked once and the next tick spawns."""
+        game = TetrisGame()
+        game.hard_drop()
+        assert game.piece_locked
+        assert not game.move_piece_left()
+        assert not game.move_piece_down()
+        assert game.tick()
+        assert not game.piece_locked
+        assert game.current_piece_y == 0
+    
+    def test_no_relock_after_line_clear(self):
+        """Test a dropped piece that clears a line is not written again on the next tick."""
+        game = TetrisGame(10, 20)
+        game.current_piece_type = 'I'
+        game.current_rotation = 0
+        game.current_piece = ROTATIONS['I'][0].cells
+        game.current_piece_x = 0
+        for x in range(4, 10):
+            game.board[19][x] = 1
+        game.hard_drop()
+        assert game.lines_cleared == 1
+        game.tick()
+        assert all(cell == 0 for cell in game.board[19])
+    
+    def test_tick_reports_game_over(self):
+        """Test a tick that cannot spawn ends the game."""
+        game = TetrisGame(10, 20)
+        for y in range(3):
+            for x in range(10):
+                game.board[y][x] = 1
+        game.piece_locked = True
+        assert not game.tick()
+        assert game.game_over
+        assert not game.tick()
+    
+    def test_drop_interval_speeds_up(self):
+        """Test gravity gets faster with level and is bounded."""
+        assert drop_interval(1) == 0.5
+        assert drop_interval(5) < drop_interval(2) < drop_interval(1)
+        assert drop_interval(100) == 0.05
+
+
 class TestScoring:
     """Test scoring system."""
     
@@ -180,6 +300,223 @@ class TestScoring:
         assert game.level == 2
 
 
+class TestRandomizer:
+    """Test seeded piece generation."""
+
+    def test_same_seed_same_pieces(self):
+        """Test two games with one seed deal the same pieces."""
+        first = TetrisGame(seed=42)
+        second = TetrisGame(seed=42)
+        assert [first.get_random_piece() for _ in range(50)] == \
+            [second.get_random_piece() for _ in range(50)]
+
+    def test_bag_deals_every_piece(self):
+        """Test the 7-bag deals each piece once per seven."""
+        game = TetrisGame(seed=1, randomizer='bag')
+        # The first two pieces of the first bag were dealt on creation
+        for _ in range(5):
+            game.get_random_piece()
+        for _ in range(3):
+            assert sorted(game.get_random_piece() for _ in range(7)) == sorted(PIECES)
+
+    def test_unknown_randomizer(self):
+        """Test an unknown randomizer is rejected."""
+        with pytest.raises(ValueError):
+            TetrisGame(randomizer='nope')
+
+
+class TestSnapshot:
+    """Test snapshot/restore and the read-only board view."""
+
+    def play(self, game, pieces):
+        for _ in range(pieces):
+            game.move_piece_left()
+            game.hard_drop()
+            game.tick()
+
+    def test_restore_undoes_moves(self):
+        """Test restoring a snapshot brings back the earlier state."""
+        game = TetrisGame(seed=9)
+        self.play(game, 3)
+        saved = game.snapshot()
+        board = game.get_board()
+        position = game.get_piece_position()
+
+        self.play(game, 5)
+        game.restore(saved)
+        assert game.get_board() == board
+        assert game.get_piece_position() == position
+        assert game.snapshot() == saved
+
+    def test_restore_replays_same_pieces(self):
+        """Test a restored game deals the same pieces as the original branch."""
+        game = TetrisGame(seed=9, randomizer='bag')
+        saved = game.snapshot()
+        first = [game.get_random_piece() for _ in range(10)]
+        game.restore(saved)
+        assert [game.get_random_piece() for _ in range(10)] == first
+
+    def test_restored_board_is_writable(self):
+        """Test writes after a restore do not leak into the snapshot."""
+        game = TetrisGame()
+        saved = game.snapshot()
+        game.restore(saved)
+        game.board[19][0] = 1
+        assert saved.rows[19][0] == 0
+        assert game.board_view()[19][0] == 1
+
+    def test_unchanged_rows_are_shared(self):
+        """Test successive snapshots share rows that did not change."""
+        game = TetrisGame(seed=9)
+        first = game.snapshot()
+        game.hard_drop()
+        second = game.snapshot()
+        assert first.rows[0] is second.rows[0]
+        assert first.rows[19] is not second.rows[19]
+        assert first.rng_state is second.rng_state
+
+    def test_board_view_reused_until_changed(self):
+        """Test the view is the same object while the board is unchanged."""
+        game = TetrisGame()
+        view = game.board_view()
+        game.move_piece_left()
+        assert game.board_view() is view
+        game.board[19][0] = 1
+        assert game.board_view() is not view
+
+    def test_size_mismatch(self):
+        """Test a snapshot from another board size is rejected."""
+        with pytest.raises(ValueError):
+            TetrisGame(10, 20).restore(TetrisGame(8, 16).snapshot())
+
+
+class TestDropDistance:
+    """Test column heights, drop distance and hard drops."""
+
+    @staticmethod
+    def stepped_distance(game):
+        """Reference drop distance found by stepping down one row at a time."""
+        distance = 0
+        while game._fits(game.current_piece_type, game.current_rotation,
+                         game.current_piece_x, game.current_piece_y + distance + 1):
+            distance += 1
+        return distance
+
+    def test_heights_follow_locked_pieces(self):
+        """Test incremental heights match the board through locks and clears."""
+        game = TetrisGame(10, 20, seed=4)
+        for i in range(60):
+            for action in ['left', 'rotate', 'right', 'right'][:i % 5]:
+                game.apply_action(action)
+            assert game.drop_distance() == self.stepped_distance(game)
+            game.hard_drop()
+            heights = game.column_heights()
+            game._heights = None
+            assert game.column_heights() == heights
+            if not game.tick():
+                break
+
+    def test_overhang_falls_back_to_stepping(self):
+        """Test a piece tucked under an overhang stops on the cells below it."""
+        game = TetrisGame(10, 20)
+        game.board[10][0] = 1
+        game.board[19][3] = 1
+        game._clear_lines()
+        game.current_piece_type = 'O'
+        game.current_rotation = 0
+        game.current_piece = ROTATIONS['O'][0].cells
+        game.current_piece_x = 0
+        game.current_piece_y = 15
+        assert game.column_heights()[0] == 10
+        assert game.drop_distance() == 3
+
+    def test_direct_writes_are_not_passed_through(self):
+        """Test a cell written directly after the heights were cached stops the piece."""
+        game = TetrisGame(10, 20, seed=1)
+        game.current_piece_type = 'I'
+        game.current_rotation = 1
+        game.current_piece = ROTATIONS['I'][1].cells
+        game.current_piece_x = 4 - game.current_piece[0][0]
+        game.current_piece_y = 0
+        assert game.drop_distance() == 16
+        game.board[10][4] = 3
+        assert game.drop_distance() == self.stepped_distance(game) == 6
+        game._clear_lines()
+        game.board[10][4] = 0  # the recomputed heights now claim a cell that is gone
+        assert game.drop_distance() == 16
+        game.board[10][4] = 3
+        game.hard_drop()
+        assert [game.board[y][4] for y in range(6, 11)] == [PIECE_IDS['I']] * 4 + [3]
+
+    def test_hard_drop_scores_and_locks(self):
+        """Test a hard drop moves, scores one point per row and locks the piece."""
+        game = TetrisGame(10, 20, seed=1)
+        distance = game.drop_distance()
+        y = game.current_piece_y
+        game.hard_drop()
+        assert game.piece_locked
+        assert game.score == distance
+        assert game.current_piece_y == y + distance
+        assert game.drop_distance() == 0
+
+    def test_clears_separated_lines_in_one_pass(self):
+        """Test locking a piece clears non-adjacent full rows and keeps the row between."""
+        game = TetrisGame(10, 20)
+        for x in range(1, 10):
+            game.board[19][x] = 1
+            game.board[17][x] = 2
+        for x in range(2, 10):
+            game.board[18][x] = 3
+        game._clear_lines()
+        game.current_piece_type = 'I'
+        game.current_rotation = 1
+        game.current_piece = ROTATIONS['I'][1].cells
+        game.current_piece_x = 0
+        game.current_piece_y = 0
+        game.hard_drop()
+        assert game.lines_cleared == 2
+        assert list(game.board[19]) == [1, 0] + [3] * 8
+        assert list(game.board[18]) == [1] + [0] * 9
+        assert game.column_heights() == (2, 0) + (1,) * 8
+
+
+class TestGarbage:
+    """Test garbage rows pushed in from the bottom."""
+
+    def test_rows_shift_up_with_one_hole(self):
+        """Test existing rows move up unchanged and garbage fills all but the hole."""
+        game = TetrisGame(10, 20)
+        game.board[19][0] = 1
+        game._clear_lines()
+        bottom = game.board[19]
+        assert game.add_garbage(2, hole=3)
+        assert game.board[17] is bottom
+        for row in game.board[18:]:
+            assert [x for x, cell in enumerate(row) if cell == 0] == [3]
+            assert row[0] == GARBAGE
+        heights = game.column_heights()
+        game._heights = None
+        assert game.column_heights() == heights == (3,) + (2,) * 2 + (0,) + (2,) * 6
+
+    def test_piece_is_pushed_up(self):
+        """Test a falling piece that would overlap the garbage moves up."""
+        game = TetrisGame(10, 20)
+        game.current_piece_y = 18
+        game.current_piece_x = 0
+        assert game.add_garbage(3, hole=9)
+        assert game._fits(game.current_piece_type, game.current_rotation,
+                          game.current_piece_x, game.current_piece_y)
+        assert game.current_piece_y <= 17 - ROTATIONS[game.current_piece_type][0].height + 1
+
+    def test_topping_out_ends_the_game(self):
+        """Test garbage that pushes cells off the top ends the game."""
+        game = TetrisGame(10, 20)
+        game.board[1][0] = 1
+        assert game.add_garbage(1, hole=0)
+        assert not game.add_garbage(1, hole=0)
+        assert game.game_over
+
+
 class TestPieceData:
     """Test piece data integrity."""
     
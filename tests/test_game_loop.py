@@ -0,0 +1,108 @@
+"""
+Tests for the fixed-timestep game loop helpers
+"""
+
+import pytest
+
+from game_logic import TetrisGame, drop_interval
+from game_loop import FixedTimestep, Gravity, KeyRepeat
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFixedTimestep:
+    """Test elapsed time is cut into fixed steps."""
+
+    def test_steps_follow_elapsed_time(self):
+        """Test the step count depends on time, not on how often frames run."""
+        clock = FakeClock()
+        timestep = FixedTimestep(0.01, clock=clock)
+        timestep.advance()
+        clock.now = 0.035
+        assert timestep.advance() == 3
+        clock.now = 0.04
+        assert timestep.advance() == 1
+
+    def test_slow_frames_catch_up(self):
+        """Test a slow frame runs several steps, a fast one none."""
+        clock = FakeClock()
+        timestep = FixedTimestep(0.01, clock=clock)
+        timestep.advance()
+        clock.now = 0.1
+        assert timestep.advance() == 10
+        clock.now = 0.101
+        assert timestep.advance() == 0
+        assert 0 <= timestep.alpha < 1
+
+    def test_long_stall_is_clamped(self):
+        """Test a long stall does not replay all of the lost time."""
+        clock = FakeClock()
+        timestep = FixedTimestep(0.01, max_frame_time=0.25, clock=clock)
+        timestep.advance()
+        clock.now = 10.0
+        assert timestep.advance() == 25
+
+
+class TestKeyRepeat:
+    """Test delayed auto shift and auto repeat."""
+
+    def test_repeat_after_delay(self):
+        """Test a held key repeats every rate seconds once the delay passes."""
+        repeat = KeyRepeat(delay=0.125, rate=0.0625)
+        assert repeat.press('left') == 'left'
+        assert repeat.advance(0.0625) == []
+        assert repeat.advance(0.0625) == ['left']
+        assert repeat.advance(0.125) == ['left', 'left']
+
+    def test_release_stops_repeat(self):
+        """Test releasing the key stops repeats."""
+        repeat = KeyRepeat(delay=0.1, rate=0.05)
+        repeat.press('left')
+        repeat.release('left')
+        assert repeat.advance(1.0) == []
+
+    def test_last_pressed_wins(self):
+        """Test pressing the other direction takes over until it is released."""
+        repeat = KeyRepeat(delay=0.1, rate=0.05)
+        repeat.press('left')
+        repeat.press('right')
+        repeat.release('left')
+        assert repeat.advance(0.1) == ['right']
+
+    def test_zero_delay(self):
+        """Test a zero delay repeats at the rate from the press."""
+        repeat = KeyRepeat(delay=0.0, rate=0.05)
+        repeat.press('down')
+        assert repeat.advance(0.01) == []
+        assert repeat.advance(0.04) == ['down']
+
+    def test_rate_must_be_positive(self):
+        """Test a zero repeat rate is rejected."""
+        with pytest.raises(ValueError):
+            KeyRepeat(rate=0)
+
+
+class TestGravity:
+    """Test level-based gravity."""
+
+    def test_drops_follow_level(self):
+        """Test gravity speeds up with the level."""
+        game = TetrisGame()
+        gravity = Gravity()
+        assert gravity.advance(game, 1.0) == int(1.0 / drop_interval(1))
+        game.level = 10
+        gravity = Gravity()
+        assert gravity.advance(game, 1.0) == int(1.0 / drop_interval(10))
+
+    def test_small_steps_add_up(self):
+        """Test many small steps give the same drops as one large step."""
+        game = TetrisGame()
+        gravity = Gravity()
+        drops = sum(gravity.advance(game, 1 / 120) for _ in range(120))
+        assert drops == 2
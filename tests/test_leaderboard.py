@@ -0,0 +1,102 @@
+"""
+Tests for the high-score leaderboard
+"""
+
+import threading
+
+from leaderboard import Leaderboard
+
+
+def fill(board, scores, name='player'):
+    for index, score in enumerate(scores):
+        board.submit(f'session-{name}-{index}', name, score, score // 100, 1)
+
+
+class TestRanks:
+    """Test top lists and ranks."""
+
+    def test_top_and_ties(self):
+        """Test the top list is ordered and equal scores share a rank."""
+        board = Leaderboard()
+        fill(board, [100, 500, 300, 500, 50])
+        top = board.top(3)
+        assert [entry['score'] for entry in top] == [500, 500, 300]
+        assert [entry['rank'] for entry in top] == [1, 1, 3]
+        assert board.rank(400) == 3
+        assert board.rank(10) == 6
+
+    def test_submit_returns_rank_once(self):
+        """Test a session can only be recorded once, even after it was written."""
+        board = Leaderboard()
+        assert board.submit('a', 'alice', 300, 3, 1) == 1
+        assert board.submit('b', 'bob', 500, 5, 1) == 1
+        assert board.submit('a', 'alice', 900, 9, 1) is None
+        board.flush()
+        assert board.submit('b', 'bob', 900, 9, 1) is None
+        assert len(board) == 2
+
+    def test_around_includes_pending_and_written(self):
+        """Test neighbours of a score come from the table and the unwritten entries."""
+        board = Leaderboard()
+        fill(board, [100, 200, 300], 'old')
+        board.flush()
+        fill(board, [250, 350], 'new')
+        around = board.around(250, 2)
+        assert [entry['score'] for entry in around] == [350, 300, 250, 200]
+        assert [entry['rank'] for entry in around] == [1, 2, 3, 4]
+
+    def test_player_best(self):
+        """Test a player's rank is that of their best score."""
+        board = Leaderboard()
+        fill(board, [100, 700], 'alice')
+        fill(board, [400], 'bob')
+        board.flush()
+        assert board.player('alice')['score'] == 700
+        assert board.player('bob')['rank'] == 2
+        assert board.player('carol') is None
+
+    def test_top_beyond_cache(self):
+        """Test limits above the cache size read the table."""
+        board = Leaderboard(top_k=3)
+        fill(board, range(0, 1000, 100))
+        board.flush()
+        assert [entry['score'] for entry in board.top(5)] == [900, 800, 700, 600, 500]
+
+
+class TestPersistence:
+    """Test written scores survive reopening the leaderboard."""
+
+    def test_reopen(self, tmp_path):
+        """Test the rank array and top cache are rebuilt from the table."""
+        path = str(tmp_path / 'leaderboard.db')
+        board = Leaderboard(path, top_k=2)
+        fill(board, [100, 300, 200])
+        board.close()
+
+        reopened = Leaderboard(path, top_k=2)
+        assert len(reopened) == 3
+        assert [entry['score'] for entry in reopened.top(2)] == [300, 200]
+        assert reopened.rank(150) == 3
+        assert reopened.submit('session-player-0', 'player', 999, 9, 1) is None
+        reopened.close()
+
+    def test_concurrent_submits_are_batched(self, tmp_path):
+        """Test many sessions submitting at once are all written by the batched writer."""
+        board = Leaderboard(str(tmp_path / 'leaderboard.db'), batch_size=50)
+        board.start_writer(0.05)
+
+        def player(index):
+            for game in range(20):
+                board.submit(f'{index}-{game}', f'p{index}', index * 100 + game, 0, 1)
+
+        threads = [threading.Thread(target=player, args=(index,)) for index in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        board.flush()
+        assert len(board) == 400
+        assert board.pending == 0
+        assert board.top(1)[0]['score'] == 1919
+        assert board.rank(0) == 400
+        board.close()
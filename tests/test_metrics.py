@@ -0,0 +1,69 @@
+"""
+Tests for the metrics registry and the sampling profiler
+"""
+
+from metrics import Registry, SlowRequestProfiler
+
+
+class TestRegistry:
+    """Test the Prometheus text output."""
+
+    def test_counter(self):
+        """Test counters render one sample per label set."""
+        registry = Registry()
+        counter = registry.counter('requests_total', 'Requests', ('route',))
+        counter.inc('/a')
+        counter.inc('/a')
+        counter.inc('/b', amount=3)
+        text = registry.render()
+        assert '# TYPE requests_total counter' in text
+        assert 'requests_total{route="/a"} 2' in text
+        assert 'requests_total{route="/b"} 3' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets count every value at or below the bound."""
+        registry = Registry()
+        histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+        text = registry.render()
+        assert 'latency_seconds_bucket{le="0.1"} 2' in text
+        assert 'latency_seconds_bucket{le="1"} 3' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+        assert 'latency_seconds_count 4' in text
+        assert histogram.count() == 4
+
+    def test_gauge_and_escaping(self):
+        """Test gauges call back at render time and label values are escaped."""
+        registry = Registry()
+        registry.gauge('active', 'Active', lambda: 7)
+        registry.counter('odd_total', 'Odd', ('name',)).inc('say "hi"\n')
+        text = registry.render()
+        assert 'active 7' in text
+        assert 'odd_total{name="say \\"hi\\"\\n"} 1' in text
+
+
+class TestSlowRequestProfiler:
+    """Test the runtime-switchable profiler."""
+
+    def test_disabled_by_default(self):
+        """Test nothing is profiled until the profiler is switched on."""
+        assert SlowRequestProfiler().start() is None
+
+    def test_keeps_slowest(self):
+        """Test only the slowest requests are kept, slowest first."""
+        profiler = SlowRequestProfiler(sample_rate=1.0, keep=2)
+        profiler.configure(enabled=True)
+        for duration in (0.3, 0.1, 0.5):
+            profile = profiler.start()
+            sum(range(100))
+            profiler.finish(profile, duration, f'GET /{duration}')
+        slowest = profiler.slowest()
+        assert [entry['duration'] for entry in slowest] == [0.5, 0.3]
+        assert 'function calls' in slowest[0]['profile']
+
+    def test_configure_clamps_rate(self):
+        """Test the sample rate is clamped to [0, 1]."""
+        profiler = SlowRequestProfiler()
+        profiler.configure(sample_rate=5)
+        assert profiler.sample_rate == 1.0
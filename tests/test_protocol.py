@@ -0,0 +1,96 @@
+"""
+Tests for the versioned state protocol
+"""
+
+import base64
+
+import pytest
+
+from protocol import StateTracker, pack_cells, unpack_cells
+
+
+def make_board(width=4, height=3):
+    return [[0] * width for _ in range(height)]
+
+
+class TestPackedCells:
+    """Test the packed cell encoding."""
+
+    def test_round_trip(self):
+        """Test packing and unpacking preserves cell values."""
+        cells = [0, 1, 7, 255]
+        assert unpack_cells(pack_cells(cells)) == cells
+
+    def test_one_byte_per_cell(self):
+        """Test each cell packs into a single byte."""
+        assert len(base64.b64decode(pack_cells([0] * 200))) == 200
+
+    def test_unknown_encoding(self):
+        """Test encodings other than b64u8 are rejected."""
+        with pytest.raises(ValueError):
+            unpack_cells(pack_cells([1, 7]), 'b64u16')
+
+
+class TestStateTracker:
+    """Test snapshots and deltas."""
+
+    def test_snapshot(self):
+        """Test a snapshot carries the whole board and every field."""
+        tracker = StateTracker()
+        tracker.sync(make_board(), {'score': 0}, 0)
+        state = tracker.snapshot()
+        assert state['full']
+        assert state['version'] == 0
+        assert (state['width'], state['height']) == (4, 3)
+        assert [list(row) for row in state['board']] == make_board()
+        assert state['score'] == 0
+
+    def test_delta_contains_only_changes(self):
+        """Test a delta lists changed rows and fields only."""
+        tracker = StateTracker()
+        board = make_board()
+        tracker.sync(board, {'score': 0, 'piece_x': 3}, 0)
+        board[2][1] = 5
+        tracker.sync(board, {'score': 0, 'piece_x': 2}, 1)
+
+        state = tracker.delta(0)
+        assert not state['full']
+        assert state['rows'] == [[2, (0, 5, 0, 0)]]
+        assert state['piece_x'] == 2
+        assert 'score' not in state
+
+        assert tracker.delta(1)['rows'] == []
+
+    def test_delta_spans_several_versions(self):
+        """Test a delta includes every change after the given version."""
+        tracker = StateTracker()
+        board = make_board()
+        tracker.sync(board, {}, 0)
+        board[0][0] = 1
+        tracker.sync(board, {}, 1)
+        board[1][0] = 1
+        tracker.sync(board, {}, 2)
+        assert [y for y, _ in tracker.delta(0)['rows']] == [0, 1]
+        assert [y for y, _ in tracker.delta(1)['rows']] == [1]
+
+    def test_unknown_version_gets_snapshot(self):
+        """Test versions outside the tracked range fall back to a snapshot."""
+        tracker = StateTracker()
+        tracker.sync(make_board(), {}, 5)
+        assert tracker.delta(4)['full']
+        assert tracker.delta(6)['full']
+        assert not tracker.delta(5)['full']
+
+    def test_packed_delta(self):
+        """Test packed deltas encode each changed row."""
+        tracker = StateTracker()
+        board = make_board()
+        tracker.sync(board, {}, 0)
+        board[1][3] = 2
+        tracker.sync(board, {}, 1)
+        state = tracker.delta(0, packed=True)
+        assert state['encoding'] == 'b64u8'
+        [[y, packed]] = state['rows']
+        assert y == 1
+        assert unpack_cells(packed) == [0, 0, 0, 2]
+        assert unpack_cells(tracker.snapshot(packed=True)['board'])[7] == 2
@@ -0,0 +1,71 @@
+"""
+Tests for the cached, dirty-rect Pygame renderer
+"""
+
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+import pytest
+
+from game_logic import PALETTE, PIECE_IDS, TetrisGame
+from renderer import GameRenderer
+
+
+@pytest.fixture
+def renderer():
+    pygame.font.init()
+    surface = pygame.Surface((10 * 30 + 200, 20 * 30 + 40))
+    return GameRenderer(10, 20, 30, surface=surface)
+
+
+class TestDirtyRects:
+    """Test that only changed regions are redrawn."""
+
+    def test_first_frame_is_full(self, renderer):
+        """Test the first draw covers the whole surface."""
+        assert renderer.draw(TetrisGame(seed=1)) == [renderer.screen.get_rect()]
+
+    def test_unchanged_frame_is_empty(self, renderer):
+        """Test drawing an unchanged game redraws nothing."""
+        game = TetrisGame(seed=1)
+        renderer.draw(game)
+        assert renderer.draw(game) == []
+
+    def test_move_redraws_piece_cells(self, renderer):
+        """Test a move redraws only the cells the piece left or entered."""
+        game = TetrisGame(seed=1)
+        renderer.draw(game)
+        game.move_piece_left()
+        dirty = renderer.draw(game)
+        assert 0 < len(dirty) <= 8
+        assert all(rect.size == (30, 30) for rect in dirty)
+
+    def test_locked_cell_color(self, renderer):
+        """Test locked cells are drawn in their piece's color."""
+        game = TetrisGame(seed=1)
+        piece_type = game.current_piece_type
+        renderer.draw(game)
+        game.hard_drop()
+        renderer.draw(game)
+        y = next(y for y, row in enumerate(game.board) if any(row))
+        x = next(x for x, cell in enumerate(game.board[y]) if cell)
+        rect = renderer.cell_rects[y * 10 + x]
+        assert renderer.screen.get_at(rect.center)[:3] == PALETTE[PIECE_IDS[piece_type]]
+
+    def test_score_change_redraws_text(self, renderer):
+        """Test a score change redraws the score text only."""
+        game = TetrisGame(seed=1)
+        renderer.draw(game)
+        game.score = 1000
+        dirty = renderer.draw(game)
+        assert len(dirty) == 1
+        assert dirty[0].x == renderer.ui_x
+
+    def test_invalidate(self, renderer):
+        """Test invalidate forces a full redraw."""
+        game = TetrisGame(seed=1)
+        renderer.draw(game)
+        renderer.invalidate()
+        assert renderer.draw(game) == [renderer.screen.get_rect()]
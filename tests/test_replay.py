@@ -0,0 +1,142 @@
+"""
+Tests for replay recording and playback
+"""
+
+import random
+
+import pytest
+
+from game_logic import TetrisGame
+from replay import (GARBAGE_CODE, MAX_REPLAY_EVENTS, Garbage, Replay, ReplayRecorder,
+                    play_replay, verify_score)
+from simulation import RandomPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def record_game(seed, randomizer='uniform', pieces=40):
+    """Play a random game, recording every input."""
+    game = TetrisGame(seed=seed, randomizer=randomizer)
+    clock = FakeClock()
+    recorder = ReplayRecorder(game, clock)
+    policy = RandomPolicy()
+    policy.reset(random.Random(seed))
+    for _ in range(pieces):
+        if game.game_over:
+            break
+        for action in list(policy.plan(game)) + ['drop', 'tick']:
+            clock.now += 0.0173
+            recorder.record(action)
+            game.apply_action(action)
+    return game, recorder.replay
+
+
+class TestReplayFormat:
+    """Test the compact binary format."""
+
+    def test_round_trip(self):
+        """Test a replay survives bytes and string encoding."""
+        _, replay = record_game(3)
+        restored = Replay.from_bytes(replay.to_bytes())
+        assert list(restored) == list(replay)
+        assert (restored.seed, restored.randomizer) == (replay.seed, replay.randomizer)
+        assert list(Replay.from_string(replay.to_string())) == list(replay)
+
+    def test_timestamps(self):
+        """Test timestamps are kept to the millisecond without drift."""
+        _, replay = record_game(3, pieces=5)
+        times = [elapsed for elapsed, _ in replay]
+        for i, elapsed in enumerate(times):
+            assert abs(elapsed - 17.3 * (i + 1)) <= 1
+
+    def test_compact(self):
+        """Test each input takes about two bytes."""
+        _, replay = record_game(3)
+        assert len(replay.events) <= 2 * replay.count
+
+    def test_rejects_garbage(self):
+        """Test data that is not a replay is rejected."""
+        with pytest.raises(ValueError):
+            Replay.from_bytes(b'not a replay at all')
+
+    def test_rejects_oversized_counts(self):
+        """Test a header claiming more inputs than allowed or present is rejected."""
+        replay = Replay(seed=1)
+        for _ in range(3):
+            replay.append(0, 'drop')
+        assert Replay.from_bytes(replay.to_bytes()).count == 3
+        with pytest.raises(ValueError):
+            Replay.from_bytes(replay.to_bytes(), max_events=2)
+        replay.count = 4
+        with pytest.raises(ValueError):
+            Replay.from_bytes(replay.to_bytes())
+
+    def test_recorder_stops_at_limit(self):
+        """Test the recorder keeps at most max_events and reports it is full."""
+        game = TetrisGame(seed=1)
+        recorder = ReplayRecorder(game, FakeClock(), max_events=2)
+        for action in ('left', 'right', 'drop'):
+            recorder.record(action)
+        recorder.record_garbage(1, 0)
+        assert recorder.full
+        assert [action for _, action in recorder.replay] == ['left', 'right']
+        assert ReplayRecorder(game).max_events == MAX_REPLAY_EVENTS
+
+    def test_garbage_events(self):
+        """Test garbage rows survive encoding between ordinary inputs."""
+        replay = Replay(seed=1)
+        replay.append(5, 'left')
+        replay.append_garbage(3, 4, 9)
+        replay.append(2, 'drop')
+        restored = Replay.from_string(replay.to_string())
+        assert list(restored) == [(5, 'left'), (8, Garbage(4, 9)), (10, 'drop')]
+
+    def test_rejects_unknown_codes(self):
+        """Test an event code that is neither an action nor garbage is rejected."""
+        replay = Replay(seed=1)
+        replay.events.append(GARBAGE_CODE + 1)
+        replay.count = 1
+        with pytest.raises(ValueError):
+            list(Replay.from_bytes(replay.to_bytes()))
+
+
+class TestPlayback:
+    """Test headless re-simulation."""
+
+    @pytest.mark.parametrize('randomizer', ['uniform', 'bag'])
+    def test_playback_matches_game(self, randomizer):
+        """Test playing a replay reproduces the recorded game."""
+        game, replay = record_game(11, randomizer)
+        replayed = play_replay(replay)
+        assert replayed.board == game.board
+        assert replayed.score == game.score
+        assert replayed.game_over == game.game_over
+        assert verify_score(replay, game.score, game.lines_cleared)
+        assert not verify_score(replay, game.score + 100)
+
+    def test_playback_applies_garbage(self):
+        """Test recorded garbage rows are pushed in at the same point on playback."""
+        game = TetrisGame(seed=5, randomizer='bag')
+        recorder = ReplayRecorder(game, FakeClock())
+        for action in ('drop', 'left', 'drop'):
+            recorder.record(action)
+            game.apply_action(action)
+        recorder.record_garbage(2, 3)
+        game.add_garbage(2, 3)
+        recorder.record('drop')
+        game.apply_action('drop')
+        replayed = play_replay(recorder.replay)
+        assert replayed.board == game.board
+        assert replayed.score == game.score
+
+    def test_playback_until(self):
+        """Test playback can stop part-way through."""
+        _, replay = record_game(11)
+        game = play_replay(replay, until_ms=0)
+        assert game.board == TetrisGame(seed=11).board
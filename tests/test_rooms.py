@@ -0,0 +1,225 @@
+"""
+Tests for versus rooms
+"""
+
+import pytest
+
+from game_logic import GARBAGE, ROTATIONS, TetrisGame
+from replay import play_replay
+from rooms import Room, RoomManager
+from scheduler import TickScheduler
+from sessions import SessionManager
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def manager(clock):
+    sessions = SessionManager(lambda: TetrisGame(10, 20), clock=clock)
+    return RoomManager(sessions, TickScheduler(clock), clock=clock)
+
+
+def start_room(manager, size=2):
+    room = manager.create(size)
+    players = [manager.join(room) for _ in range(size)]
+    return room, players
+
+
+def clear_lines(session, lines):
+    """Lock a vertical I into column 0 over ``lines`` nearly full rows."""
+    game = session.game
+    for y in range(game.height):
+        for x in range(game.width):
+            game.board[y][x] = 1 if y >= game.height - lines and x > 0 else 0
+    game._clear_lines()
+    game.current_piece_type = 'I'
+    game.current_rotation = 1
+    game.current_piece = ROTATIONS['I'][1].cells
+    game.current_piece_x = 0
+    game.current_piece_y = 0
+    game.piece_locked = False
+    with session.lock:
+        session.apply('drop')
+
+
+class TestRoomLifecycle:
+    """Test joining, starting and finishing rooms."""
+
+    def test_room_starts_when_full(self, manager):
+        """Test players wait paused until the last one joins."""
+        room = manager.create(2)
+        first = manager.join(room)
+        assert first.paused and not room.started
+        second = manager.join(room)
+        assert room.started
+        assert not first.paused and not second.paused
+        assert manager.room_of(first.session_id) is room
+        assert len(manager.scheduler) == 1
+
+    def test_full_room_rejects_players(self, manager):
+        """Test joining a started room fails and leaves no stray session."""
+        room, _ = start_room(manager)
+        sessions = len(manager.sessions)
+        with pytest.raises(ValueError):
+            manager.join(room)
+        assert len(manager.sessions) == sessions
+
+    def test_same_piece_sequence(self, manager):
+        """Test every player gets the same pieces."""
+        room, players = start_room(manager, 3)
+        sequences = [(p.game.current_piece_type, p.game.next_piece_type) for p in players]
+        assert len(set(sequences)) == 1
+
+    def test_invalid_size(self):
+        """Test rooms need 2 to 8 players."""
+        with pytest.raises(ValueError):
+            Room('r', 1)
+        with pytest.raises(ValueError):
+            Room('r', 9)
+
+    def test_last_player_standing_wins(self, manager, clock):
+        """Test the room finishes when one player is left."""
+        room, (first, second) = start_room(manager)
+        first.game.game_over = True
+        clock.now = 10.0
+        assert room.tick() is None
+        assert room.finished and room.winner == 1
+
+    def test_summary_hides_session_ids(self, manager):
+        """Test the room summary identifies players by index only."""
+        room, players = start_room(manager)
+        summary = room.summary()
+        assert [p['player'] for p in summary['players']] == [0, 1]
+        assert all(s.session_id not in str(summary) for s in players)
+
+
+class TestRoomTick:
+    """Test the shared room timer."""
+
+    def test_tick_drops_due_players(self, manager, clock):
+        """Test one room tick advances every player whose drop is due."""
+        room, players = start_room(manager)
+        ys = [p.game.current_piece_y for p in players]
+        clock.now = 0.2
+        assert room.tick() == pytest.approx(0.3)
+        assert [p.game.current_piece_y for p in players] == ys
+        clock.now = 0.5
+        delay = room.tick()
+        assert [p.game.current_piece_y for p in players] == [y + 1 for y in ys]
+        assert delay == pytest.approx(0.5)
+
+    def test_runs_on_scheduler(self, manager, clock):
+        """Test the room timer runs from the shared scheduler."""
+        room, players = start_room(manager)
+        y = players[0].game.current_piece_y
+        clock.now = 0.5
+        assert manager.scheduler.run_pending() == 1
+        assert players[0].game.current_piece_y == y + 1
+
+
+class TestGarbage:
+    """Test garbage sent between players."""
+
+    def test_double_sends_one_row(self, manager, clock):
+        """Test clearing two lines sends one garbage row applied on the next tick."""
+        room, (first, second) = start_room(manager)
+        clear_lines(first, 2)
+        assert first.game.lines_cleared == 2
+        assert room.players[1].pending_garbage == 1
+        room.tick()
+        bottom = second.game.board[-1]
+        assert list(bottom).count(GARBAGE) == second.game.width - 1
+        assert room.players[1].pending_garbage == 0
+        assert second.version > 0
+
+    def test_single_sends_nothing(self, manager):
+        """Test a single line clear sends no garbage."""
+        room, (first, _) = start_room(manager)
+        clear_lines(first, 1)
+        assert room.players[1].pending_garbage == 0
+
+    def test_incoming_garbage_is_cancelled(self, manager):
+        """Test a clear first cancels garbage waiting for the sender."""
+        room, (first, second) = start_room(manager)
+        room.players[0].pending_garbage = 3
+        clear_lines(first, 4)
+        assert room.players[0].pending_garbage == 0
+        assert room.players[1].pending_garbage == 1
+
+    def test_garbage_is_recorded_in_replay(self, manager, clock):
+        """Test a room player's replay reproduces the garbage it received."""
+        room, (_, second) = start_room(manager)
+        for action in ('drop', 'right', 'drop'):
+            with second.lock:
+                second.apply(action)
+        room.players[1].pending_garbage = 3
+        clock.now += 1.0
+        room.tick()
+        with second.lock:
+            second.apply('drop')
+        replayed = play_replay(second.recorder.replay)
+        assert list(replayed.board[-1]).count(GARBAGE) == second.game.width - 1
+        assert replayed.board == second.game.board
+        assert replayed.score == second.game.score
+
+    def test_round_robin_targets(self, manager):
+        """Test attacks rotate through the opponents that are still playing."""
+        room, players = start_room(manager, 3)
+        clear_lines(players[0], 2)
+        clear_lines(players[0], 2)
+        assert [p.pending_garbage for p in room.players] == [0, 1, 1]
+        players[1].game.game_over = True
+        clear_lines(players[0], 2)
+        assert [p.pending_garbage for p in room.players] == [0, 1, 2]
+
+
+class TestPrune:
+    """Test rooms are dropped once their players are gone or the match is long decided."""
+
+    def test_prune(self, manager):
+        """Test a room whose sessions all closed is removed with its timer."""
+        room, players = start_room(manager)
+        for session in players:
+            manager.sessions.remove(session.session_id)
+        assert manager.prune() == 1
+        assert manager.get(room.room_id) is None
+        assert len(manager.scheduler) == 0
+
+    def test_finished_room_is_discarded_after_ttl(self, manager, clock):
+        """Test a decided room stays readable for the TTL, then its timer discards it."""
+        room, (first, second) = start_room(manager)
+        first.game.game_over = True
+        clock.now = 1.0
+        manager.scheduler.run_pending()
+        assert room.finished and manager.get(room.room_id) is room
+        assert manager.room_of(second.session_id) is room
+        clock.now = 1.0 + manager.finished_ttl
+        manager.scheduler.run_pending()
+        assert manager.get(room.room_id) is None
+        assert manager.room_of(second.session_id) is None
+        assert room.broadcast.closed
+        assert len(manager.scheduler) == 0
+
+    def test_prune_finished_rooms(self, manager, clock):
+        """Test prune drops finished rooms once the TTL has passed."""
+        room, (first, _) = start_room(manager)
+        first.game.game_over = True
+        clock.now = 1.0
+        room.tick()
+        assert manager.prune() == 0
+        clock.now = 1.0 + manager.finished_ttl
+        assert manager.prune() == 1
+        assert manager.get(room.room_id) is None
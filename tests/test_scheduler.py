@@ -0,0 +1,97 @@
+"""
+Tests for the tick scheduler
+"""
+
+from scheduler import TickScheduler
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTickScheduler:
+    """Test timer ordering, repetition and cancellation."""
+
+    def test_runs_due_timers_in_order(self):
+        """Test only due timers run, earliest first."""
+        clock = FakeClock()
+        scheduler = TickScheduler(clock)
+        calls = []
+        scheduler.schedule('b', 2.0, lambda: calls.append('b'))
+        scheduler.schedule('a', 1.0, lambda: calls.append('a'))
+        clock.now = 1.5
+        assert scheduler.run_pending() == 1
+        clock.now = 2.5
+        assert scheduler.run_pending() == 1
+        assert calls == ['a', 'b']
+        assert len(scheduler) == 0
+
+    def test_repeating_timer_uses_returned_delay(self):
+        """Test a callback returning a delay is rescheduled."""
+        clock = FakeClock()
+        scheduler = TickScheduler(clock)
+        calls = []
+
+        def callback():
+            calls.append(clock.now)
+            return 0.5 if len(calls) < 3 else None
+
+        scheduler.schedule('g', 0.5, callback)
+        for step in range(1, 10):
+            clock.now = step * 0.5
+            scheduler.run_pending()
+        assert calls == [0.5, 1.0, 1.5]
+        assert len(scheduler) == 0
+
+    def test_cancel_and_reschedule(self):
+        """Test cancelled timers never run and rescheduling replaces a timer."""
+        clock = FakeClock()
+        scheduler = TickScheduler(clock)
+        calls = []
+        scheduler.schedule('x', 1.0, lambda: calls.append('first'))
+        scheduler.schedule('x', 3.0, lambda: calls.append('second'))
+        scheduler.schedule('y', 1.0, lambda: calls.append('y'))
+        assert scheduler.cancel('y')
+        clock.now = 2.0
+        scheduler.run_pending()
+        assert calls == []
+        clock.now = 3.0
+        scheduler.run_pending()
+        assert calls == ['second']
+
+    def test_failing_timer_is_dropped(self, caplog):
+        """Test a raising callback is logged and dropped while other timers keep running."""
+        clock = FakeClock()
+        scheduler = TickScheduler(clock)
+        calls = []
+
+        def broken():
+            raise RuntimeError("boom")
+
+        scheduler.schedule('bad', 1.0, broken)
+        scheduler.schedule('good', 1.0, lambda: calls.append(clock.now) or 1.0)
+        clock.now = 1.0
+        assert scheduler.run_pending() == 2
+        assert 'bad' in caplog.text
+        clock.now = 2.0
+        scheduler.run_pending()
+        assert calls == [1.0, 2.0]
+        assert len(scheduler) == 1
+
+    def test_background_thread(self):
+        """Test the scheduler thread fires timers on its own."""
+        import threading
+        scheduler = TickScheduler()
+        fired = threading.Event()
+        scheduler.start()
+        try:
+            scheduler.schedule('t', 0.01, fired.set)
+            assert fired.wait(2.0)
+        finally:
+            scheduler.stop()
@@ -0,0 +1,208 @@
+"""
+Tests for the game session manager
+"""
+
+import pytest
+
+from game_logic import TetrisGame
+from replay import MAX_REPLAY_EVENTS, ReplayRecorder
+from sessions import Input, SessionManager
+from store import MemoryStore
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_manager(clock, capacity=3, idle_timeout=60.0):
+    return SessionManager(lambda: TetrisGame(10, 20), capacity=capacity,
+                          idle_timeout=idle_timeout, clock=clock)
+
+
+class TestSessionManager:
+    """Test session creation, lookup and eviction."""
+
+    def test_sessions_are_independent(self, clock):
+        """Test each session owns its own game."""
+        manager = make_manager(clock)
+        first = manager.create()
+        second = manager.create()
+        assert first.session_id != second.session_id
+        assert first.game is not second.game
+        assert manager.get(first.session_id) is first
+
+    def test_unknown_session(self, clock):
+        """Test looking up an unknown id returns None."""
+        manager = make_manager(clock)
+        assert manager.get('missing') is None
+
+    def test_lru_eviction(self, clock):
+        """Test the least recently used session is evicted at capacity."""
+        manager = make_manager(clock, capacity=2)
+        first = manager.create()
+        second = manager.create()
+        manager.get(first.session_id)
+        manager.create()
+        assert len(manager) == 2
+        assert manager.get(second.session_id) is None
+        assert manager.get(first.session_id) is first
+        assert manager.evicted == 1
+
+    def test_idle_timeout(self, clock):
+        """Test idle sessions expire on lookup and on create."""
+        manager = make_manager(clock, idle_timeout=10.0)
+        first = manager.create()
+        clock.now = 5.0
+        second = manager.create()
+        clock.now = 12.0
+        assert manager.get(first.session_id) is None
+        assert manager.get(second.session_id) is second
+        clock.now = 30.0
+        manager.create()
+        assert len(manager) == 1
+        assert manager.expired == 2
+
+    def test_stats(self, clock):
+        """Test stats report live sessions and memory estimates."""
+        manager = make_manager(clock)
+        manager.create()
+        manager.create()
+        stats = manager.stats()
+        assert stats['sessions'] == 2
+        assert stats['created'] == 2
+        assert stats['approx_session_bytes'] > 0
+        assert stats['approx_total_bytes'] == 2 * stats['approx_session_bytes']
+
+
+def make_stored_manager(clock, store, capacity=3, idle_timeout=60.0):
+    return SessionManager(lambda: TetrisGame(10, 20), capacity=capacity,
+                          idle_timeout=idle_timeout, clock=clock, store=store)
+
+
+def play(session, actions):
+    with session.lock:
+        for action in actions:
+            session.apply(action)
+            session.mark_changed()
+
+
+class TestInputs:
+    """Test sequence-numbered input batches."""
+
+    def test_resent_and_paused_inputs(self, clock):
+        """Test old sequence numbers are skipped and paused inputs only acknowledged."""
+        session = make_manager(clock).create()
+        x = session.game.current_piece_x
+        with session.lock:
+            assert session.apply_inputs([Input(1, 'left'), Input(2, 'left')]) == 2
+            assert session.apply_inputs([Input(2, 'left'), Input(3, 'right')]) == 1
+            session.paused = True
+            assert session.apply_inputs([Input(4, 'left')]) == 0
+        assert session.input_seq == 4
+        assert session.game.current_piece_x == x - 1
+
+    def test_client_timestamps_space_replay_events(self, clock):
+        """Test the replay keeps the spacing of the client timestamps."""
+        session = make_manager(clock).create()
+        session.recorder = ReplayRecorder(session.game, clock=clock)
+        clock.now = 5.0
+        with session.lock:
+            session.apply_inputs([Input(1, 'left', 1000.0), Input(2, 'right', 1250.0)])
+        assert [ms for ms, _ in session.recorder.replay] == [4750, 5000]
+
+
+class TestPersistence:
+    """Test write-back to and restore from a session store."""
+
+    def test_flush_writes_only_dirty_sessions(self, clock):
+        """Test flush writes changed sessions once."""
+        store = MemoryStore()
+        manager = make_stored_manager(clock, store)
+        first = manager.create()
+        manager.create()
+        assert manager.flush() == 2
+        assert manager.flush() == 0
+        play(first, ['left'])
+        assert manager.flush() == 1
+        assert len(store) == 2
+
+    def test_restore_after_restart(self, clock):
+        """Test a new manager restores the game, replay and a newer version."""
+        store = MemoryStore()
+        manager = make_stored_manager(clock, store)
+        session = manager.create()
+        play(session, ['left', 'drop', 'rotate'])
+        session.paused = True
+        session.autoplayed = True
+        manager.flush()
+
+        restarted = make_stored_manager(clock, store)
+        restored = restarted.get(session.session_id)
+        assert restored is not None
+        assert restored.game.snapshot() == session.game.snapshot()
+        assert restored.paused
+        assert restored.autoplayed
+        assert list(restored.recorder.replay) == list(session.recorder.replay)
+        assert restored.version > session.version
+        assert restarted.get(session.session_id) is restored
+        assert restarted.restored == 1
+
+    def test_restore_long_replay(self, clock):
+        """Test a session whose replay passed the upload limit is still restored."""
+        store = MemoryStore()
+        manager = make_stored_manager(clock, store)
+        session = manager.create()
+        replay = session.recorder.replay
+        for _ in range(MAX_REPLAY_EVENTS + 10):
+            replay.append(1, 'tick')
+        play(session, ['left'])
+        manager.flush()
+
+        restored = make_stored_manager(clock, store).get(session.session_id)
+        assert restored is not None
+        assert restored.recorder.replay.count == MAX_REPLAY_EVENTS + 10
+        assert restored.recorder.full
+        assert len(store) == 1
+
+    def test_evicted_sessions_are_written_back(self, clock):
+        """Test a session evicted at capacity can be restored later."""
+        store = MemoryStore()
+        manager = make_stored_manager(clock, store, capacity=1)
+        first = manager.create()
+        play(first, ['drop'])
+        manager.create()
+        assert first.closed
+        restored = manager.get(first.session_id)
+        assert restored is not first
+        assert restored.game.score == first.game.score
+
+    def test_removed_and_expired_sessions_are_deleted(self, clock):
+        """Test ended sessions are dropped from the store."""
+        store = MemoryStore()
+        manager = make_stored_manager(clock, store, idle_timeout=10.0)
+        first = manager.create()
+        second = manager.create()
+        manager.flush()
+        manager.remove(first.session_id)
+        clock.now = 20.0
+        assert manager.get(second.session_id) is None
+        assert len(store) == 0
+
+    def test_unreadable_data_is_discarded(self, clock):
+        """Test corrupt stored data starts no session and is deleted."""
+        store = MemoryStore()
+        store.save_many([('broken', b'\x01\x02')])
+        manager = make_stored_manager(clock, store)
+        assert manager.get('broken') is None
+        assert store.load('broken') is None
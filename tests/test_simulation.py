@@ -0,0 +1,49 @@
+"""
+Tests for the headless simulation engine
+"""
+
+from bitboard import BitboardTetrisGame
+from simulation import RandomPolicy, ScriptedPolicy, play_game, run_batch
+
+
+class TestPlayGame:
+    """Test single headless games."""
+
+    def test_same_seed_same_result(self):
+        """Test a seeded game is reproducible."""
+        first = play_game(42, RandomPolicy())
+        second = play_game(42, RandomPolicy())
+        assert (first.score, first.lines, first.pieces) == (second.score, second.lines, second.pieces)
+
+    def test_game_runs_to_game_over(self):
+        """Test a game ends when pieces stack to the top."""
+        result = play_game(1, ScriptedPolicy([[]]))
+        assert result.game_over
+        assert result.pieces > 0
+
+    def test_max_pieces_caps_game(self):
+        """Test games stop after max_pieces."""
+        result = play_game(1, RandomPolicy(), max_pieces=3)
+        assert result.pieces == 3
+        assert not result.game_over
+
+    def test_engines_agree(self):
+        """Test both board engines produce the same game."""
+        base = play_game(7, RandomPolicy())
+        fast = play_game(7, RandomPolicy(), engine=BitboardTetrisGame)
+        assert (base.score, base.lines, base.pieces) == (fast.score, fast.lines, fast.pieces)
+
+
+class TestRunBatch:
+    """Test batch runs."""
+
+    def test_inline_batch(self):
+        """Test every seed is played once in-process."""
+        results = list(run_batch(5, RandomPolicy(), seed=10, workers=1))
+        assert sorted(result.seed for result in results) == [10, 11, 12, 13, 14]
+
+    def test_process_pool_batch(self):
+        """Test the process pool returns the same results as inline runs."""
+        pooled = {r.seed: r.score for r in run_batch(6, RandomPolicy(), workers=2, chunk_size=2)}
+        inline = {r.seed: r.score for r in run_batch(6, RandomPolicy(), workers=1)}
+        assert pooled == inline
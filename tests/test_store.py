@@ -0,0 +1,137 @@
+"""
+Tests for game state serialization and the session stores
+"""
+
+import time
+
+import pytest
+
+from bitboard import BitboardTetrisGame
+from game_logic import TetrisGame
+from store import MemoryStore, SQLiteStore, decode_game, encode_game, open_store
+
+
+class FakeClock:
+    """Manually advanced wall clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def played_game(engine=TetrisGame, randomizer='bag'):
+    """A game with a few locked pieces and a piece in flight."""
+    game = engine(10, 20, seed=7, randomizer=randomizer)
+    for action in ['left', 'drop', 'rotate', 'right', 'drop', 'down', 'tick']:
+        game.apply_action(action)
+    return game
+
+
+class TestGameEncoding:
+    """Test encode_game / decode_game."""
+
+    @pytest.mark.parametrize('engine', [TetrisGame, BitboardTetrisGame])
+    def test_round_trip(self, engine):
+        """Test a decoded game has the same state and continues identically."""
+        game = played_game(engine)
+        restored = decode_game(encode_game(game), engine)
+        assert type(restored) is engine
+        assert restored.snapshot() == game.snapshot()
+        for action in ['drop'] * 10:
+            game.apply_action(action)
+            restored.apply_action(action)
+        assert restored.get_board() == game.get_board()
+        assert restored.score == game.score
+
+    def test_flags_and_no_piece(self):
+        """Test game over and a missing current piece survive encoding."""
+        game = played_game(randomizer='uniform')
+        game.game_over = True
+        game.current_piece_type = None
+        game.current_piece = None
+        restored = decode_game(encode_game(game))
+        assert restored.game_over
+        assert restored.current_piece_type is None
+        assert restored.randomizer == 'uniform'
+
+    def test_compact(self):
+        """Test the encoding is one byte per cell plus the generator state."""
+        assert len(encode_game(played_game())) < 10 * 20 + 2600
+
+    def test_rejects_truncated_data(self):
+        """Test truncated data raises ValueError."""
+        with pytest.raises(ValueError):
+            decode_game(encode_game(played_game())[:-10])
+
+    def test_restore_is_fast(self):
+        """Test decoding a game takes well under a millisecond."""
+        data = encode_game(played_game())
+        number = 200
+        start = time.perf_counter()
+        for _ in range(number):
+            decode_game(data)
+        assert (time.perf_counter() - start) / number < 0.001
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    clock = FakeClock()
+    if request.param == 'memory':
+        store = MemoryStore(clock=clock)
+    else:
+        store = SQLiteStore(str(tmp_path / 'sessions.db'), clock=clock)
+    yield store
+    store.close()
+
+
+class TestSessionStore:
+    """Test the behaviour shared by every store backend."""
+
+    def test_save_and_load(self, store):
+        """Test saved data is returned until deleted."""
+        assert store.save_many([('a', b'one'), ('b', b'two')]) == 2
+        assert store.load('a') == b'one'
+        assert len(store) == 2
+        store.save_many([('a', b'three')])
+        assert store.load('a') == b'three'
+        store.delete('a')
+        assert store.load('a') is None
+        assert store.load('missing') is None
+
+    def test_max_age_and_purge(self, store):
+        """Test old entries are hidden by max_age and removed by purge."""
+        store.save_many([('old', b'1')])
+        store.clock.now += 100
+        store.save_many([('new', b'2')])
+        assert store.load('old', max_age=50) is None
+        assert store.load('new', max_age=50) == b'2'
+        assert store.purge(50) == 1
+        assert store.load('old') is None
+        assert len(store) == 1
+
+
+class TestOpenStore:
+    """Test building a store from its configuration string."""
+
+    def test_specs(self, tmp_path):
+        """Test the supported specs and the default of no store."""
+        assert open_store(None) is None
+        assert open_store('') is None
+        assert isinstance(open_store('memory'), MemoryStore)
+        sqlite_store = open_store(f"sqlite:{tmp_path / 'db.sqlite'}")
+        assert isinstance(sqlite_store, SQLiteStore)
+        sqlite_store.close()
+        with pytest.raises(ValueError):
+            open_store('redis://localhost')
+
+    def test_sqlite_survives_reopen(self, tmp_path):
+        """Test SQLite data is still there after the store is reopened."""
+        path = str(tmp_path / 'sessions.db')
+        first = SQLiteStore(path)
+        first.save_many([('a', b'data')])
+        first.close()
+        second = SQLiteStore(path)
+        assert second.load('a') == b'data'
+        second.close()
@@ -0,0 +1,202 @@
+"""
+Tests for board thumbnails and their content-addressed cache
+"""
+
+import time
+from concurrent.futures import BrokenExecutor, Future, ThreadPoolExecutor
+
+import pytest
+
+import thumbnails
+from game_logic import TetrisGame
+from thumbnails import ThumbnailService, thumbnail_key
+
+pytestmark = pytest.mark.skipif(not thumbnails.HAVE_PYGAME, reason="pygame is not installed")
+
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """A one-thread executor that counts submitted renders."""
+
+    def __init__(self):
+        super().__init__(1)
+        self.submitted = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        self.submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+class FailingExecutor(CountingExecutor):
+    """Fails the first ``failures`` renders, then renders normally."""
+
+    def __init__(self, failures=1):
+        super().__init__()
+        self.failures = failures
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if self.failures:
+            self.failures -= 1
+            return super().submit(self.fail)
+        return super().submit(fn, *args, **kwargs)
+
+    @staticmethod
+    def fail():
+        raise RuntimeError("worker crashed")
+
+
+class BrokenPool(CountingExecutor):
+    """An executor whose workers have died."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        raise BrokenExecutor("a worker died")
+
+
+@pytest.fixture
+def service():
+    executor = CountingExecutor()
+    service = ThumbnailService(cache_size=2, executor=executor)
+    yield service
+    service.close()
+
+
+def render(service, game):
+    key, future = service.request(game)
+    png = future.result(10)
+    # The result is cached by a done callback, which may run just after result() returns
+    deadline = time.monotonic() + 10
+    while key in service._inflight and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return key, png
+
+
+class TestThumbnailKey:
+    """Test the cache key follows what the image shows."""
+
+    def test_key_changes_with_state(self):
+        """Test moves and locked pieces change the key, equal states share it."""
+        game = TetrisGame(seed=1)
+        before = thumbnail_key(game)
+        assert thumbnail_key(TetrisGame(seed=1)) == before
+        game.move_piece_left()
+        moved = thumbnail_key(game)
+        assert moved != before
+        game.hard_drop()
+        assert thumbnail_key(game) != moved
+
+    def test_key_includes_block_size(self):
+        """Test different image sizes do not share a key."""
+        game = TetrisGame(seed=1)
+        assert thumbnail_key(game, 12) != thumbnail_key(game, 20)
+
+
+class TestThumbnailService:
+    """Test rendering, caching and eviction."""
+
+    def test_renders_png(self, service):
+        """Test the worker renders the board at the thumbnail size."""
+        _, png = render(service, TetrisGame(seed=1))
+        assert png.startswith(PNG_MAGIC)
+        width = int.from_bytes(png[16:20], 'big')
+        height = int.from_bytes(png[20:24], 'big')
+        assert (width, height) == (10 * 12 + 200, 20 * 12 + 40)
+
+    def test_cache_hit(self, service):
+        """Test an unchanged game is rendered once."""
+        game = TetrisGame(seed=1)
+        key, png = render(service, game)
+        again_key, again = render(service, game)
+        assert (again_key, again) == (key, png)
+        assert service._executor.submitted == 1
+        assert (service.hits, service.misses) == (1, 1)
+
+    def test_restored_state_matches(self, service):
+        """Test the worker draws the snapshot it was sent, not a fresh game."""
+        game = TetrisGame(seed=1)
+        for _ in range(3):
+            game.hard_drop()
+        _, png = render(service, game)
+        _, fresh = render(service, TetrisGame(seed=1))
+        assert png != fresh
+
+    def test_lru_eviction(self, service):
+        """Test the least recently used image is evicted beyond the cache size."""
+        games = [TetrisGame(seed=seed) for seed in (1, 2, 3)]
+        for _ in range(2):
+            games[1].move_piece_right()
+        games[2].hard_drop()
+        keys = [render(service, game)[0] for game in games[:2]]
+        render(service, games[0])  # games[0] becomes the most recent
+        render(service, games[2])
+        assert len(service) == 2
+        assert keys[0] in service._cache and keys[1] not in service._cache
+
+    def test_concurrent_requests_share_a_render(self):
+        """Test a render in progress is shared instead of queued twice."""
+        gate = Future()
+        executor = CountingExecutor()
+        executor.submit(gate.result)  # hold the only worker
+        service = ThumbnailService(executor=executor)
+        try:
+            game = TetrisGame(seed=1)
+            _, first = service.request(game)
+            _, second = service.request(game)
+            assert second is first
+            gate.set_result(None)
+            assert first.result(10).startswith(PNG_MAGIC)
+            assert executor.submitted == 2
+        finally:
+            service.close()
+
+    def test_failed_render_is_retried(self):
+        """Test a failed render is neither cached nor shared with the next request."""
+        executor = FailingExecutor()
+        service = ThumbnailService(executor=executor)
+        try:
+            game = TetrisGame(seed=1)
+            _, failed = service.request(game)
+            with pytest.raises(RuntimeError):
+                failed.result(10)
+            _, retried = service.request(game)
+            assert retried is not failed
+            assert retried.result(10).startswith(PNG_MAGIC)
+            assert executor.submitted == 2
+        finally:
+            service.close()
+
+    def test_broken_pool_is_replaced(self, monkeypatch):
+        """Test the service starts a new pool when its own pool has broken."""
+        replacement = CountingExecutor()
+        monkeypatch.setattr(thumbnails, 'default_executor', lambda workers: replacement)
+        service = ThumbnailService()
+        service._executor = BrokenPool()
+        try:
+            _, png = render(service, TetrisGame(seed=1))
+            assert png.startswith(PNG_MAGIC)
+            assert service._executor is replacement
+        finally:
+            service.close()
+
+    def test_given_broken_executor_fails_the_render(self):
+        """Test an executor passed in is not replaced; the render fails instead."""
+        service = ThumbnailService(executor=BrokenPool())
+        try:
+            _, future = service.request(TetrisGame(seed=1))
+            with pytest.raises(BrokenExecutor):
+                future.result(10)
+        finally:
+            service.close()
+
+
+class TestProcessPool:
+    """Test the default worker processes."""
+
+    def test_renders_in_worker_process(self):
+        """Test a render round-trips through a separate process."""
+        service = ThumbnailService(workers=1)
+        try:
+            _, png = render(service, TetrisGame(seed=1))
+            assert png.startswith(PNG_MAGIC)
+        finally:
+            service.close()
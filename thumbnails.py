@@ -0,0 +1,192 @@
+"""
+テトリス サムネイル - ゲームの状態の PNG 画像（内容アドレスの LRU キャッシュとワーカープール）
+
+画像は :class:`renderer.GameRenderer` でオフスクリーンのサーフェスに描き（SDL は
+ダミーのドライバー）、PNG にする。描画と PNG のエンコードはワーカープロセスで行うので、
+リクエストのスレッドは結果を待つだけで GIL を奪わない。同じ盤面・ピース・表示値の
+画像はハッシュをキーに LRU キャッシュから返し、同じキーの描画が進行中なら
+その結果を共有する。
+
+pygame はワーカーだけが読み込む。pygame がない環境では :data:`HAVE_PYGAME` が False になり、
+サムネイルは作れない。
+"""
+
+import hashlib
+import importlib.util
+import io
+import logging
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor
+from typing import Dict, NamedTuple, Optional, Tuple
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import metrics
+from game_logic import GameSnapshot, TetrisGame
+
+# pygame is optional for the web server, and only the workers import it
+# (importing it costs about 250 ms of startup)
+HAVE_PYGAME = importlib.util.find_spec('pygame') is not None
+
+# Block size (pixels) of thumbnails; the image also has the renderer's side panel
+THUMBNAIL_BLOCK = 12
+
+
+class ThumbnailJob(NamedTuple):
+    """ワーカーに渡す描画の依頼（状態はゲームのスナップショット）"""
+    width: int
+    height: int
+    block_size: int
+    snapshot: GameSnapshot
+
+
+def thumbnail_key(game: TetrisGame, block_size: int = THUMBNAIL_BLOCK) -> str:
+    """画像に映るもの（盤面・落下中と次のピース・スコア表示）のハッシュ"""
+    digest = hashlib.sha256(b''.join(game.board_view()))
+    digest.update(struct.pack('<HHH', game.width, game.height, block_size))
+    digest.update(repr((game.current_piece_type, game.current_rotation, game.current_piece_x,
+                        game.current_piece_y, game.next_piece_type, game.score, game.level,
+                        game.lines_cleared)).encode())
+    return digest.hexdigest()[:24]
+
+
+# Per-process renderers by (width, height, block size); only used inside workers
+_renderers: Dict[tuple, object] = {}
+
+
+def _init_worker() -> None:
+    """ワーカープロセスの初期化（フォントだけ使う）"""
+    import pygame
+    pygame.font.init()
+
+
+def render_png(job: ThumbnailJob) -> bytes:
+    """ワーカーで実行: スナップショットを描画して PNG のバイト列を返す"""
+    import pygame
+    from renderer import GameRenderer
+
+    size = (job.width, job.height, job.block_size)
+    renderer = _renderers.get(size)
+    if renderer is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        surface = pygame.Surface((job.width * job.block_size + 200,
+                                  job.height * job.block_size + 40))
+        renderer = _renderers[size] = GameRenderer(*size, surface=surface)
+    game = TetrisGame(job.width, job.height)
+    game.restore(job.snapshot)
+    renderer.invalidate()
+    renderer.draw(game)
+    output = io.BytesIO()
+    pygame.image.save(renderer.screen, output, 'png')
+    return output.getvalue()
+
+
+def default_executor(workers: int) -> Executor:
+    """描画用のプロセスプール（スレッドを持つ親を fork しないよう forkserver/spawn で起動）"""
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method),
+                               initializer=_init_worker)
+
+
+class ThumbnailService:
+    """サムネイルの LRU キャッシュと描画ワーカーの窓口。
+
+    :meth:`request` はセッションのロック保持中に呼び、キーと Future を返す。
+    ロックを放してから Future の結果を待つ。失敗した描画は共有もキャッシュもせず、
+    次の要求で描き直す。ワーカーが落ちて自前のプロセスプールが壊れたら作り直す。
+    """
+
+    def __init__(self, workers: int = 2, cache_size: int = 512,
+                 block_size: int = THUMBNAIL_BLOCK, executor: Optional[Executor] = None):
+        """サービスを初期化（executor を省略すると最初の描画時にプロセスプールを起動）"""
+        self.workers = workers
+        self.cache_size = cache_size
+        self.block_size = block_size
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._cache: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def key(self, game: TetrisGame) -> str:
+        """ゲームの現在の画像のキー（ETag に使う）"""
+        return thumbnail_key(game, self.block_size)
+
+    def request(self, game: TetrisGame, key: Optional[str] = None) -> Tuple[str, Future]:
+        """現在の状態の PNG を要求してキーと Future を返す（キャッシュにあれば完了済みの Future）"""
+        if not HAVE_PYGAME:
+            raise RuntimeError("thumbnails need pygame")
+        if key is None:
+            key = self.key(game)
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                metrics.thumbnails.inc('hit')
+                future: Future = Future()
+                future.set_result(png)
+                return key, future
+            future = self._inflight.get(key)
+            # A failed render may still be listed until its done callback runs
+            if future is not None and not (future.done() and future.exception() is not None):
+                metrics.thumbnails.inc('shared')
+                return key, future
+            self.misses += 1
+            metrics.thumbnails.inc('miss')
+            job = ThumbnailJob(game.width, game.height, self.block_size, game.snapshot())
+            future = self._submit(job)
+            self._inflight[key] = future
+        started = time.perf_counter()
+        future.add_done_callback(lambda done: self._finish(key, done, started))
+        return key, future
+
+    def _submit(self, job: ThumbnailJob) -> Future:
+        """Queue a render (called with ``_lock`` held), replacing our pool if a worker died."""
+        if self._executor is None:
+            self._executor = default_executor(self.workers)
+        try:
+            return self._executor.submit(render_png, job)
+        except BrokenExecutor as exc:
+            if not self._owns_executor:
+                failed: Future = Future()
+                failed.set_exception(exc)
+                return failed
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = default_executor(self.workers)
+            return self._executor.submit(render_png, job)
+
+    def _finish(self, key: str, future: Future, started: float) -> None:
+        """Store a finished render in the cache and drop the in-flight entry."""
+        metrics.thumbnail_latency.observe(time.perf_counter() - started)
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                metrics.thumbnails.inc('failed')
+                logging.getLogger(__name__).error("thumbnail render failed",
+                                                  exc_info=future.exception())
+                return
+            self._cache[key] = future.result()
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def close(self) -> None:
+        """ワーカーを止める"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)